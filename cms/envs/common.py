@@ -151,6 +151,10 @@ FEATURES = {
     # Enable course reruns, which will always use the split modulestore
     'ALLOW_COURSE_RERUNS': True,
 
+    # Build the index of the published blocks of courses used by the LMS when
+    # they're published, rather than when the LMS first needs it.
+    'ENABLE_PATH_TO_LOCATION_INDEX': False,
+
     # Social Media Sharing on Student Dashboard
     'DASHBOARD_SHARE_SETTINGS': {
         # Note: Ensure 'CUSTOM_COURSE_URLS' has a matching value in lms/envs/common.py
@@ -358,6 +362,28 @@ MODULESTORE = {
     }
 }
 
+############################ Course assets #####################################
+
+# Directory of the local disk cache of the course assets too large for
+# memcached, served by the StaticContentServer middleware.  None disables it.
+STATIC_CONTENT_DISK_CACHE_ROOT = None
+# How many bytes of assets the disk cache can hold.
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# How many seconds browsers and CDNs can cache unlocked course assets for, by
+# content type ("image/png") or main type ("image"); "default" applies to the
+# other types.  Locked assets are only cached by browsers, and always revalidated.
+STATIC_CONTENT_CACHE_MAX_AGE = {
+    'default': 3600,
+}
+
+######################### Configuration models #################################
+
+# How many seconds each process keeps the current ConfigurationModel entries
+# for, in front of the django cache; they are also memoized for the request.
+# Entries saved by other processes can be seen that much later.  0 disables it.
+CONFIGURATION_MODEL_LOCAL_CACHE_TIMEOUT = 0
+
 ############################ DJANGO_BUILTINS ################################
 # Change DEBUG/TEMPLATE_DEBUG in your environment settings files, not here
 DEBUG = False
@@ -1,15 +1,88 @@
 """
 Django Model baseclass for database-backed configuration.
 """
+import threading
+import time
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.cache import get_cache, InvalidCacheBackendError
 
+from request_cache.middleware import RequestCache
+
 try:
     cache = get_cache('configuration')  # pylint: disable=invalid-name
 except InvalidCacheBackendError:
     from django.core.cache import cache
 
+# The key of the configurations memoized for the request in the request cache
+REQUEST_CACHE_KEY = 'config_models.current'
+
+
+class LocalConfigurationCache(object):
+    """
+    A process-local cache of the current configuration entries, in front of
+    the django cache.
+
+    Entries are kept for `timeout` seconds, so configurations saved by other
+    processes are seen after at most that long. Saving a configuration in
+    this process bumps the generation of its model, which invalidates the
+    entry immediately, including one which was being loaded meanwhile.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generations = {}
+
+    def generation(self, key):
+        """
+        Return the current generation of the configuration cached under `key`.
+        """
+        return self._generations.get(key, 0)
+
+    def get(self, key, timeout):
+        """
+        Return the configuration cached under `key`, or None if it isn't cached,
+        has expired or is from an older generation.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        cached_at, generation, value = entry
+        if generation != self.generation(key) or time.time() - cached_at >= timeout:
+            return None
+        return value
+
+    def set(self, key, value, generation):
+        """
+        Cache `value` under `key`, unless the configuration was saved since
+        `generation` was read.
+        """
+        with self._lock:
+            if generation == self.generation(key):
+                self._entries[key] = (time.time(), generation, value)
+
+    def invalidate(self, key):
+        """
+        Forget the configuration cached under `key`.
+        """
+        with self._lock:
+            self._generations[key] = self.generation(key) + 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Forget all the cached configurations.
+        """
+        with self._lock:
+            for key in self._entries.keys():
+                self._generations[key] = self.generation(key) + 1
+            self._entries.clear()
+
+
+LOCAL_CACHE = LocalConfigurationCache()
+
 
 class ConfigurationModel(models.Model):
     """
@@ -36,6 +109,8 @@ class ConfigurationModel(models.Model):
         """
         super(ConfigurationModel, self).save(*args, **kwargs)
         cache.delete(self.cache_key_name())
+        LOCAL_CACHE.invalidate(self.cache_key_name())
+        RequestCache.get_request_cache().data.get(REQUEST_CACHE_KEY, {}).pop(self.cache_key_name(), None)
 
     @classmethod
     def cache_key_name(cls):
@@ -48,6 +123,37 @@ class ConfigurationModel(models.Model):
         Return the active configuration entry, either from cache,
         from the database, or by creating a new empty entry (which is not
         persisted).
+
+        When CONFIGURATION_MODEL_LOCAL_CACHE_TIMEOUT is set, the entry is
+        also kept in a process-local cache for that many seconds, and memoized
+        for the rest of the request, or at most that long outside of requests
+        (e.g. in celery tasks), where nothing clears the request cache.
+        """
+        key = cls.cache_key_name()
+        local_timeout = getattr(settings, 'CONFIGURATION_MODEL_LOCAL_CACHE_TIMEOUT', 0)
+        if local_timeout:
+            request_cache = RequestCache.get_request_cache().data.setdefault(REQUEST_CACHE_KEY, {})
+            memoized = request_cache.get(key)
+            if memoized is not None:
+                memoized_at, current = memoized
+                if time.time() - memoized_at < local_timeout:
+                    return current
+
+            current = LOCAL_CACHE.get(key, local_timeout)
+            if current is None:
+                generation = LOCAL_CACHE.generation(key)
+                current = cls._current_from_cache()
+                LOCAL_CACHE.set(key, current, generation)
+            request_cache[key] = (time.time(), current)
+            return current
+
+        return cls._current_from_cache()
+
+    @classmethod
+    def _current_from_cache(cls):
+        """
+        Return the active configuration entry, either from the django cache,
+        from the database, or by creating a new empty entry.
         """
         cached = cache.get(cls.cache_key_name())
         if cached is not None:
@@ -5,11 +5,13 @@ Tests of ConfigurationModel
 from django.contrib.auth.models import User
 from django.db import models
 from django.test import TestCase
+from django.test.utils import override_settings
 
 from freezegun import freeze_time
 
 from mock import patch
-from config_models.models import ConfigurationModel
+from config_models.models import ConfigurationModel, LOCAL_CACHE
+from request_cache.middleware import RequestCache
 
 
 class ExampleConfig(ConfigurationModel):
@@ -74,3 +76,67 @@ class ConfigurationModelTests(TestCase):
         ExampleConfig.current()
 
         mock_cache.set.assert_called_with(ExampleConfig.cache_key_name(), first, 300)
+
+
+@override_settings(CONFIGURATION_MODEL_LOCAL_CACHE_TIMEOUT=60)
+@patch('config_models.models.cache')
+class LocalCacheTests(TestCase):
+    """
+    Tests of the process-local cache of ConfigurationModel entries
+    """
+    def setUp(self):
+        self.user = User()
+        self.user.save()
+        LOCAL_CACHE.clear()
+        RequestCache().clear_request_cache()
+        self.addCleanup(LOCAL_CACHE.clear)
+        self.addCleanup(RequestCache().clear_request_cache)
+
+    def test_memoized_for_the_request(self, mock_cache):
+        mock_cache.get.return_value = None
+
+        current = ExampleConfig.current()
+        LOCAL_CACHE.clear()
+        with self.assertNumQueries(0):
+            self.assertIs(ExampleConfig.current(), current)
+        self.assertEquals(mock_cache.get.call_count, 1)
+
+    def test_memoized_entry_expires(self, mock_cache):
+        # Outside of requests, the request cache is never cleared
+        with freeze_time('2012-01-01 00:00:00'):
+            ExampleConfig.current()
+        LOCAL_CACHE.clear()
+        with freeze_time('2012-01-01 00:01:00'):
+            ExampleConfig.current()
+        self.assertEquals(mock_cache.get.call_count, 2)
+
+    def test_cached_by_the_process(self, mock_cache):
+        current = ExampleConfig.current()
+        RequestCache().clear_request_cache()
+        self.assertIs(ExampleConfig.current(), current)
+        self.assertEquals(mock_cache.get.call_count, 1)
+
+    def test_expires(self, mock_cache):
+        with freeze_time('2012-01-01 00:00:00'):
+            ExampleConfig.current()
+        RequestCache().clear_request_cache()
+        with freeze_time('2012-01-01 00:01:00'):
+            ExampleConfig.current()
+        self.assertEquals(mock_cache.get.call_count, 2)
+
+    def test_invalidated_on_save(self, mock_cache):
+        mock_cache.get.return_value = None
+
+        first = ExampleConfig(changed_by=self.user, string_field='first')
+        first.save()
+        self.assertEquals(ExampleConfig.current().string_field, 'first')
+
+        second = ExampleConfig(changed_by=self.user, string_field='second')
+        second.save()
+        self.assertEquals(ExampleConfig.current().string_field, 'second')
+
+    def test_loaded_before_save_is_not_cached(self, _mock_cache):
+        generation = LOCAL_CACHE.generation(ExampleConfig.cache_key_name())
+        ExampleConfig(changed_by=self.user).save()
+        LOCAL_CACHE.set(ExampleConfig.cache_key_name(), ExampleConfig(), generation)
+        self.assertIsNone(LOCAL_CACHE.get(ExampleConfig.cache_key_name(), 60))
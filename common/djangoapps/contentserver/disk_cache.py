@@ -0,0 +1,168 @@
+"""
+Local disk cache of the assets which are too large for memcached.
+
+Large assets are copied from GridFS to a directory of the local disk the first
+time they are served, and served from there afterwards. Only their metadata is
+stored in memcached, as a `StaticContentFile` without a path, so that
+`del_cached_content` keeps working to invalidate them.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+from xmodule.contentstore.content import StaticContent
+
+log = logging.getLogger(__name__)
+
+# How many bytes of a cached file are read at once when serving it
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+class StaticContentFile(StaticContent):
+    """
+    An asset whose data is in a file of the local disk cache.
+
+    The path of the file is local to the server, so it isn't pickled: once
+    unpickled, the content has to be found in the disk cache again.
+    """
+    def __init__(self, content, path=None):
+        super(StaticContentFile, self).__init__(
+            content.location, content.name, content.content_type, None,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=content.locked,
+            content_digest=getattr(content, 'content_digest', None)
+        )
+        self.path = path
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['path'] = None
+        return state
+
+    @property
+    def data(self):
+        with open(self.path, 'rb') as content_file:
+            return content_file.read()
+
+    def stream_data(self):
+        return self.stream_data_in_range(0, self.length - 1)
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Stream the data between first_byte and last_byte (included)
+        """
+        with open(self.path, 'rb') as content_file:
+            content_file.seek(first_byte)
+            remaining = last_byte - first_byte + 1
+            while remaining > 0:
+                chunk = content_file.read(min(FILE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class AssetDiskCache(object):
+    """
+    A cache of assets in the directory `root`, holding up to `max_size` bytes.
+
+    Files are named after the location and the modification date of their
+    asset, so a modified asset is never served from an outdated file. When the
+    cache is full, the least recently served files are removed. The directory
+    can be shared by all the processes of a server.
+    """
+    def __init__(self, root, max_size):
+        self.root = root
+        self.max_size = max_size
+        if not os.path.isdir(root):
+            os.makedirs(root)
+
+    def _path(self, content):
+        """
+        Return the path of the file holding the data of `content`.
+        """
+        key = u'{}|{}'.format(content.location, content.last_modified_at).encode('utf-8')
+        return os.path.join(self.root, hashlib.sha1(key).hexdigest())
+
+    def get(self, content):
+        """
+        Return `content` with the path of its data in the cache, or None if it isn't cached.
+        """
+        path = self._path(content)
+        try:
+            # Mark the file as recently used.
+            os.utime(path, None)
+        except OSError:
+            return None
+        return StaticContentFile(content, path)
+
+    def add(self, content):
+        """
+        Copy the data of the `StaticContentStream` `content` to the cache, and
+        return it as a `StaticContentFile`, or return `content` itself if it
+        can't be cached.
+        """
+        if content.length > self.max_size:
+            return content
+
+        try:
+            self._evict(self.max_size - content.length)
+            handle, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp')
+            try:
+                with os.fdopen(handle, 'wb') as tmp_file:
+                    for chunk in content.stream_data():
+                        tmp_file.write(chunk)
+                os.rename(tmp_path, self._path(content))
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        except (IOError, OSError):
+            log.exception(u'Failed to cache %s on disk', content.location)
+            content._stream.seek(0)  # pylint: disable=protected-access
+            return content
+
+        return StaticContentFile(content, self._path(content))
+
+    def _evict(self, size):
+        """
+        Remove the least recently used files, until the cache holds at most `size` bytes.
+        """
+        files = []
+        total_size = 0
+        for name in os.listdir(self.root):
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except OSError:
+                # Removed by another process
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+
+        files.sort()
+        while files and total_size > size:
+            __, file_size, name = files.pop(0)
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+            total_size -= file_size
+
+
+_DISK_CACHE = None
+
+
+def get_disk_cache():
+    """
+    Return the AssetDiskCache configured by the STATIC_CONTENT_DISK_CACHE_ROOT
+    setting, or None if there is none.
+    """
+    global _DISK_CACHE  # pylint: disable=global-statement
+    root = getattr(settings, 'STATIC_CONTENT_DISK_CACHE_ROOT', None)
+    if root is None:
+        return None
+    if _DISK_CACHE is None or _DISK_CACHE.root != root:
+        _DISK_CACHE = AssetDiskCache(root, settings.STATIC_CONTENT_DISK_CACHE_MAX_SIZE)
+    return _DISK_CACHE
@@ -2,11 +2,15 @@
 Middleware to serve assets.
 """
 
+import calendar
 import logging
+import uuid
 
+from django.conf import settings
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
+from django.utils.http import http_date, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
@@ -15,6 +19,7 @@ from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from cache_toolbox.core import get_cached_content, set_cached_content
+from contentserver.disk_cache import StaticContentFile, get_disk_cache
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -23,6 +28,9 @@ from xmodule.exceptions import NotFoundError
 
 log = logging.getLogger(__name__)
 
+# Assets smaller than this many bytes are cached in memcached, larger ones on the local disk
+MAX_CACHED_CONTENT_SIZE = 1048576
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -43,6 +51,10 @@ class StaticContentServer(object):
 
             # first look in our cache so we don't have to round-trip to the DB
             content = get_cached_content(loc)
+            if isinstance(content, StaticContentFile):
+                # only the metadata of large assets is in the cache, their data is on the local disk
+                disk_cache = get_disk_cache()
+                content = disk_cache.get(content) if disk_cache is not None else None
             if content is None:
                 # nope, not in cache, let's fetch from DB
                 try:
@@ -55,10 +67,15 @@ class StaticContentServer(object):
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
                 # this is because I haven't been able to find a means to stream data out of memcached
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < MAX_CACHED_CONTENT_SIZE:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
+                    elif get_disk_cache() is not None:
+                        # larger assets are copied to the local disk, and only their metadata is cached
+                        content = get_disk_cache().add(content)
+                        if isinstance(content, StaticContentFile):
+                            set_cached_content(content)
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -77,18 +94,24 @@ class StaticContentServer(object):
                     ):
                         return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # convert over the DB persistent last modified timestamp to a HTTP compatible timestamp
+            last_modified_at = calendar.timegm(content.last_modified_at.utctimetuple())
+            etag = get_etag(content)
+            cache_headers = {
+                'Cache-Control': get_cache_control(content),
+                'Last-Modified': http_date(last_modified_at),
+            }
+            if etag is not None:
+                cache_headers['ETag'] = etag
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            # see if the client has cached this content, if so then just return a 304 (Not Modified)
+            if is_not_modified(request, etag, last_modified_at, content):
+                response = HttpResponseNotModified()
+                for header, value in cache_headers.iteritems():
+                    response[header] = value
+                return response
 
-            # *** File streaming within a byte range ***
+            # *** File streaming within byte ranges ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
             # Request -> Range attribute structure: "Range: bytes=first-[last]"
@@ -96,10 +119,6 @@ class StaticContentServer(object):
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
             if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -112,43 +131,143 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
+                        # Unsatisfiable ranges are ignored, unless none of them is satisfiable
+                        ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            response = HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            response['Content-Range'] = 'bytes */{length}'.format(length=content.length)
+                            return response
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
                             response = HttpResponse(content.stream_data_in_range(first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
+                            response['Content-Type'] = content.content_type
                             response.status_code = 206  # Partial Content
-                        else:
+                        elif sum(last - first + 1 for first, last in ranges) > content.length:
+                            # Overlapping ranges adding up to more than the content: send the full content instead.
                             log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                                u"Overlapping ranges in Range header: %s for content: %s", header_value, unicode(loc)
                             )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        else:
+                            # Content for multiple ranges is sent as a multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            response = multipart_byteranges_response(content, ranges)
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
                 response = HttpResponse(content.stream_data())
                 response['Content-Length'] = content.length
+                response['Content-Type'] = content.content_type
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
-            response['Last-Modified'] = last_modified_at_str
+            for header, value in cache_headers.iteritems():
+                response[header] = value
 
             return response
 
 
+def get_etag(content):
+    """
+    Returns the strong ETag of the content, derived from the md5 of its data, or None if it isn't known.
+    """
+    content_digest = getattr(content, 'content_digest', None)
+    if content_digest is None:
+        return None
+    return '"{}"'.format(content_digest)
+
+
+def get_cache_control(content):
+    """
+    Returns the Cache-Control header value of the content.
+
+    Locked content can only be cached by the browser of the user, and is revalidated on every use. Other content
+    can be cached by anyone for the STATIC_CONTENT_CACHE_MAX_AGE of its content type.
+    """
+    if getattr(content, 'locked', False):
+        return 'private, no-cache'
+
+    max_ages = settings.STATIC_CONTENT_CACHE_MAX_AGE
+    content_type = (content.content_type or '').split(';')[0].strip().lower()
+    for key in (content_type, content_type.split('/')[0], 'default'):
+        if key in max_ages:
+            return 'public, max-age={}'.format(max_ages[key])
+    return 'no-cache'
+
+
+def is_not_modified(request, etag, last_modified_at, content):
+    """
+    Returns whether the copy of the content the client has, according to the conditional headers of the request,
+    is up to date.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.26
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        if etag is None:
+            return False
+        client_etags = [value.strip() for value in if_none_match.split(',')]
+        # GET requests use the weak comparison function
+        return '*' in client_etags or any(
+            (client_etag[2:] if client_etag.startswith('W/') else client_etag) == etag
+            for client_etag in client_etags
+        )
+
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since is not None:
+        if_modified_since_at = parse_http_date_safe(if_modified_since)
+        if if_modified_since_at is not None:
+            return last_modified_at <= if_modified_since_at
+        # Clients may send back the Last-Modified header we used to send
+        return if_modified_since == content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+
+    return False
+
+
+def multipart_byteranges_response(content, ranges):
+    """
+    Returns a 206 response sending the `ranges` of the content as a multipart/byteranges message.
+    """
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        'Content-Type: {content_type}\r\nContent-Range: bytes {first}-{last}/{length}\r\n\r\n'.format(
+            content_type=content.content_type, first=first, last=last, length=content.length
+        )
+        for first, last in ranges
+    ]
+    delimiter = '\r\n--{}\r\n'.format(boundary)
+    close_delimiter = '\r\n--{}--\r\n'.format(boundary)
+
+    def stream_parts():
+        """
+        Stream the parts of the message.
+        """
+        for index, (first, last) in enumerate(ranges):
+            # The first delimiter doesn't need the preceding CRLF.
+            yield delimiter[2:] if index == 0 else delimiter
+            yield part_headers[index]
+            for chunk in content.stream_data_in_range(first, last):
+                yield chunk
+        yield close_delimiter
+
+    length = (
+        sum(len(headers) + last - first + 1 for headers, (first, last) in zip(part_headers, ranges)) +
+        len(delimiter) * len(ranges) - 2 + len(close_delimiter)
+    )
+    response = HttpResponse(stream_parts(), status=206)
+    response['Content-Type'] = 'multipart/byteranges; boundary={}'.format(boundary)
+    response['Content-Length'] = str(length)
+    return response
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
@@ -2,21 +2,34 @@
 Tests for StaticContentServer
 """
 import copy
+import cPickle as pickle
+from datetime import datetime
 import ddt
 import logging
+import os
+import shutil
+import tempfile
 import unittest
 from uuid import uuid4
 
+from mock import patch
+from StringIO import StringIO
+
 from django.conf import settings
 from django.test.client import Client
 from django.test.utils import override_settings
+from django.utils.http import http_date, parse_http_date
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
+from xmodule.contentstore.content import StaticContentStream
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
+from cache_toolbox.core import del_cached_content
+from contentserver.disk_cache import AssetDiskCache, StaticContentFile
 from contentserver.middleware import parse_range_header
 from student.models import CourseEnrollment
 
@@ -146,18 +159,120 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart message with the ranges.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
-        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -3'.format(
             first=first_byte, last=last_byte)
         )
+        data = self.contentstore.find(self.unlocked_asset).data
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertNotIn('Content-Range', resp)
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+        content_type, boundary = resp['Content-Type'].split('; boundary=')
+        self.assertEqual(content_type, 'multipart/byteranges')
+        parts = resp.content.split('--{}'.format(boundary))
+        self.assertEqual(parts[0], '')
+        self.assertEqual(parts[-1], '--\r\n')
+        expected_parts = [
+            (first_byte, last_byte), (self.length_unlocked - 3, self.length_unlocked - 1)
+        ]
+        for part, (first, last) in zip(parts[1:-1], expected_parts):
+            # Each part is surrounded by the CRLFs of the delimiters
+            headers, part_data = part[2:-2].split('\r\n\r\n', 1)
+            self.assertIn('Content-Range: bytes {}-{}/{}'.format(first, last, self.length_unlocked), headers)
+            self.assertEqual(part_data, data[first:last + 1])
+
+    def test_range_request_overlapping_ranges(self):
+        """
+        Test that overlapping ranges adding up to more than the content output the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-, 0-')
 
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
         self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
 
+    def test_etag(self):
+        """
+        Test that assets have an ETag, and that clients having the current version get a 304.
+        """
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+        self.assertEqual(etag, '"{}"'.format(self.contentstore.find(self.unlocked_asset).content_digest))
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", {}'.format(etag))
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+        self.assertEqual(self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='W/' + etag).status_code, 304)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(resp.status_code, 200)
+
+    @ddt.data(
+        (0, 304),
+        (3600, 304),
+        (-3600, 200),
+    )
+    @ddt.unpack
+    def test_if_modified_since(self, delta, status_code):
+        """
+        Test that If-Modified-Since dates are compared to the modification date of the asset.
+        """
+        resp = self.client.get(self.url_unlocked)
+        last_modified_at = parse_http_date(resp['Last-Modified'])
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=http_date(last_modified_at + delta))
+        self.assertEqual(resp.status_code, status_code)
+
+    def test_cache_control(self):
+        """
+        Test that only unlocked assets can be cached publicly.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=3600')
+
+        with override_settings(STATIC_CONTENT_CACHE_MAX_AGE={'text/plain': 60, 'text': 30, 'default': 10}):
+            resp = self.client.get(self.url_unlocked)
+            self.assertEqual(resp['Cache-Control'], 'public, max-age=60')
+
+        self.client.login(username=self.staff_usr, password=self.staff_pwd)
+        resp = self.client.get(self.url_locked)
+        self.assertEqual(resp['Cache-Control'], 'private, no-cache')
+
+    def test_disk_cache(self):
+        """
+        Test that assets too large for memcached are served from the disk cache,
+        with the same validators as when they are read from the contentstore.
+        """
+        cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_root)
+        # Make sure the asset isn't in memcached already, and isn't left there
+        del_cached_content(self.unlocked_asset)
+        self.addCleanup(del_cached_content, self.unlocked_asset)
+
+        with override_settings(STATIC_CONTENT_DISK_CACHE_ROOT=cache_root):
+            with patch('contentserver.middleware.MAX_CACHED_CONTENT_SIZE', 0):
+                resp = self.client.get(self.url_unlocked)
+                self.assertEqual(resp.status_code, 200)
+                data = resp.content
+                etag = resp['ETag']
+                self.assertEqual(len(os.listdir(cache_root)), 1)
+
+                with patch('contentserver.middleware.AssetManager.find') as mock_find:
+                    resp = self.client.get(self.url_unlocked)
+                    self.assertEqual(resp.content, data)
+                    self.assertEqual(resp['ETag'], etag)
+                    self.assertEqual(resp['Cache-Control'], 'public, max-age=3600')
+                    resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-3')
+                    self.assertEqual(resp.status_code, 206)
+                    self.assertEqual(resp.content, data[1:4])
+                    resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(resp.status_code, 304)
+                self.assertFalse(mock_find.called)
+
     @ddt.data(
         'bytes 0-',
         'bits=0-',
@@ -193,6 +308,63 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         self.assertEqual(resp.status_code, 416)
 
 
+class AssetDiskCacheTestCase(unittest.TestCase):
+    """
+    Tests for AssetDiskCache.
+    """
+
+    def setUp(self):
+        super(AssetDiskCacheTestCase, self).setUp()
+        self.cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_root)
+        self.course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+
+    def make_content(self, name, data):
+        """
+        Return an asset named `name`, streaming `data`.
+        """
+        return StaticContentStream(
+            self.course_key.make_asset_key('asset', name), name, 'text/plain', StringIO(data),
+            last_modified_at=datetime(2015, 1, 1), length=len(data)
+        )
+
+    def test_get_and_add(self):
+        cache = AssetDiskCache(self.cache_root, 100)
+        content = self.make_content('a.txt', 'abcdefghij')
+        self.assertIsNone(cache.get(content))
+
+        cached = cache.add(content)
+        self.assertIsInstance(cached, StaticContentFile)
+        for cached in (cached, cache.get(content)):
+            self.assertEqual(''.join(cached.stream_data()), 'abcdefghij')
+            self.assertEqual(''.join(cached.stream_data_in_range(2, 4)), 'cde')
+
+        # The path of the file isn't pickled
+        self.assertIsNone(pickle.loads(pickle.dumps(cached)).path)
+
+        # A modified asset isn't served from the file of its previous version
+        content.last_modified_at = datetime(2015, 2, 1)
+        self.assertIsNone(cache.get(content))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = AssetDiskCache(self.cache_root, 25)
+        contents = [self.make_content('{}.txt'.format(i), str(i) * 10) for i in range(3)]
+        cache.add(contents[0])
+        cache.add(contents[1])
+        os.utime(cache._path(contents[1]), (0, 0))  # pylint: disable=protected-access
+        cache.add(contents[2])
+
+        self.assertIsNotNone(cache.get(contents[0]))
+        self.assertIsNone(cache.get(contents[1]))
+        self.assertIsNotNone(cache.get(contents[2]))
+
+    def test_too_large(self):
+        cache = AssetDiskCache(self.cache_root, 5)
+        content = self.make_content('a.txt', 'abcdefghij')
+        self.assertIs(cache.add(content), content)
+        self.assertEqual(os.listdir(self.cache_root), [])
+
+
 @ddt.ddt
 class ParseRangeHeaderTestCase(unittest.TestCase):
     """
@@ -95,3 +95,30 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_many(self, events):
+        """
+        Insert the events in to the Mongo collection at once. An event which
+        can't be inserted doesn't prevent the following ones from being inserted.
+        """
+        try:
+            self.collection.insert(events, manipulate=False, continue_on_error=True)
+        except PyMongoError as exc:
+            log.exception(
+                'Error inserting %d of %d events to MongoDB event tracker backend',
+                _count_failed_inserts(exc, len(events)),
+                len(events)
+            )
+
+
+def _count_failed_inserts(exception, count):
+    """
+    Return how many of the `count` documents of an insert failed with
+    `exception`, as reported by MongoDB, or `count` if it isn't known.
+    """
+    details = getattr(exception, 'details', None) or {}
+    if 'writeErrors' in details:
+        return len(details['writeErrors'])
+    if 'nInserted' in details:
+        return count - details['nInserted']
+    return count
@@ -0,0 +1,150 @@
+"""
+Event tracker backend that sends the events to another backend from a
+background thread, so that tracking doesn't slow down the requests.
+
+Wrap any backend with it in the tracking configuration::
+
+  TRACKING_BACKENDS = {
+      'logger': {
+          'ENGINE': 'track.backends.queued.QueuedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.logger.LoggerBackend',
+                  'OPTIONS': {'name': 'tracking'},
+              },
+              'max_queue_size': 10000,
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import threading
+from Queue import Queue, Empty, Full
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+
+class QueuedBackend(BaseBackend):
+    """
+    Event tracker backend which queues the events, and sends them to the
+    wrapped backend in batches, from a background thread.
+
+    The events are sent to the wrapped backend as they are, so they must not
+    be modified once they have been sent.
+
+    """
+
+    def __init__(self, backend, max_queue_size=10000, batch_size=100, flush_interval=1.0, put_timeout=0, **kwargs):
+        """
+        :Parameters:
+
+          - `backend`: the configuration of the wrapped backend, as a
+            dictionary with the `ENGINE` and `OPTIONS` keys
+          - `max_queue_size`: how many events can wait to be sent
+          - `batch_size`: how many events are sent to the wrapped backend
+            at once, at most
+          - `flush_interval`: how many seconds an event can wait for a
+            batch to fill up before it is sent
+          - `put_timeout`: how many seconds to wait for room in the queue
+            when it is full, before dropping the event (0 to drop it
+            right away)
+
+        """
+        super(QueuedBackend, self).__init__(**kwargs)
+
+        # Import here to avoid circular import.
+        from track.tracker import _instantiate_backend_from_name
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+        self.backend_name = backend['ENGINE'].split('.')[-1]
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.queue = Queue(max_queue_size)
+
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._worker = None
+        self._pid = None
+
+    def send(self, event):
+        """Queue the event, or drop it if the queue stays full."""
+        self._ensure_worker()
+        try:
+            if self.put_timeout:
+                self.queue.put(event, timeout=self.put_timeout)
+            else:
+                self.queue.put_nowait(event)
+        except Full:
+            dog_stats_api.increment('track.queued.dropped', tags=['backend:{}'.format(self.backend_name)])
+
+    def _ensure_worker(self):
+        """Start the background thread of this process, if needed."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Threads don't survive a fork, so each process starts its own.
+            self._start_worker()
+            self._pid = os.getpid()
+
+    def _start_worker(self):
+        """Start the background thread sending the queued events."""
+        self._worker = threading.Thread(target=self._run, name='track-{}'.format(self.backend_name))
+        self._worker.daemon = True
+        self._worker.start()
+        atexit.register(self._stop_worker)
+
+    def _stop_worker(self):
+        """Stop the background thread, and send the events it left in the queue."""
+        self._stopping.set()
+        self._worker.join(self.flush_interval * 2)
+        self.flush()
+
+    def _run(self):
+        """Send the queued events, until the process exits."""
+        while not self._stopping.is_set():
+            try:
+                self._send_batch(self.queue.get(timeout=self.flush_interval))
+            except Empty:
+                pass
+
+    def flush(self):
+        """Send all the queued events."""
+        while True:
+            try:
+                event = self.queue.get_nowait()
+            except Empty:
+                return
+            self._send_batch(event)
+
+    def _send_batch(self, event):
+        """Send `event`, along with the other queued events that fit in its batch."""
+        events = [event]
+        while len(events) < self.batch_size:
+            try:
+                events.append(self.queue.get_nowait())
+            except Empty:
+                break
+
+        tags = ['backend:{}'.format(self.backend_name)]
+        dog_stats_api.histogram('track.queued.batch_size', len(events), tags=tags)
+        try:
+            with dog_stats_api.timer('track.queued.send', tags=tags):
+                self.backend.send_many(events)
+        except Exception:  # pylint: disable=broad-except
+            # Keep the thread running, whatever the backend does.
+            log.exception('Error sending %d events to %s', len(events), self.backend_name)
+            dog_stats_api.increment('track.queued.failed', len(events), tags=tags)
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 from mock import patch
+from pymongo.errors import OperationFailure
 
 from django.test import TestCase
 
@@ -36,3 +37,24 @@ class TestMongoBackend(TestCase):
 
         self.assertEqual(events[0], first_argument(calls[0]))
         self.assertEqual(events[1], first_argument(calls[1]))
+
+    def test_mongo_backend_send_many(self):
+        events = [{'test': 1}, {'test': 2}]
+
+        self.backend.send_many(events)
+
+        # The events are inserted at once
+        self.backend.collection.insert.assert_called_once_with(events, manipulate=False, continue_on_error=True)
+
+    def test_mongo_backend_send_many_errors(self):
+        events = [{'test': 1}, {'test': 2}, {'test': 3}]
+        self.backend.collection.insert.side_effect = OperationFailure(
+            'E11000 duplicate key error', 11000, {'nInserted': 1, 'writeErrors': [{'index': 0}, {'index': 2}]}
+        )
+
+        with patch('track.backends.mongodb.log') as mock_log:
+            self.backend.send_many(events)
+
+        mock_log.exception.assert_called_once_with(
+            'Error inserting %d of %d events to MongoDB event tracker backend', 2, 3
+        )
@@ -0,0 +1,66 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from django.test import TestCase
+
+from track.backends import BaseBackend
+from track.backends.queued import QueuedBackend
+
+
+class RecordingBackend(BaseBackend):
+    """Backend recording the batches of events it is sent."""
+    batches = []
+
+    def send(self, event):
+        self.send_many([event])
+
+    def send_many(self, events):
+        self.batches.append(list(events))
+
+
+class TestQueuedBackend(TestCase):
+    def setUp(self):
+        RecordingBackend.batches = []
+        # Send the events when the tests flush them, rather than from a thread.
+        patcher = patch.object(QueuedBackend, '_start_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_backend(self, **options):
+        return QueuedBackend(
+            backend={'ENGINE': 'track.backends.tests.test_queued.RecordingBackend'},
+            **options
+        )
+
+    def test_events_sent_in_batches(self):
+        backend = self.get_backend(batch_size=2)
+        events = [{'test': i} for i in range(3)]
+        for event in events:
+            backend.send(event)
+        self.assertEqual(RecordingBackend.batches, [])
+
+        backend.flush()
+        self.assertEqual(RecordingBackend.batches, [events[:2], events[2:]])
+
+    @patch('track.backends.queued.dog_stats_api')
+    def test_events_dropped_when_queue_full(self, mock_dog_stats_api):
+        backend = self.get_backend(max_queue_size=2)
+        events = [{'test': i} for i in range(3)]
+        for event in events:
+            backend.send(event)
+        mock_dog_stats_api.increment.assert_called_once_with(
+            'track.queued.dropped', tags=['backend:RecordingBackend']
+        )
+
+        backend.flush()
+        self.assertEqual(RecordingBackend.batches, [events[:2]])
+
+    def test_backend_errors_are_not_raised(self):
+        backend = self.get_backend()
+        backend.send({'test': 1})
+        with patch.object(RecordingBackend, 'send_many', side_effect=Exception):
+            backend.flush()
+        backend.send({'test': 2})
+        backend.flush()
+        self.assertEqual(RecordingBackend.batches, [[{'test': 2}]])
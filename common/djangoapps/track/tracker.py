@@ -16,6 +16,10 @@ below::
       }
   }
 
+To keep the backends from slowing down the requests, wrap them with
+`track.backends.queued.QueuedBackend`, which sends the events to them in
+batches from a background thread.
+
 """
 
 import inspect
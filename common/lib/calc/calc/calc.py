@@ -7,6 +7,9 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -200,6 +203,94 @@ def eval_product(parse_result):
     return prod
 
 
+# The following evaluation actions do the same as those above, but accept numpy
+# arrays (of the values of an expression for several samples) as well as numbers.
+
+def _operands(parse_result):
+    """
+    Return the numbers and arrays of the list, leaving out the operators.
+    """
+    return [k for k in parse_result if not isinstance(k, basestring)]
+
+
+def eval_atom_array(parse_result):
+    """
+    Return the value wrapped by the atom.
+    """
+    return _operands(parse_result)[0]
+
+
+def eval_power_array(parse_result):
+    """
+    Exponentiate the inputs, right to left.
+    """
+    return reduce(lambda a, b: b ** a, reversed(_operands(parse_result)))
+
+
+def eval_parallel_array(parse_result):
+    """
+    Compute the inputs according to the parallel resistors operator.
+
+    The result is NaN where there is a zero among the inputs.
+    """
+    if len(parse_result) == 1:
+        return parse_result[0]
+    operands = _operands(parse_result)
+    has_zero = reduce(numpy.logical_or, [numpy.equal(operand, 0) for operand in operands])
+    # Only divide by the non-zero inputs, so that zeros don't raise
+    safe_operands = [numpy.where(has_zero, 1., operand) for operand in operands]
+    return numpy.where(has_zero, float('nan'), 1. / sum(1. / operand for operand in safe_operands))
+
+
+def eval_sum_array(parse_result):
+    """
+    Add the inputs, keeping in mind their sign.
+    """
+    total = 0.0
+    current_op = operator.add
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.sub if token == '-' else operator.add
+        else:
+            total = current_op(total, token)
+    return total
+
+
+def eval_product_array(parse_result):
+    """
+    Multiply the inputs.
+    """
+    prod = 1.0
+    current_op = operator.mul
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.truediv if token == '/' else operator.mul
+        else:
+            prod = current_op(prod, token)
+    return prod
+
+
+VECTORIZED_ACTIONS = {
+    'atom': eval_atom_array,
+    'power': eval_power_array,
+    'parallel': eval_parallel_array,
+    'product': eval_product_array,
+    'sum': eval_sum_array
+}
+
+# The default functions which accept arrays, and compute the same thing as for
+# each of their elements.
+VECTORIZED_FUNCTIONS = frozenset(
+    function for function in DEFAULT_FUNCTIONS.values()
+    if isinstance(function, numpy.ufunc)
+) | frozenset([
+    functions.sec, functions.csc, functions.cot,
+    functions.arcsec, functions.arccsc,
+    functions.sech, functions.csch, functions.coth,
+    functions.arcsech, functions.arccsch, functions.arccoth,
+])
+
+
 def add_defaults(variables, functions, case_sensitive):
     """
     Create dictionaries with both the default and user-defined variables.
@@ -228,34 +319,301 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
+def evaluate_samples(samples, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each dictionary of variables of `samples`, and
+    return the list of the results.
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
+    Equivalent to calling `evaluator` once per sample, but the samples are
+    evaluated all at once (see `CompiledExpression.evaluate_samples`).
+    """
+    # No need to go further.
+    if math_expr.strip() == "":
+        return [float('nan')] * len(samples)
 
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
+    return compile_expression(math_expr, case_sensitive).evaluate_samples(samples, functions)
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+
+class LRUCache(object):
+    """
+    A thread safe dict-like cache of at most `max_size` items, which evicts the
+    least recently used ones.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the value cached for `key`, or None.
+        """
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is not None:
+                # Re-insert it, to mark it as the most recently used
+                self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Cache `value` for `key`.
+        """
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Empty the cache.
+        """
+        with self._lock:
+            self._items.clear()
+
+
+# The number of distinct expressions whose parse (and compilation) is cached.
+EXPRESSION_CACHE_SIZE = 1024
+
+# Parse trees of expression strings: math_expr -> (tree, variables_used, functions_used)
+_PARSE_CACHE = LRUCache(EXPRESSION_CACHE_SIZE)
+
+# Compiled expressions: (math_expr, case_sensitive) -> CompiledExpression
+_COMPILE_CACHE = LRUCache(EXPRESSION_CACHE_SIZE)
+
+
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return a `CompiledExpression` for `math_expr`, which can then be evaluated
+    with many different variables.
+
+    Raise a `pyparsing.ParseException` if `math_expr` isn't a valid expression.
+    """
+    key = (math_expr, case_sensitive)
+    compiled = _COMPILE_CACHE.get(key)
+    if compiled is None:
+        compiled = CompiledExpression(math_expr, case_sensitive)
+        _COMPILE_CACHE.set(key, compiled)
+    return compiled
+
+
+class CompiledExpression(object):
+    """
+    A parsed math expression, ready to be evaluated.
+
+    The parse tree is converted to nested `(node_name, children)` tuples, with
+    the numbers already converted to floats and the names of the variables
+    and functions already casified, so that evaluating it only has to look up
+    the variables and do the arithmetic.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        self.math_expr = math_expr
+        self.case_sensitive = case_sensitive
+
+        parser = ParseAugmenter(math_expr, case_sensitive)
+        parser.parse_algebra()
+        self.variables_used = frozenset(parser.variables_used)
+        self.functions_used = frozenset(parser.functions_used)
+        self._parser = parser
+        self._tree = self._compile_node(parser.tree)
+
+    def _casify(self, name):
+        """
+        Return the name under which the variable or function `name` is looked up.
+        """
+        return name if self.case_sensitive else name.lower()
+
+    def _compile_node(self, node):
+        """
+        Return the compiled form of the parse tree `node`.
+        """
+        if not isinstance(node, ParseResults):
+            return node
+
+        node_name = node.getName()
+        if node_name == 'number':
+            return eval_number(node)
+        elif node_name == 'variable':
+            return (node_name, self._casify(node[0]))
+        elif node_name == 'function':
+            return (node_name, (self._casify(node[0]), self._compile_node(node[1])))
+        else:
+            return (node_name, tuple(self._compile_node(kid) for kid in node))
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression with the given variables and functions (on
+        top of the default ones), and return the result.
+
+        Raise an `UndefinedVariable` if the expression uses variables or
+        functions which aren't defined.
+        """
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        self._parser.check_variables(all_variables, all_functions)
+
+        actions = {
+            'atom': eval_atom,
+            'power': eval_power,
+            'parallel': eval_parallel,
+            'product': eval_product,
+            'sum': eval_sum
+        }
+
+        def evaluate_node(node):
+            """
+            Return the value of the compiled `node`.
+            """
+            if not isinstance(node, tuple):
+                # A number or an operator
+                return node
+
+            node_name, kids = node
+            if node_name == 'variable':
+                return all_variables[kids]
+            elif node_name == 'function':
+                function_name, argument = kids
+                return all_functions[function_name](evaluate_node(argument))
+            return actions[node_name]([evaluate_node(kid) for kid in kids])
+
+        return evaluate_node(self._tree)
+
+    def evaluate_samples(self, samples, functions):
+        """
+        Evaluate the expression for each dictionary of variables of `samples`
+        (with the given functions), and return the list of the results.
+
+        When it can, the expression is evaluated only once, over arrays of the
+        values of the variables in all the samples. This is only done when the
+        result is exactly what evaluating each sample would give: when all the
+        functions used are vectorized numpy functions, and no floating point
+        error (e.g. a division by zero, which raises for python floats) nor
+        infinite or nan result happens. Otherwise, each sample is evaluated
+        on its own, which raises the same errors as `evaluate`.
+        """
+        if not samples:
+            return []
+
+        all_variables, all_functions = add_defaults(samples[0], functions, self.case_sensitive)
+        self._parser.check_variables(all_variables, all_functions)
+
+        results = None
+        if all(all_functions[self._casify(name)] in VECTORIZED_FUNCTIONS for name in self.functions_used):
+            try:
+                results = self._evaluate_arrays(samples, functions)
+            except Exception:  # pylint: disable=broad-except
+                results = None
+
+        if results is None:
+            results = [self.evaluate(variables, functions) for variables in samples]
+        return results
+
+    def _evaluate_arrays(self, samples, functions):
+        """
+        Evaluate the expression over arrays of the values of the variables in
+        all the samples, and return the list of the results, or None if they
+        may differ from those of evaluating each sample.
+        """
+        names = set(samples[0])
+        if any(set(variables) != names for variables in samples):
+            return None
+        arrays = {name: numpy.array([variables[name] for variables in samples]) for name in names}
+        all_variables, all_functions = add_defaults(arrays, functions, self.case_sensitive)
+
+        def evaluate_node(node):
+            """
+            Return the value (scalar or array) of the compiled `node`.
+            """
+            if not isinstance(node, tuple):
+                # A number or an operator
+                return node
+
+            node_name, kids = node
+            if node_name == 'variable':
+                return all_variables[kids]
+            elif node_name == 'function':
+                function_name, argument = kids
+                return all_functions[function_name](evaluate_node(argument))
+            return VECTORIZED_ACTIONS[node_name]([evaluate_node(kid) for kid in kids])
+
+        with numpy.errstate(all='raise'):
+            result = evaluate_node(self._tree)
+            if not numpy.all(numpy.isfinite(result)):
+                return None
+
+        if numpy.ndim(result) == 0:
+            return [result] * len(samples)
+        return list(result)
+
+
+def _build_grammar():
+    """
+    Return the pyparsing grammar of math expressions.
+
+    The tree it parses has proper groupings to reflect parenthesis and order of
+    operations. All operators are left in the tree, and strings of numbers
+    aren't parsed into their float versions.
+    """
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with letters/underscores
+    # and may contain numbers afterward.
+    inner_varname = Word(alphas + "_", alphanums + "_")
+    varname = Group(inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=pointless-statement
+    grammar = expr + stringEnd
+    grammar.streamline()
+    return grammar
+
+
+# The grammar is built once per process; parsing with it is serialized, since
+# pyparsing elements aren't meant to be used by several threads at once.
+_GRAMMAR = _build_grammar()
+_GRAMMAR_LOCK = threading.Lock()
 
 
 class ParseAugmenter(object):
@@ -278,23 +636,6 @@ class ParseAugmenter(object):
         self.variables_used = set()
         self.functions_used = set()
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
-
     def parse_algebra(self):
         """
         Parse an algebraic expression into a tree.
@@ -302,62 +643,44 @@ class ParseAugmenter(object):
         Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
         reflect parenthesis and order of operations. Leave all operators in the
         tree and do not parse any strings of numbers into their float versions.
+        Also store the names of the variables and functions it uses.
+
+        The parses of the most recently used expressions are cached, and must
+        not be modified.
 
         Adding the groups and result names makes the `repr()` of the result
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with letters/underscores
-        # and may contain numbers afterward.
-        inner_varname = Word(alphas + "_", alphanums + "_")
-        varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        parsed = _PARSE_CACHE.get(self.math_expr)
+        if parsed is None:
+            with _GRAMMAR_LOCK:
+                tree = _GRAMMAR.parseString(self.math_expr)[0]
+            variables_used, functions_used = set(), set()
+            self._collect_names(tree, variables_used, functions_used)
+            parsed = (tree, frozenset(variables_used), frozenset(functions_used))
+            _PARSE_CACHE.set(self.math_expr, parsed)
+
+        self.tree = parsed[0]
+        self.variables_used = set(parsed[1])
+        self.functions_used = set(parsed[2])
+
+    @classmethod
+    def _collect_names(cls, node, variables_used, functions_used):
+        """
+        Add the names of the variables and functions used in the parse tree
+        `node` to `variables_used` and `functions_used`.
+        """
+        if not isinstance(node, ParseResults):
+            return
+
+        node_name = node.getName()
+        if node_name == 'variable':
+            variables_used.add(node[0])
+        elif node_name == 'function':
+            functions_used.add(node[0])
+        for kid in node:
+            cls._collect_names(kid, variables_used, functions_used)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
@@ -559,3 +559,85 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class CompileExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and the caching of parsed expressions
+    """
+
+    def test_evaluate_many_variables(self):
+        """
+        A compiled expression can be evaluated with different variables
+        """
+        compiled = calc.compile_expression('x^2 + 3*y + sin(0)')
+        self.assertEqual(compiled.variables_used, frozenset(['x', 'y']))
+        self.assertEqual(compiled.functions_used, frozenset(['sin']))
+        for x_value, y_value in [(1, 2), (3, 4), (-1.5, 0)]:
+            self.assertEqual(
+                compiled.evaluate({'x': x_value, 'y': y_value}, {}),
+                calc.evaluator({'x': x_value, 'y': y_value}, {}, 'x^2 + 3*y + sin(0)')
+            )
+
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            compiled.evaluate({'x': 1}, {})
+
+    def test_compiled_expressions_are_cached(self):
+        """
+        Compiling the same expression again doesn't parse it again
+        """
+        self.assertIs(calc.compile_expression('1+2*3'), calc.compile_expression('1+2*3'))
+        self.assertIsNot(
+            calc.compile_expression('1+2*3'),
+            calc.compile_expression('1+2*3', case_sensitive=True)
+        )
+
+        first_parse = calc.ParseAugmenter('4*z')
+        first_parse.parse_algebra()
+        second_parse = calc.ParseAugmenter('4*z')
+        second_parse.parse_algebra()
+        self.assertIs(first_parse.tree, second_parse.tree)
+        self.assertEqual(second_parse.variables_used, set(['z']))
+
+    def test_invalid_expressions_are_not_cached(self):
+        """
+        Parse errors are raised every time
+        """
+        for __ in range(2):
+            with self.assertRaises(ParseException):
+                calc.compile_expression('1+*2')
+
+    def test_lru_cache(self):
+        """
+        The least recently used items are evicted
+        """
+        cache = calc.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_evaluate_samples(self):
+        """
+        Evaluating samples at once gives the same results as one by one
+        """
+        samples = [{'x': value, 'y': value / 2} for value in numpy.linspace(-5, 5, 11)]
+        for expression in ['x^2 + 3*y', 'sin(x) + sqrt(x)*i', 'x || y', 'fact(3)*x', 'x^0.5', '', '7k']:
+            expected = [calc.evaluator(variables, {}, expression) for variables in samples]
+            results = calc.evaluate_samples(samples, {}, expression)
+            self.assertEqual(len(results), len(expected))
+            for result, expected_result in zip(results, expected):
+                if numpy.isnan(expected_result):
+                    self.assertTrue(numpy.isnan(result))
+                else:
+                    self.assertAlmostEqual(result, expected_result)
+
+        # Errors are raised like when evaluating each sample
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples([{'x': 1.0}, {'x': 2.0}], {}, 'x/0')
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.evaluate_samples(samples, {}, 'x*z')
+        self.assertEqual(calc.evaluate_samples([], {}, 'x'), [])
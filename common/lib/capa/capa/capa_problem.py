@@ -13,11 +13,14 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from pytz import UTC
@@ -58,6 +61,73 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# default number of parsed problems kept by a ParsedProblemCache
+PARSED_PROBLEM_CACHE_SIZE = 256
+
+
+class ParsedProblemCache(object):
+    """
+    A process-local cache of the parts of a parsed problem which don't depend on
+    the student: the XML tree, and the context computed by the problem scripts.
+
+    Entries are keyed by (problem id, hash of the problem text, seed). Scripts are
+    run once per key, so problems whose script uses `anonymous_student_id` are
+    only reused for the same student. When `max_entries` entries are cached, the
+    least recently used ones are evicted.
+
+    Entries are copied in and out of the cache, since problems modify their tree
+    and context while they are being graded and rendered.
+    """
+    def __init__(self, max_entries=PARSED_PROBLEM_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(problem_id, problem_text, seed):
+        """
+        Return the cache key of the problem `problem_id` with the given text and seed.
+        """
+        if isinstance(problem_text, unicode):
+            problem_text = problem_text.encode('utf-8')
+        return (problem_id, hashlib.sha1(problem_text).hexdigest(), seed)
+
+    def get(self, key, anonymous_student_id):
+        """
+        Return a copy of the (tree, context) cached under `key` for this
+        student, or None.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            # Re-insert the entry, to mark it as the most recently used
+            self._entries[key] = entry
+
+        tree, context, student_id = entry
+        if student_id is not None and student_id != anonymous_student_id:
+            return None
+        return deepcopy(tree), deepcopy(context)
+
+    def set(self, key, tree, context, anonymous_student_id=None):
+        """
+        Cache a copy of `tree` and `context` under `key`. If the context was
+        computed for a specific student, pass their `anonymous_student_id`.
+        """
+        entry = (deepcopy(tree), deepcopy(context), anonymous_student_id)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Empty the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -73,6 +143,8 @@ class LoncapaSystem(object):
     Attributes:
         i18n: an object implementing the `gettext.Translations` interface so
             that we can use `.ugettext` to localize strings.
+        problem_cache: a `ParsedProblemCache` used to share the parsed problem
+            between students, or None to parse it every time.
 
     See :class:`ModuleSystem` for documentation of other attributes.
 
@@ -92,7 +164,8 @@ class LoncapaSystem(object):
         seed,      # Why do we do this if we have self.seed?
         STATIC_URL,                                     # pylint: disable=invalid-name
         xqueue,
-        matlab_api_key=None
+        matlab_api_key=None,
+        problem_cache=None,
     ):
         self.ajax_url = ajax_url
         self.anonymous_student_id = anonymous_student_id
@@ -108,6 +181,7 @@ class LoncapaSystem(object):
         self.STATIC_URL = STATIC_URL                    # pylint: disable=invalid-name
         self.xqueue = xqueue
         self.matlab_api_key = matlab_api_key
+        self.problem_cache = problem_cache
 
 
 class LoncapaProblem(object):
@@ -159,14 +233,9 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
-
-        # construct script processor context (eg for customresponse problems)
-        self.context = self._extract_context(self.tree)
+        # parse problem XML file into an element tree, and construct script processor
+        # context (eg for customresponse problems)
+        self.tree, self.context = self._parse_problem(problem_text)
 
         # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
         # transformations.  This also creates the dict (self.responders) of Response
@@ -529,6 +598,39 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
+    def _parse_problem(self, problem_text):
+        """
+        Parse `problem_text`, and run its scripts.
+
+        Returns the (tree, context) of the problem, from the capa_system's
+        problem_cache when it has them.
+        """
+        problem_cache = self.capa_system.problem_cache
+        anonymous_student_id = self.capa_system.anonymous_student_id
+        if problem_cache is not None:
+            cache_key = problem_cache.make_key(self.problem_id, problem_text, self.seed)
+            cached = problem_cache.get(cache_key, anonymous_student_id)
+            if cached is not None:
+                tree, context = cached
+                context['anonymous_student_id'] = anonymous_student_id
+                return tree, context
+
+        self.tree = etree.XML(problem_text)
+
+        # handle any <include file="foo"> tags
+        has_includes = bool(self.tree.findall('.//include'))
+        self._process_includes()
+
+        context = self._extract_context(self.tree)
+
+        # Included files can change without the problem text changing, so
+        # problems including files aren't cached.
+        if problem_cache is not None and not has_includes:
+            student_id = anonymous_student_id if 'anonymous_student_id' in context['script_code'] else None
+            problem_cache.set(cache_key, self.tree, context, student_id)
+
+        return self.tree, context
+
     def _process_includes(self):
         """
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
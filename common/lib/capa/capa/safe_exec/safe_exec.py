@@ -4,6 +4,7 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from .worker_pool import WorkerPool
 from dogapi import dog_stats_api
 
 import hashlib
@@ -46,6 +47,31 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The modules imported by the sandbox workers when they start, so that the code
+# they run doesn't have to.
+PRELOADED_MODULES = ["random"] + [modname for _, modname in ASSUMED_IMPORTS] + ["sympy"]
+
+# The pool of sandbox workers running jailed code, or None to start a new
+# sandbox for every piece of code.  See `configure_worker_pool`.
+WORKER_POOL = None
+
+
+def configure_worker_pool(size, command=None):
+    """
+    Run jailed code in a pool of `size` warm sandbox workers, or in a new
+    sandbox every time if `size` is 0.
+
+    `command` starts the sandbox Python of the workers; by default, it's the
+    one CodeJail is configured with.
+
+    Returns the new pool, if any.
+    """
+    global WORKER_POOL  # pylint: disable=global-statement
+    if WORKER_POOL is not None:
+        WORKER_POOL.close()
+    WORKER_POOL = WorkerPool(size, command=command, preload=PRELOADED_MODULES) if size else None
+    return WORKER_POOL
+
 
 def update_hash(hasher, obj):
     """
@@ -109,11 +135,7 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        key = _cache_key(code, globals_dict, random_seed)
         cached = cache.get(key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
@@ -130,6 +152,8 @@ def safe_exec(
     # Decide which code executor to use.
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif WORKER_POOL is not None and WORKER_POOL.is_available():
+        exec_fn = WORKER_POOL.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -153,3 +177,14 @@ def safe_exec(
     # If an exception happened, raise it now.
     if emsg:
         raise e
+
+
+def _cache_key(code, globals_dict, random_seed):
+    """
+    Return the key caching the result of running `code` with these globals and seed.
+    """
+    safe_globals = json_safe(globals_dict)
+    md5er = hashlib.md5()
+    md5er.update(repr(code))
+    update_hash(md5er, safe_globals)
+    return "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
@@ -4,12 +4,14 @@ import hashlib
 import os
 import os.path
 import random
+import sys
 import textwrap
 import unittest
 
+from mock import patch
 from nose.plugins.skip import SkipTest
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import configure_worker_pool, safe_exec, update_hash
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -177,6 +179,63 @@ class TestSafeExecCaching(unittest.TestCase):
                 self.fail("Tried executing code with non-ASCII unicode: {0}".format(code))
 
 
+class TestWorkerPool(unittest.TestCase):
+    """Test running code in a pool of warm workers."""
+
+    def setUp(self):
+        super(TestWorkerPool, self).setUp()
+        # Our own interpreter stands in for the sandbox Python.
+        self.pool = configure_worker_pool(2, command=[sys.executable, '-E', '-B'])
+        self.addCleanup(configure_worker_pool, 0)
+
+    def test_safe_exec(self):
+        g = {}
+        r = random.Random(17)
+        safe_exec("a = int(math.pi); rnums = [random.randint(0, 999) for _ in xrange(10)]", g, random_seed=17)
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(g['rnums'], [r.randint(0, 999) for _ in xrange(10)])
+
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec("1/0", g)
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_python_lib(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        safe_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib])
+        self.assertEqual(g['a'], 23)
+
+    def test_code_runs_in_its_own_process(self):
+        safe_exec("math.pi = 3", {})
+        g = {}
+        safe_exec("a = math.pi > 3", g)
+        self.assertTrue(g['a'])
+
+    def test_failed_worker_is_replaced(self):
+        g = {}
+        safe_exec("a = 1", g)
+        for worker in self.pool._workers:  # pylint: disable=protected-access
+            worker.process.kill()
+            worker.process.wait()
+
+        safe_exec("a = 2", g)
+        self.assertEqual(g['a'], 2)
+        safe_exec("a = 3", g)
+        self.assertEqual(g['a'], 3)
+
+    def test_stopped_worker_is_killed(self):
+        # The code stops the worker running it, so the worker never answers.
+        code = "import os, signal; os.kill(os.getppid(), signal.SIGSTOP)"
+        with patch('capa.safe_exec.worker_pool.codejail_safe_exec') as codejail_safe_exec:
+            safe_exec(code, {})
+        self.assertTrue(codejail_safe_exec.called)
+        self.assertEqual(self.pool._workers, [])  # pylint: disable=protected-access
+
+        g = {}
+        safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+
+
 class TestUpdateHash(unittest.TestCase):
     """Test the safe_exec.update_hash function to be sure it canonicalizes properly."""
 
@@ -0,0 +1,390 @@
+"""
+A pool of warm sandbox workers, to run jailed code without starting a new
+Python interpreter for every piece of code.
+
+Each worker is a long-running sandboxed Python process (started with the
+command configured for CodeJail), which imports the modules used by problems
+once. For every piece of code it receives, the worker forks a child, which
+applies the CodeJail limits to itself, runs the code and reports its globals
+back. Every piece of code still runs in a process of its own, so code can't
+affect the code run after it, but the children start with the interpreter and
+the preloaded modules ready.
+"""
+from Queue import Queue, Empty
+import json
+import logging
+import os
+import os.path
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException, json_safe
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+
+log = logging.getLogger(__name__)
+
+# How many seconds past the REALTIME limit of the code, which the workers
+# enforce themselves, to wait for a worker before deciding it is stuck.
+WORKER_TIMEOUT_MARGIN = 2
+
+# The code run by the sandbox workers. It reads one job per line on stdin, and
+# writes one result per line on stdout.
+WORKER_CODE = r"""
+import json, os, resource, select, shutil, signal, sys, tempfile, time, traceback
+
+for module_name in %(preload)r:
+    try:
+        __import__(module_name)
+    except Exception:
+        pass
+
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+BAD_KEYS = ("__builtins__",)
+RLIMITS = {"CPU": resource.RLIMIT_CPU, "VMEM": resource.RLIMIT_AS, "FSIZE": resource.RLIMIT_FSIZE}
+
+
+def jsonable(value):
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:
+        return False
+    return True
+
+
+def execute(job):
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.chdir(job["dir"])
+    os.environ["TMPDIR"] = os.path.join(job["dir"], "tmp")
+    tempfile.tempdir = None
+    for name, limit in job["limits"].items():
+        if name in RLIMITS and limit:
+            resource.setrlimit(RLIMITS[name], (limit, limit))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    for path in job["python_path"]:
+        sys.path.append(os.path.abspath(path))
+
+    g_dict = json.loads(job["globals"])
+    try:
+        exec compile(job["code"], "jailed_code", "exec") in g_dict
+    except Exception:
+        return {"emsg": "Couldn't execute jailed code: " + traceback.format_exc()}
+    return {"globals": dict((k, v) for k, v in g_dict.iteritems() if k not in BAD_KEYS and jsonable(v))}
+
+
+def run_job(job):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            try:
+                output = json.dumps(execute(job))
+            except BaseException:
+                output = json.dumps({"emsg": "Couldn't execute jailed code: " + traceback.format_exc()})
+            with os.fdopen(write_fd, "w") as result_file:
+                result_file.write(output)
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    realtime = job["limits"].get("REALTIME")
+    deadline = time.time() + realtime if realtime else None
+    chunks = []
+    while True:
+        timeout = max(deadline - time.time(), 0) if deadline is not None else None
+        ready, _, _ = select.select([read_fd], [], [], timeout)
+        if not ready:
+            os.kill(pid, signal.SIGKILL)
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    __, status = os.waitpid(pid, 0)
+
+    tmp_dir = os.path.join(job["dir"], "tmp")
+    for name in os.listdir(tmp_dir):
+        path = os.path.join(tmp_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+    try:
+        return json.loads("".join(chunks))
+    except ValueError:
+        return {"emsg": "Couldn't execute jailed code: exited with status %%d" %% status}
+
+
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    result = run_job(json.loads(line))
+    sys.stdout.write(json.dumps(result) + "\n")
+    sys.stdout.flush()
+"""
+
+
+class WorkerError(Exception):
+    """
+    A sandbox worker failed to run a job (as opposed to the job's code failing).
+    """
+    pass
+
+
+class Worker(object):
+    """
+    A sandbox worker process.
+    """
+    def __init__(self, command, preload):
+        # Like CodeJail, kill the processes of a sandbox run as another user with sudo.
+        self.sudo = command[:1] == ['sudo']
+        try:
+            self.process = subprocess.Popen(
+                command + ['-c', WORKER_CODE % {'preload': list(preload)}],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                close_fds=True,
+                # The worker leads a process group of its own, with the processes running its jobs.
+                preexec_fn=os.setsid,
+            )
+        except OSError as exc:
+            raise WorkerError(u'Failed to start a sandbox worker: {}'.format(exc))
+
+    def run(self, job, timeout=None):
+        """
+        Run `job` in the worker, and return its result. Raises WorkerError if
+        the worker fails, or doesn't answer within `timeout` seconds.
+        """
+        try:
+            self.process.stdin.write(json.dumps(job) + '\n')
+            self.process.stdin.flush()
+            line = self._read_line(timeout)
+        except (IOError, OSError, select.error) as exc:
+            raise WorkerError(u'Sandbox worker {} failed: {}'.format(self.process.pid, exc))
+        if not line.endswith('\n'):
+            raise WorkerError(u'Sandbox worker {} exited with status {}'.format(self.process.pid, self.process.poll()))
+        return json.loads(line)
+
+    def _read_line(self, timeout):
+        """
+        Read a line of the worker's output, or what the worker wrote before
+        exiting. Raises WorkerError if it takes more than `timeout` seconds.
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        stdout = self.process.stdout.fileno()
+        chunks = []
+        while True:
+            remaining = max(deadline - time.time(), 0) if deadline is not None else None
+            ready, __, __ = select.select([stdout], [], [], remaining)
+            if not ready:
+                raise WorkerError(u'Sandbox worker {} timed out after {}s'.format(self.process.pid, timeout))
+            chunk = os.read(stdout, 65536)
+            if not chunk:
+                return ''.join(chunks)
+            chunks.append(chunk)
+            if chunk.endswith('\n'):
+                return ''.join(chunks)
+
+    def kill(self):
+        """
+        Kill the worker, and the processes running its jobs.
+        """
+        try:
+            if self.sudo:
+                subprocess.call(['sudo', 'pkill', '-9', '-g', str(self.process.pid)])
+            else:
+                os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+    def close(self):
+        """
+        Stop the worker.
+        """
+        try:
+            self.process.stdin.close()
+            self.process.wait()
+        except (IOError, OSError):
+            pass
+
+
+class WorkerPool(object):
+    """
+    A pool of up to `size` sandbox workers, started the first time they are needed.
+
+    `command` is the command starting the sandbox Python (prefixed with sudo if
+    the sandbox runs as another user); by default, it's the command CodeJail
+    is configured with. `preload` is the list of the modules the workers import
+    when they start.
+    """
+    def __init__(self, size, command=None, preload=()):
+        self.size = size
+        self.command = command
+        self.preload = preload
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """
+        Forget all the workers.
+        """
+        self._pid = os.getpid()
+        self._workers = []
+        self._idle = Queue()
+
+    def _sandbox_command(self):
+        """
+        Return the command starting a sandbox worker, or None if there is no sandbox.
+        """
+        if self.command is not None:
+            return self.command
+        if not jail_code.is_configured('python'):
+            return None
+
+        config = jail_code.COMMANDS['python']
+        command = []
+        if config.get('user'):
+            command.extend(['sudo', '-u', config['user']])
+        command.extend(config['cmdline_start'])
+        return command
+
+    def is_available(self):
+        """
+        Return whether the pool can run code in the sandbox.
+        """
+        return self.size > 0 and self._sandbox_command() is not None
+
+    def _acquire(self):
+        """
+        Return an idle worker, starting it if needed.
+        """
+        while True:
+            with self._lock:
+                if self._pid != os.getpid():
+                    # We were forked: the workers belong to our parent.
+                    self._reset()
+                if self._idle.empty() and len(self._workers) < self.size:
+                    worker = Worker(self._sandbox_command(), self.preload)
+                    self._workers.append(worker)
+                    return worker
+            try:
+                # Don't wait forever, in case a worker is discarded meanwhile.
+                return self._idle.get(timeout=1)
+            except Empty:
+                pass
+
+    def _release(self, worker):
+        """
+        Make `worker` available to run other jobs.
+        """
+        self._idle.put(worker)
+
+    def _discard(self, worker):
+        """
+        Kill `worker`, which failed, so that it gets replaced.
+        """
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute code like `codejail.safe_exec.safe_exec`, in one of the workers.
+        """
+        emsg = self._run(code, globals_dict, python_path, extra_files, slug)
+        if emsg is not None:
+            raise SafeExecException(emsg)
+
+    def _run(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute one job in a worker, and return its error message, if any.
+        """
+        job_dir = tempfile.mkdtemp(prefix='codejail-')
+        try:
+            os.chmod(job_dir, 0775)
+            tmp_dir = os.path.join(job_dir, 'tmp')
+            os.mkdir(tmp_dir)
+            os.chmod(tmp_dir, 0777)
+
+            # Like CodeJail, give the code its own copy of the files it may import.
+            extra_names = set()
+            for name, content in extra_files or ():
+                with open(os.path.join(job_dir, name), 'wb') as extra_file:
+                    extra_file.write(content)
+                extra_names.add(name)
+            sandbox_path = []
+            for path in python_path or ():
+                if path not in extra_names:
+                    dest = os.path.join(job_dir, os.path.basename(path))
+                    if os.path.isdir(path):
+                        shutil.copytree(path, dest)
+                    else:
+                        shutil.copyfile(path, dest)
+                    path = os.path.basename(path)
+                sandbox_path.append(path)
+
+            job = {
+                'code': code,
+                'globals': json.dumps(json_safe(globals_dict)),
+                'python_path': sandbox_path,
+                'dir': job_dir,
+                'limits': dict(jail_code.LIMITS),
+            }
+            # The worker kills code running for too long itself, but the code
+            # may have stopped the worker.
+            timeout = None
+            if job['limits'].get('REALTIME'):
+                timeout = job['limits']['REALTIME'] + WORKER_TIMEOUT_MARGIN
+            worker = None
+            try:
+                worker = self._acquire()
+                result = worker.run(job, timeout)
+            except WorkerError:
+                log.exception(u'Sandbox worker failed to run %s', slug)
+                if worker is not None:
+                    self._discard(worker)
+                result = None
+            else:
+                self._release(worker)
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+        if result is None:
+            # Don't fail the code because of the pool: run it in a jail of its own.
+            try:
+                codejail_safe_exec(code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug)
+            except SafeExecException as exc:
+                return exc.message
+            return None
+
+        if 'emsg' in result:
+            return result['emsg']
+        globals_dict.update(result['globals'])
+        return None
+
+    def close(self):
+        """
+        Stop all the workers.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                for worker in self._workers:
+                    worker.close()
+            self._reset()
@@ -51,6 +51,7 @@ def test_capa_system():
         STATIC_URL='/dummy-static/',
         STATUS_CLASS=Status,
         xqueue={'interface': xqueue_interface, 'construct_callback': calledback_url, 'default_queuename': 'testqueue', 'waittime': 10},
+        problem_cache=None,
     )
     return the_system
 
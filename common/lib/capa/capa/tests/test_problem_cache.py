@@ -0,0 +1,80 @@
+"""
+Tests for sharing parsed problems between students with a ParsedProblemCache.
+"""
+import textwrap
+import unittest
+
+from mock import patch
+
+from capa.capa_problem import LoncapaProblem, ParsedProblemCache
+from . import test_capa_system, new_loncapa_problem
+
+
+class ParsedProblemCacheTest(unittest.TestCase):
+    """
+    Tests for ParsedProblemCache.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+        <script type="loncapa/python">
+        answer = random.randint(1, 1000)
+        </script>
+        <numericalresponse answer="$answer">
+          <textline/>
+        </numericalresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ParsedProblemCacheTest, self).setUp()
+        self.problem_cache = ParsedProblemCache()
+        patcher = patch.object(
+            LoncapaProblem, '_extract_context', autospec=True, side_effect=LoncapaProblem._extract_context
+        )
+        self.extract_context = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def new_problem(self, xml=None, seed=723, anonymous_student_id='student'):
+        """
+        Return a problem using the cache of this test.
+        """
+        capa_system = test_capa_system()
+        capa_system.problem_cache = self.problem_cache
+        capa_system.anonymous_student_id = anonymous_student_id
+        return new_loncapa_problem(xml or self.xml, capa_system=capa_system, seed=seed)
+
+    def test_problem_parsed_once(self):
+        problem = self.new_problem()
+        other_problem = self.new_problem(anonymous_student_id='other_student')
+        self.assertEqual(self.extract_context.call_count, 1)
+        self.assertEqual(problem.context['answer'], other_problem.context['answer'])
+        self.assertEqual(other_problem.context['anonymous_student_id'], 'other_student')
+
+        # The problems don't share their tree and context
+        self.assertIsNot(problem.tree, other_problem.tree)
+        problem.context['answer'] = None
+        self.assertIsNotNone(other_problem.context['answer'])
+
+        answer = str(other_problem.context['answer'])
+        correct_map = other_problem.grade_answers({'1_2_1': answer})
+        self.assertEqual(correct_map.get_correctness('1_2_1'), 'correct')
+        self.assertEqual(self.new_problem().grade_answers({'1_2_1': answer}).get_correctness('1_2_1'), 'correct')
+
+    def test_seed_is_part_of_the_key(self):
+        self.new_problem(seed=1)
+        self.new_problem(seed=2)
+        self.assertEqual(self.extract_context.call_count, 2)
+
+    def test_student_specific_scripts(self):
+        xml = self.xml.replace('random.randint(1, 1000)', 'len(anonymous_student_id)')
+        self.assertEqual(self.new_problem(xml, anonymous_student_id='student').context['answer'], 7)
+        self.assertEqual(self.new_problem(xml, anonymous_student_id='student').context['answer'], 7)
+        self.assertEqual(self.new_problem(xml, anonymous_student_id='a_student').context['answer'], 9)
+        self.assertEqual(self.extract_context.call_count, 2)
+
+    def test_least_recently_used_are_evicted(self):
+        self.problem_cache.max_entries = 2
+        for seed in (1, 2, 1, 3, 1, 2):
+            self.new_problem(seed=seed)
+        # Seed 2 was evicted by seed 3
+        self.assertEqual(self.extract_context.call_count, 4)
@@ -4,7 +4,7 @@ Tests capa util
 import unittest
 
 from . import test_capa_system
-from capa.util import compare_with_tolerance, sanitize_html
+from capa.util import compare_with_tolerance, compare_all_with_tolerance, sanitize_html
 
 
 class UtilTest(unittest.TestCase):
@@ -82,6 +82,20 @@ class UtilTest(unittest.TestCase):
         result = compare_with_tolerance(infinity, infinity, '1.0', False)
         self.assertTrue(result)
 
+    def test_compare_all_with_tolerance(self):
+        infinity = float('Inf')
+        # Same results as compare_with_tolerance for each pair
+        self.assertTrue(compare_all_with_tolerance([100.0, 100.001], [100.0, 100.0]))
+        self.assertFalse(compare_all_with_tolerance([100.0, 101.0], [100.0, 100.0]))
+        self.assertTrue(compare_all_with_tolerance([109.9, 90.1], [100.0, 100.0], '10%', False))
+        self.assertFalse(compare_all_with_tolerance([109.9, 110.1], [100.0, 100.0], '10%', False))
+        self.assertTrue(compare_all_with_tolerance([111.0, 89.0], [100.0, 100.0], '0.1', True))
+        self.assertFalse(compare_all_with_tolerance([111.0, 112.0], [100.0, 100.0], 0.1, True))
+        self.assertTrue(compare_all_with_tolerance([infinity, 100.0], [infinity, 100.0], 1.0, True))
+        self.assertFalse(compare_all_with_tolerance([infinity, 100.0], [100.0, 100.0], '1.0', False))
+        self.assertFalse(compare_all_with_tolerance([float('nan')], [100.0]))
+        self.assertTrue(compare_all_with_tolerance([1 + 2j], [1 + 2j]))
+
     def test_sanitize_html(self):
         """
         Test for html sanitization with bleach.
@@ -2,6 +2,7 @@
 Utility functions for capa.
 """
 import bleach
+import numpy
 
 from calc import evaluator
 from cmath import isinf
@@ -70,6 +71,42 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
         return abs(student_complex - instructor_complex) <= tolerance
 
 
+def compare_all_with_tolerance(student_complexes, instructor_complexes, tolerance=default_tolerance,
+                               relative_tolerance=False):
+    """
+    Return whether each of `student_complexes` is equal to the respective one
+    of `instructor_complexes` with maximum tolerance tolerance.
+
+    Does the same as calling `compare_with_tolerance` on each pair, but compares
+    all of them at once.
+    """
+    student_complexes = numpy.asarray(student_complexes)
+    instructor_complexes = numpy.asarray(instructor_complexes)
+
+    if isinstance(tolerance, str):
+        if tolerance == default_tolerance:
+            relative_tolerance = True
+        if tolerance.endswith('%'):
+            tolerance = evaluator(dict(), dict(), tolerance[:-1]) * 0.01
+            if not relative_tolerance:
+                tolerance = tolerance * numpy.abs(instructor_complexes)
+        else:
+            tolerance = evaluator(dict(), dict(), tolerance)
+
+    with numpy.errstate(all='ignore'):
+        if relative_tolerance:
+            tolerance = tolerance * numpy.maximum(numpy.abs(student_complexes), numpy.abs(instructor_complexes))
+
+        # If an input is infinite, compare directly (see `compare_with_tolerance`).
+        infinite = numpy.isinf(student_complexes) | numpy.isinf(instructor_complexes)
+        equal = numpy.where(
+            infinite,
+            student_complexes == instructor_complexes,
+            numpy.abs(student_complexes - instructor_complexes) <= tolerance
+        )
+    return bool(numpy.all(equal))
+
+
 def contextualize_text(text, context):  # private
     """
     Takes a string with variables. E.g. $a+$b.
@@ -17,7 +17,7 @@ except ImportError:
     # pylint: disable=invalid-name
     dog_stats_api = None
 
-from capa.capa_problem import LoncapaProblem, LoncapaSystem
+from capa.capa_problem import LoncapaProblem, LoncapaSystem, ParsedProblemCache
 from capa.responsetypes import StudentInputError, \
     ResponseError, LoncapaProblemError
 from capa.util import convert_files_to_filenames
@@ -40,6 +40,9 @@ NUM_RANDOMIZATION_BINS = 20
 # Never produce more than this many different seeds, no matter what.
 MAX_RANDOMIZATION_BINS = 1000
 
+# Parsed problems shared by the problems of this process, see ENABLE_CAPA_PROBLEM_CACHE
+PARSED_PROBLEM_CACHE = ParsedProblemCache()
+
 
 def randomization_bin(seed, problem_id):
     """
@@ -310,7 +313,8 @@ class CapaMixin(CapaFields):
             seed=self.runtime.seed,      # Why do we do this if we have self.seed?
             STATIC_URL=self.runtime.STATIC_URL,
             xqueue=self.runtime.xqueue,
-            matlab_api_key=self.matlab_api_key
+            matlab_api_key=self.matlab_api_key,
+            problem_cache=PARSED_PROBLEM_CACHE if settings.FEATURES.get('ENABLE_CAPA_PROBLEM_CACHE') else None,
         )
 
         return LoncapaProblem(
@@ -228,38 +228,49 @@ def own_metadata(module):
 class InheritingFieldData(KvsFieldData):
     """A `FieldData` implementation that can inherit value from parents to children."""
 
-    def __init__(self, inheritable_names, **kwargs):
+    def __init__(self, inheritable_names, inherited_settings=None, **kwargs):
         """
         `inheritable_names` is a list of names that can be inherited from
         parents.
 
+        `inherited_settings`, if given, is a dict of the inheritable names set
+        on an ancestor of the block to their json value on the nearest such
+        ancestor, so that the ancestors don't need to be walked.
+
         """
         super(InheritingFieldData, self).__init__(**kwargs)
         self.inheritable_names = set(inheritable_names)
+        self.inherited_settings = inherited_settings
 
     def default(self, block, name):
         """
         The default for an inheritable name is found on a parent.
         """
         if name in self.inheritable_names:
-            # Walk up the content tree to find the first ancestor
-            # that this field is set on. Use the field from the current
-            # block so that if it has a different default than the root
-            # node of the tree, the block's default will be used.
-            field = block.fields[name]
-            ancestor = block.get_parent()
-            while ancestor is not None:
-                if field.is_set_on(ancestor):
-                    return field.read_json(ancestor)
-                else:
-                    ancestor = ancestor.get_parent()
+            if self.inherited_settings is not None:
+                # The values set on the ancestors were computed up front
+                if name in self.inherited_settings:
+                    return self.inherited_settings[name]
+            else:
+                # Walk up the content tree to find the first ancestor
+                # that this field is set on. Use the field from the current
+                # block so that if it has a different default than the root
+                # node of the tree, the block's default will be used.
+                field = block.fields[name]
+                ancestor = block.get_parent()
+                while ancestor is not None:
+                    if field.is_set_on(ancestor):
+                        return field.read_json(ancestor)
+                    else:
+                        ancestor = ancestor.get_parent()
         return super(InheritingFieldData, self).default(block, name)
 
 
-def inheriting_field_data(kvs):
+def inheriting_field_data(kvs, inherited_settings=None):
     """Create an InheritanceFieldData that inherits the names in InheritanceMixin."""
     return InheritingFieldData(
         inheritable_names=InheritanceMixin.fields.keys(),
+        inherited_settings=inherited_settings,
         kvs=kvs,
     )
 
@@ -539,6 +539,24 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         except NotImplementedError:
             return None, None
 
+    def get_course_structure(self, course_key):
+        """
+        Returns the structure document of a split course, without loading any
+        of its blocks.
+
+        Raises NotImplementedError if the course isn't in a split modulestore.
+        """
+        store = self._verify_modulestore_support(course_key, 'get_course_structure')
+        return store.get_course_structure(course_key)
+
+    def get_inherited_settings_map(self, course_key, structure):
+        """
+        Returns the settings each block of the structure of a split course
+        inherits from its ancestors (see the split modulestore).
+        """
+        store = self._verify_modulestore_support(course_key, 'get_inherited_settings_map')
+        return store.get_inherited_settings_map(course_key, structure)
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given course_id.
@@ -16,7 +16,10 @@ import pymongo
 import sys
 import logging
 import copy
+import cPickle as pickle
 import re
+import time
+import zlib
 from uuid import uuid4
 
 from bson.son import SON
@@ -444,6 +447,63 @@ def as_published(location):
     return location.replace(revision=MongoRevisionKey.published)
 
 
+# Version of the compact format of the metadata inheritance trees stored in the
+# metadata_inheritance_cache_subsystem
+INHERITANCE_TREE_FORMAT_VERSION = 1
+
+
+def serialize_inheritance_tree(tree):
+    """
+    Returns a compact serialization of the metadata inheritance `tree`.
+
+    Most blocks inherit exactly the same metadata as their siblings, so each
+    distinct set of inherited metadata is stored once, and the blocks refer to
+    it by index. The result is zlib compressed, which takes care of the
+    repeated prefixes of the block urls.
+    """
+    metadata_indexes = {}
+    distinct_metadata = []
+    blocks = []
+    for url, metadata in tree.iteritems():
+        metadata = dict(metadata)
+        parents = metadata.pop('parent', {})
+        metadata_key = pickle.dumps(sorted(metadata.items()), pickle.HIGHEST_PROTOCOL)
+        index = metadata_indexes.get(metadata_key)
+        if index is None:
+            index = metadata_indexes[metadata_key] = len(distinct_metadata)
+            distinct_metadata.append(metadata)
+        blocks.append((url, index, parents))
+
+    return zlib.compress(
+        pickle.dumps((INHERITANCE_TREE_FORMAT_VERSION, distinct_metadata, blocks), pickle.HIGHEST_PROTOCOL)
+    )
+
+
+def deserialize_inheritance_tree(serialized):
+    """
+    Returns the metadata inheritance tree serialized by `serialize_inheritance_tree`,
+    or None if `serialized` isn't in a format this version can read.
+    """
+    if isinstance(serialized, dict):
+        # A tree cached before the compact format was introduced
+        return serialized
+
+    try:
+        version, distinct_metadata, blocks = pickle.loads(zlib.decompress(serialized))
+    except (zlib.error, pickle.UnpicklingError, TypeError, ValueError):
+        return None
+    if version != INHERITANCE_TREE_FORMAT_VERSION:
+        return None
+
+    tree = {}
+    for url, index, parents in blocks:
+        metadata = dict(distinct_metadata[index])
+        if parents:
+            metadata['parent'] = parents
+        tree[url] = metadata
+    return tree
+
+
 class MongoBulkOpsRecord(BulkOpsRecord):
     """
     Tracks whether there've been any writes per course and disables inheritance generation
@@ -529,9 +589,17 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                  user_service=None,
                  signal_handler=None,
                  retry_wait_time=0.1,
+                 metadata_inheritance_max_age=None,
+                 metadata_inheritance_lock_timeout=30,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param metadata_inheritance_max_age: if not None, the number of seconds after which a metadata
+            inheritance tree in the metadata_inheritance_cache_subsystem is recomputed. Only one process
+            recomputes it, and the others keep using the stale tree meanwhile. If None, the trees are kept
+            until the cache expires them, and every process which misses one recomputes it.
+        :param metadata_inheritance_lock_timeout: the number of seconds after which the lock taken by the
+            process recomputing a metadata inheritance tree is released, even if it didn't finish.
         """
 
         super(MongoModuleStore, self).__init__(contentstore=contentstore, **kwargs)
@@ -585,6 +653,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         self._course_run_cache = {}
         self.signal_handler = signal_handler
+        self.metadata_inheritance_max_age = metadata_inheritance_max_age
+        self.metadata_inheritance_lock_timeout = metadata_inheritance_lock_timeout
 
     def close_connections(self):
         """
@@ -746,6 +816,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         Compute the metadata inheritance for the course.
         '''
         tree = {}
+        revalidating = False
 
         course_id = self.fill_in_run(course_id)
         if not force_refresh:
@@ -754,21 +825,29 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 return self.request_cache.data['metadata_inheritance'][unicode(course_id)]
 
             # then look in any caching subsystem (e.g. memcached)
-            if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
-            else:
+            if self.metadata_inheritance_cache_subsystem is None:
                 logging.warning(
                     'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
                     OK in localdev and testing environment. Not OK in production.'
                 )
+            elif self.metadata_inheritance_max_age is None:
+                tree = deserialize_inheritance_tree(
+                    self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+                )
+            else:
+                tree, revalidating = self._get_revalidated_metadata_inheritance_tree(course_id)
 
         if not tree:
             # if not in subsystem, or we are on force refresh, then we have to compute
-            tree = self._compute_metadata_inheritance_tree(course_id)
+            try:
+                tree = self._compute_metadata_inheritance_tree(course_id)
 
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+                # now write out computed tree to caching subsystem (e.g. memcached), if available
+                if self.metadata_inheritance_cache_subsystem is not None:
+                    self._set_cached_metadata_inheritance_tree(course_id, tree)
+            finally:
+                if revalidating:
+                    self.metadata_inheritance_cache_subsystem.delete(self._metadata_inheritance_lock_key(course_id))
 
         # now populate a request_cache, if available. NOTE, we are outside of the
         # scope of the above if: statement so that after a memcache hit, it'll get
@@ -782,6 +861,61 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         return tree
 
+    def _set_cached_metadata_inheritance_tree(self, course_id, tree):
+        """
+        Store the metadata inheritance `tree` of the course in the metadata_inheritance_cache_subsystem.
+        """
+        serialized = serialize_inheritance_tree(tree)
+        if self.metadata_inheritance_max_age is None:
+            self.metadata_inheritance_cache_subsystem.set(unicode(course_id), serialized)
+        else:
+            # Keep the tree in the cache well past its max age, so that it can be served
+            # while it is being recomputed
+            self.metadata_inheritance_cache_subsystem.set(
+                unicode(course_id),
+                (time.time() + self.metadata_inheritance_max_age, serialized),
+                self.metadata_inheritance_max_age * 10,
+            )
+
+    @staticmethod
+    def _metadata_inheritance_lock_key(course_id):
+        """
+        Returns the key of the lock held while recomputing the metadata inheritance tree of the course.
+        """
+        return u'{}.lock'.format(course_id)
+
+    def _get_revalidated_metadata_inheritance_tree(self, course_id):
+        """
+        Returns the cached metadata inheritance tree of the course (stale-while-revalidate),
+        and whether the caller holds the lock to recompute it.
+
+        When the cached tree is stale or missing, only the caller which gets the lock gets an
+        empty tree: it must compute the tree, cache it and release the lock. Meanwhile, the
+        other callers get the stale tree. This never waits for the lock holder: when there
+        isn't any tree cached (e.g. because it was evicted), the other callers get an empty
+        tree too, and compute it themselves.
+
+        Trees cached without a freshness date (in the format used before this, or by a store
+        without metadata_inheritance_max_age) are served as stale trees.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+
+        cached = cache.get(unicode(course_id))
+        if isinstance(cached, tuple):
+            fresh_until, serialized = cached
+        else:
+            fresh_until, serialized = 0, cached
+
+        tree = {}
+        if serialized is not None:
+            tree = deserialize_inheritance_tree(serialized) or {}
+            if tree and time.time() < fresh_until:
+                return tree, False
+
+        if cache.add(self._metadata_inheritance_lock_key(course_id), True, self.metadata_inheritance_lock_timeout):
+            return {}, True
+        return tree, False
+
     def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
@@ -1,4 +1,5 @@
 ''' useful functions for finding content and its position '''
+from collections import defaultdict
 from logging import getLogger
 
 from .exceptions import (ItemNotFoundError, NoPathToItem)
@@ -6,7 +7,11 @@ from .exceptions import (ItemNotFoundError, NoPathToItem)
 LOGGER = getLogger(__name__)
 
 
-def path_to_location(modulestore, usage_key):
+# The block types whose children positions are part of the path to a location
+POSITIONAL_BLOCK_TYPES = ('sequential', 'videosequence')
+
+
+def path_to_location(modulestore, usage_key, path_index=None):
     '''
     Try to find a course_id/chapter/section[/position] path to location in
     modulestore.  The courseware insists that the first level in the course is
@@ -15,6 +20,9 @@ def path_to_location(modulestore, usage_key):
     Args:
         modulestore: which store holds the relevant objects
         usage_key: :class:`UsageKey` the id of the location to which to generate the path
+        path_index: optionally, the result of `build_path_index` for the course of
+            `usage_key`. The path to the blocks it contains is looked up in it, rather
+            than searched up the modulestore.
 
     Raises
         ItemNotFoundError if the location doesn't exist.
@@ -38,6 +46,14 @@ def path_to_location(modulestore, usage_key):
             xs = xs[1]
         return p
 
+    if path_index is not None:
+        path = path_index.get((usage_key.block_type, usage_key.block_id))
+        if path is not None:
+            # The index may have been built before the block was deleted
+            if not modulestore.has_item(usage_key):
+                raise ItemNotFoundError(usage_key)
+            return (usage_key.course_key,) + path
+
     def find_path_to_course():
         '''Find a path up the location graph to a node with the
         specified category.
@@ -97,21 +113,115 @@ def path_to_location(modulestore, usage_key):
         # module nested in more than one positional module will work.
         if n > 3:
             position_list = []
-            for path_index in range(2, n - 1):
-                category = path[path_index].block_type
-                if category == 'sequential' or category == 'videosequence':
-                    section_desc = modulestore.get_item(path[path_index])
+            for path_position in range(2, n - 1):
+                category = path[path_position].block_type
+                if category in POSITIONAL_BLOCK_TYPES:
+                    section_desc = modulestore.get_item(path[path_position])
                     # this calls get_children rather than just children b/c old mongo includes private children
                     # in children but not in get_children
                     child_locs = [c.location for c in section_desc.get_children()]
                     # positions are 1-indexed, and should be strings to be consistent with
                     # url parsing.
-                    position_list.append(str(child_locs.index(path[path_index + 1]) + 1))
+                    position_list.append(str(child_locs.index(path[path_position + 1]) + 1))
             position = "_".join(position_list)
 
         return (course_id, chapter, section, position)
 
 
+def build_block_index(modulestore, course_key):
+    '''
+    Walks the whole course once, and returns an index of its blocks keyed by
+    their (block_type, block_id), so that their paths and parents can be looked
+    up instead of searched up the modulestore one parent at a time.
+
+    The entry of each block is a dict with:
+        parent: the (block_type, block_id) of its parent, or None for the course.
+            Absent if the block has several parents.
+        path: its (chapter, section, position) path, as computed by
+            `path_to_location`.
+        section: the (block_type, block_id) of the section in its path, or None
+            for the course and its chapters.
+    path and section are absent if the block or any of its ancestors has several
+    parents. The blocks which have no path to the course (orphans) aren't in the
+    index.
+    '''
+    course = modulestore.get_course(course_key, depth=None)
+    if course is None:
+        raise ItemNotFoundError(course_key)
+
+    index = {}
+    parents = {}
+    parents_count = defaultdict(int)
+    # The work stack has tuples (block, parent key, depth, chapter, section, positions),
+    # where section is the (block_type, block_id) of the section, and positions are
+    # those of the block and its ancestors in the sequences above them.
+    stack = [(course, None, 0, None, None, ())]
+    while stack:
+        block, parent_key, depth, chapter, section, positions = stack.pop()
+        block_key = (block.location.block_type, block.location.block_id)
+        parents_count[block_key] += 1
+        if parents_count[block_key] > 1:
+            # Visited it (and its descendants) already
+            continue
+        parents[block_key] = parent_key
+
+        if depth == 1:
+            chapter = block.location.name
+        elif depth == 2:
+            section = block_key
+        index[block_key] = {
+            'path': (chapter, section and section[1], "_".join(positions) if depth > 2 else None),
+            'section': section,
+        }
+
+        if not block.has_children:
+            continue
+        children = block.get_children()
+        for child_index, child in enumerate(children):
+            child_positions = positions
+            if depth >= 2 and block.location.block_type in POSITIONAL_BLOCK_TYPES:
+                # positions are 1-indexed, and should be strings to be consistent with
+                # url parsing.
+                child_positions = positions + (str(child_index + 1),)
+            stack.append((child, block_key, depth + 1, chapter, section, child_positions))
+
+    def has_single_path(block_key):
+        """
+        Returns whether neither the block nor any of its ancestors has several parents.
+        """
+        while block_key is not None:
+            if parents_count[block_key] > 1:
+                return False
+            block_key = parents[block_key]
+        return True
+
+    for block_key, entry in index.iteritems():
+        if parents_count[block_key] == 1:
+            entry['parent'] = parents[block_key]
+        if not has_single_path(block_key):
+            del entry['path']
+            del entry['section']
+    return index
+
+
+def build_path_index(modulestore, course_key):
+    '''
+    Returns an index of the (chapter, section, position) path to each block of
+    the course, as computed by `path_to_location`, keyed by the (block_type,
+    block_id) of the blocks.
+
+    The blocks which have several paths to the course (because they or their
+    ancestors have several parents) and those which have none (orphans) aren't
+    in the index, so that `path_to_location` still searches and reports them
+    as usual. See `build_block_index`.
+    '''
+    return {
+        block_key: entry['path']
+        for block_key, entry in build_block_index(modulestore, course_key).iteritems()
+        if 'path' in entry
+    }
+
+
 def navigation_index(position):
     """
     Get the navigation index from the position argument (where the position argument was recieved from a call to
@@ -1,3 +1,4 @@
+import copy
 import sys
 import logging
 from contracts import contract, new_contract
@@ -87,6 +88,14 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 parent_map[child] = block_key
         return parent_map
 
+    @lazy
+    def _inherited_settings_map(self):
+        """
+        The settings each block of the structure inherits from its ancestors,
+        or None if they have to be looked up on the ancestors.
+        """
+        return self.modulestore.get_inherited_settings_map(self.course_entry.course_key, self.course_entry.structure)
+
     @contract(usage_key="BlockUsageLocator | BlockKey", course_entry_override="CourseEnvelope | None")
     def _load_item(self, usage_key, course_entry_override=None, **kwargs):
         """
@@ -215,7 +224,15 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         )
 
         if InheritanceMixin in self.modulestore.xblock_mixins:
-            field_data = inheriting_field_data(kvs)
+            if self._inherited_settings_map is not None and block_key in self._inherited_settings_map:
+                # deepcopy so that manipulations of fields does not pollute the map shared by all the blocks
+                inherited_settings = {
+                    field_name: kvs.field_decorator(copy.deepcopy(value))
+                    for field_name, value in self._inherited_settings_map[block_key].iteritems()
+                }
+            else:
+                inherited_settings = None
+            field_data = inheriting_field_data(kvs, inherited_settings)
         else:
             field_data = KvsFieldData(kvs)
 
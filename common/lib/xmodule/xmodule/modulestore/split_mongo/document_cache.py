@@ -0,0 +1,118 @@
+"""
+Cache of the immutable documents of the split modulestore.
+
+Split structures and definitions are never modified once they are written (any
+change creates a new document, with a new id), so they can be cached by id for
+as long as we like, without ever needing to be invalidated.
+"""
+from collections import OrderedDict
+import cPickle as pickle
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class DocumentCache(object):
+    """
+    A two-tier cache of split documents, keyed by their id.
+
+    The first tier is local to the process, and bounded by the total size of the
+    serialized documents it holds: once `max_size` bytes are used, the least
+    recently used documents are evicted. The optional second tier,
+    `shared_cache`, is shared across processes: it can be any object with the
+    django cache `get_many`/`set_many` interface (typically memcached).
+
+    Documents are stored serialized, and deserialized on every read, so callers
+    always get documents of their own, which they are free to modify.
+    """
+    def __init__(self, max_size=0, shared_cache=None):
+        """
+        Arguments:
+            max_size (int): The maximum number of bytes of serialized documents
+                kept by the process; 0 disables the local tier.
+            shared_cache: The cache shared across processes, or None.
+        """
+        self.max_size = max_size
+        self.shared_cache = shared_cache
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(collection, doc_id):
+        """
+        Return the key of the document `doc_id` of `collection` in the cache.
+        """
+        return u'split.{}.{}'.format(collection, doc_id)
+
+    def get_many(self, collection, ids):
+        """
+        Return a dict mapping the ids of `ids` which are cached to their
+        document in `collection`.
+        """
+        found = {}
+        missing = {}
+        with self._lock:
+            for doc_id in ids:
+                cache_key = self._cache_key(collection, doc_id)
+                serialized = self._entries.pop(cache_key, None)
+                if serialized is None:
+                    missing[cache_key] = doc_id
+                else:
+                    # Re-insert the entry, to mark it as the most recently used
+                    self._entries[cache_key] = serialized
+                    found[doc_id] = pickle.loads(serialized)
+
+        if missing and self.shared_cache is not None:
+            for cache_key, serialized in self.shared_cache.get_many(missing.keys()).iteritems():
+                found[missing[cache_key]] = pickle.loads(serialized)
+                self._add_local(cache_key, serialized)
+
+        return found
+
+    def set_many(self, collection, docs):
+        """
+        Cache all the documents `docs` of `collection`, by their `_id`.
+        """
+        serialized_docs = {
+            self._cache_key(collection, doc['_id']): pickle.dumps(doc, pickle.HIGHEST_PROTOCOL)
+            for doc in docs
+        }
+        for cache_key, serialized in serialized_docs.iteritems():
+            self._add_local(cache_key, serialized)
+
+        if serialized_docs and self.shared_cache is not None:
+            try:
+                self.shared_cache.set_many(serialized_docs)
+            except Exception:  # pylint: disable=broad-except
+                # The shared tier is only an optimization (and documents which
+                # are too big for it are expected), so don't fail the read.
+                log.warning(u'Failed to store %d split documents in the shared cache', len(serialized_docs))
+
+    def _add_local(self, cache_key, serialized):
+        """
+        Add the serialized document to the local tier, evicting the least
+        recently used documents if needed.
+        """
+        if len(serialized) > self.max_size:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(cache_key, None)
+            if previous is not None:
+                self._size -= len(previous)
+
+            self._entries[cache_key] = serialized
+            self._size += len(serialized)
+            while self._size > self.max_size:
+                __, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        """
+        Empty the local tier of the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
@@ -76,11 +76,15 @@ class MongoConnection(object):
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, document_cache=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        If `document_cache` (a `DocumentCache`) is given, structures and definitions
+        are looked up in it before being read from the database.
         """
+        self.document_cache = document_cache
         self.database = MongoProxy(
             pymongo.database.Database(
                 pymongo.MongoClient(
@@ -118,11 +122,33 @@ class MongoConnection(object):
         else:
             raise HeartbeatFailure("Can't connect to {}".format(self.database.name))
 
+    def _find_by_ids(self, collection_name, collection, ids):
+        """
+        Return the documents of `collection` whose ids are in `ids`, reading
+        them from the document cache if possible. Only the documents which
+        aren't cached are read from the database (and then cached).
+        """
+        if self.document_cache is None:
+            return collection.find({'_id': {'$in': ids}})
+
+        cached = self.document_cache.get_many(collection_name, ids)
+        missing_ids = [doc_id for doc_id in ids if doc_id not in cached]
+        if not missing_ids:
+            return cached.values()
+
+        docs_from_db = list(collection.find({'_id': {'$in': missing_ids}}))
+        self.document_cache.set_many(collection_name, docs_from_db)
+        return cached.values() + docs_from_db
+
     def get_structure(self, key):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
-        return structure_from_mongo(self.structures.find_one({'_id': key}))
+        if self.document_cache is None:
+            return structure_from_mongo(self.structures.find_one({'_id': key}))
+
+        structures = self._find_by_ids('structures', self.structures, [key])
+        return structure_from_mongo(structures[0] if structures else None)
 
     @autoretry_read()
     def find_structures_by_id(self, ids):
@@ -132,7 +158,7 @@ class MongoConnection(object):
         Arguments:
             ids (list): A list of structure ids
         """
-        return [structure_from_mongo(structure) for structure in self.structures.find({'_id': {'$in': ids}})]
+        return [structure_from_mongo(structure) for structure in self._find_by_ids('structures', self.structures, ids)]
 
     @autoretry_read()
     def find_structures_derived_from(self, ids):
@@ -264,7 +290,7 @@ class MongoConnection(object):
         """
         Retrieve all definitions listed in `definitions`.
         """
-        return self.definitions.find({'_id': {'$in': definitions}})
+        return self._find_by_ids('definitions', self.definitions, definitions)
 
     def insert_definition(self, definition):
         """
@@ -80,6 +80,7 @@ from xmodule.modulestore import (
 from ..exceptions import ItemNotFoundError
 from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
+from xmodule.modulestore.split_mongo.document_cache import DocumentCache
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.error_module import ErrorDescriptor
 from collections import defaultdict
@@ -340,6 +341,68 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         else:
             self.db_connection.insert_structure(structure)
 
+    def get_inherited_settings_map(self, course_key, structure):
+        """
+        Return a dict mapping the BlockKey of each block of `structure` to the
+        settings it inherits: the inheritable fields set on its ancestors, as
+        set on the nearest ancestor setting them. Structures never change once
+        persisted, so the map is only computed once per structure version
+        (and kept in the document cache, if there is one).
+
+        Returns None if `structure` may still be modified by the active bulk
+        operation on `course_key`.
+        """
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        if bulk_write_record.active and structure['_id'] not in bulk_write_record.structures_in_db:
+            return None
+
+        document_cache = self.db_connection.document_cache
+        if document_cache is not None:
+            cached = document_cache.get_many('inherited_settings', [structure['_id']])
+            if structure['_id'] in cached:
+                return cached[structure['_id']]['blocks']
+
+        blocks = structure['blocks']
+        parent_map = {}
+        for block_key, block_data in blocks.iteritems():
+            for child in block_data.fields.get('children', []):
+                parent_map[child] = block_key
+
+        inherited_settings_map = {}
+        # Maps each parent to the settings its children inherit
+        settings_for_children = {}
+        for block_key in blocks:
+            # Find the ancestors whose inherited settings aren't known yet
+            lineage = []
+            current = block_key
+            while current is not None and current not in inherited_settings_map and current not in lineage:
+                lineage.append(current)
+                current = parent_map.get(current)
+
+            for current in reversed(lineage):
+                parent = parent_map.get(current)
+                if parent not in blocks or parent not in inherited_settings_map:
+                    inherited_settings_map[current] = {}
+                    continue
+
+                if parent not in settings_for_children:
+                    parent_fields = blocks[parent].fields
+                    parent_settings = {
+                        field_name: parent_fields[field_name]
+                        for field_name in inheritance.InheritanceMixin.fields
+                        if field_name in parent_fields
+                    }
+                    if parent_settings:
+                        parent_settings = dict(inherited_settings_map[parent], **parent_settings)
+                    else:
+                        parent_settings = inherited_settings_map[parent]
+                    settings_for_children[parent] = parent_settings
+                inherited_settings_map[current] = settings_for_children[parent]
+
+        if document_cache is not None:
+            document_cache.set_many('inherited_settings', [{'_id': structure['_id'], 'blocks': inherited_settings_map}])
+        return inherited_settings_map
+
     def get_cached_block(self, course_key, version_guid, block_id):
         """
         If there's an active bulk_operation, see if it's cached this module and just return it
@@ -636,14 +699,22 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None,
+                 document_cache_size=0, document_cache_subsystem=None, **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param document_cache_size: the number of bytes of structures and definitions to cache in the process
+        :param document_cache_subsystem: a cache shared across processes (e.g. memcached) for structures and
+            definitions, or None
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        if document_cache_size or document_cache_subsystem is not None:
+            document_cache = DocumentCache(document_cache_size, document_cache_subsystem)
+        else:
+            document_cache = None
+        self.db_connection = MongoConnection(document_cache=document_cache, **doc_store_config)
         self.db = self.db_connection.database
 
         if default_class is not None:
@@ -691,6 +762,9 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         connection.drop_database(self.db.name)
         connection.close()
 
+        if self.db_connection.document_cache is not None:
+            self.db_connection.document_cache.clear()
+
     def cache_items(self, system, base_block_ids, course_key, depth=0, lazy=True):
         """
         Handles caching of items once inheritance and any other one time
@@ -959,6 +1033,16 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             raise ItemNotFoundError(course_id)
         return self._get_structure(course_id, depth, **kwargs)
 
+    def get_course_structure(self, course_id):
+        """
+        Gets the structure document of the course identified by the locator,
+        without loading any of its blocks. The 'blocks' of the document map the
+        BlockKey of each block to its BlockData.
+        """
+        if not isinstance(course_id, CourseLocator) or course_id.deprecated:
+            raise ItemNotFoundError(course_id)
+        return self._lookup_course(course_id).structure
+
     def get_library(self, library_id, depth=0, head_validation=True, **kwargs):
         """
         Gets the 'library' root block for the library identified by the locator
@@ -39,7 +39,7 @@ from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.draft_and_published import UnsupportedRevisionError, DIRECT_ONLY_CATEGORIES
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError, NoPathToItem
 from xmodule.modulestore.mixed import MixedModuleStore
-from xmodule.modulestore.search import path_to_location, navigation_index
+from xmodule.modulestore.search import path_to_location, navigation_index, build_path_index, build_block_index
 from xmodule.modulestore.tests.factories import check_mongo_calls, check_exact_number_of_calls, \
     mongo_uses_error_check
 from xmodule.modulestore.tests.utils import create_modulestore_instance, LocationMixin
@@ -1129,6 +1129,48 @@ class TestMixedModuleStore(CourseComparisonTest):
         with self.assertRaises(NoPathToItem):
             path_to_location(self.store, orphan)
 
+    @ddt.data('draft', 'split')
+    def test_path_index(self, default_ms):
+        """
+        Make sure that path_to_location finds the same paths in a path index as by searching the modulestore
+        """
+        self.initdb(default_ms)
+
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            self._create_block_hierarchy()
+            orphan = course_key.make_usage_key('chapter', 'OrphanChapter')
+            self.store.create_item(self.user_id, orphan.course_key, orphan.block_type, block_id=orphan.block_id)
+
+            path_index = build_path_index(self.store, course_key)
+            self.assertEqual(path_index[('problem', 'Problem_x1a_2')], (u"Chapter_x", u"Sequential_x1", '1'))
+            self.assertNotIn(('chapter', 'OrphanChapter'), path_index)
+
+            for location in (self.chapter_x, self.sequential_x2, self.vertical_x1b, self.problem_y1a_3):
+                expected = path_to_location(self.store, location)
+                with check_exact_number_of_calls(self.store, 'get_parent_location', 0):
+                    self.assertEqual(path_to_location(self.store, location, path_index), expected)
+
+            with self.assertRaises(NoPathToItem):
+                path_to_location(self.store, orphan, path_index)
+
+            # blocks deleted since the index was built aren't found
+            deleted = course_key.make_usage_key('problem', 'DeletedProblem')
+            path_index[('problem', 'DeletedProblem')] = path_index[('problem', 'Problem_x1a_2')]
+            with self.assertRaises(ItemNotFoundError):
+                path_to_location(self.store, deleted, path_index)
+
+            block_index = build_block_index(self.store, course_key)
+            for location in (self.chapter_x, self.sequential_x2, self.vertical_x1b, self.problem_y1a_3):
+                parent = self.store.get_parent_location(location)
+                entry = block_index[(location.block_type, location.block_id)]
+                self.assertEqual(entry['parent'], (parent.block_type, parent.block_id))
+            self.assertIsNone(block_index[(u'course', self.course.location.block_id)]['parent'])
+            self.assertEqual(
+                block_index[('problem', 'Problem_x1a_2')]['section'], ('sequential', self.sequential_x1.block_id)
+            )
+            self.assertIsNone(block_index[('chapter', self.chapter_x.block_id)]['section'])
+
     def test_xml_path_to_location(self):
         """
         Make sure that path_to_location works: should be passed a modulestore
@@ -12,6 +12,7 @@ from path import path
 import pymongo
 import logging
 import shutil
+import time
 from tempfile import mkdtemp
 from uuid import uuid4
 from datetime import datetime
@@ -35,11 +36,12 @@ from xmodule.modulestore.xml_exporter import export_course_to_xml
 from xmodule.modulestore.xml_importer import import_course_from_xml, perform_xlint
 from xmodule.contentstore.mongo import MongoContentStore
 
-from nose.tools import assert_in
+from nose.tools import assert_in, assert_not_in
+from mock import patch
 from xmodule.exceptions import NotFoundError
 from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
-from xmodule.modulestore.mongo.base import as_draft
+from xmodule.modulestore.mongo.base import as_draft, serialize_inheritance_tree, deserialize_inheritance_tree
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import LocationMixin
 from xmodule.modulestore.edit_info import EditInfoMixin
@@ -778,6 +780,99 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         # Clean up the data so we don't break other tests which apparently expect a particular state
         self.draft_store.delete_course(course.id, self.dummy_user)
 
+    def test_inheritance_tree_serialization(self):
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        tree = self.draft_store._compute_metadata_inheritance_tree(course_key)
+        assert_true(tree)
+
+        serialized = serialize_inheritance_tree(tree)
+        assert_equals(deserialize_inheritance_tree(serialized), tree)
+        # trees cached before the compact format are still readable
+        assert_equals(deserialize_inheritance_tree(tree), tree)
+        assert_is_none(deserialize_inheritance_tree('not a tree'))
+
+    def test_stale_inheritance_tree_served_while_revalidating(self):
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        cache = RevalidationCache()
+        with patch.multiple(self.draft_store, metadata_inheritance_cache_subsystem=cache, metadata_inheritance_max_age=60):
+            tree = self.draft_store._get_cached_metadata_inheritance_tree(course_key)
+            assert_in(unicode(course_key), cache.data)
+
+            with patch.object(self.draft_store, '_compute_metadata_inheritance_tree', return_value=tree) as compute:
+                assert_equals(self.draft_store._get_cached_metadata_inheritance_tree(course_key), tree)
+                assert_false(compute.called)
+
+                # another process is recomputing the stale tree: keep serving it
+                cache.data[unicode(course_key)] = (time.time() - 1, cache.data[unicode(course_key)][1])
+                cache.add(u'{}.lock'.format(course_key), True)
+                assert_equals(self.draft_store._get_cached_metadata_inheritance_tree(course_key), tree)
+                assert_false(compute.called)
+
+                # no one is: recompute it
+                cache.delete(u'{}.lock'.format(course_key))
+                assert_equals(self.draft_store._get_cached_metadata_inheritance_tree(course_key), tree)
+                assert_true(compute.called)
+                assert_greater(cache.data[unicode(course_key)][0], time.time())
+                assert_not_in(u'{}.lock'.format(course_key), cache.data)
+
+    def test_bare_inheritance_tree_revalidated(self):
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        tree = self.draft_store._compute_metadata_inheritance_tree(course_key)
+        cache = RevalidationCache()
+        with patch.multiple(self.draft_store, metadata_inheritance_cache_subsystem=cache, metadata_inheritance_max_age=60):
+            with patch.object(self.draft_store, '_compute_metadata_inheritance_tree', return_value=tree) as compute:
+                # trees cached without a freshness date are served while another process recomputes them
+                cache.add(u'{}.lock'.format(course_key), True)
+                for bare_tree in (tree, serialize_inheritance_tree(tree)):
+                    cache.data[unicode(course_key)] = bare_tree
+                    assert_equals(self.draft_store._get_cached_metadata_inheritance_tree(course_key), tree)
+                    assert_false(compute.called)
+
+                # and recomputed by the process which gets the lock
+                cache.delete(u'{}.lock'.format(course_key))
+                assert_equals(self.draft_store._get_cached_metadata_inheritance_tree(course_key), tree)
+                assert_true(compute.called)
+                assert_greater(cache.data[unicode(course_key)][0], time.time())
+
+    def test_missing_inheritance_tree_computed_without_waiting(self):
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        tree = self.draft_store._compute_metadata_inheritance_tree(course_key)
+        cache = RevalidationCache()
+        with patch.multiple(self.draft_store, metadata_inheritance_cache_subsystem=cache, metadata_inheritance_max_age=60):
+            with patch.object(self.draft_store, '_compute_metadata_inheritance_tree', return_value=tree) as compute:
+                # another process is computing the tree, but nothing can be served meanwhile
+                cache.add(u'{}.lock'.format(course_key), True)
+                with patch('xmodule.modulestore.mongo.base.time.sleep') as sleep:
+                    assert_equals(self.draft_store._get_cached_metadata_inheritance_tree(course_key), tree)
+                assert_true(compute.called)
+                assert_false(sleep.called)
+                # the lock of the other process is left alone
+                assert_in(u'{}.lock'.format(course_key), cache.data)
+
+
+class RevalidationCache(object):
+    """
+    A dict backed cache, with the parts of the django cache interface used to
+    revalidate the metadata inheritance trees.
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default=None):  # pylint: disable=missing-docstring
+        return self.data.get(key, default)
+
+    def set(self, key, value, timeout=None):  # pylint: disable=missing-docstring, unused-argument
+        self.data[key] = value
+
+    def add(self, key, value, timeout=None):  # pylint: disable=missing-docstring, unused-argument
+        if key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):  # pylint: disable=missing-docstring
+        self.data.pop(key, None)
+
 
 class TestMongoModuleStoreWithNoAssetCollection(TestMongoModuleStore):
     '''
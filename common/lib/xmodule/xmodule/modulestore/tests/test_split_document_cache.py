@@ -0,0 +1,73 @@
+"""
+Tests for the cache of split modulestore documents.
+"""
+import cPickle as pickle
+import unittest
+
+from bson.objectid import ObjectId
+
+from xmodule.modulestore.split_mongo.document_cache import DocumentCache
+
+
+class DictCache(object):
+    """
+    A cache with the django cache `get_many`/`set_many` interface, backed by a dict.
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get_many(self, keys):
+        """ Return the cached values of `keys`. """
+        return {key: self.data[key] for key in keys if key in self.data}
+
+    def set_many(self, data):
+        """ Cache all the values of `data`. """
+        self.data.update(data)
+
+
+class TestDocumentCache(unittest.TestCase):
+    """
+    Tests for DocumentCache.
+    """
+    def setUp(self):
+        super(TestDocumentCache, self).setUp()
+        self.docs = [{'_id': ObjectId(), 'blocks': [{'block_id': 'block_{}'.format(i)}]} for i in range(3)]
+        self.doc_size = len(pickle.dumps(self.docs[0], pickle.HIGHEST_PROTOCOL))
+
+    def test_get_many(self):
+        cache = DocumentCache(max_size=10 * self.doc_size)
+        cache.set_many('structures', self.docs[:2])
+
+        found = cache.get_many('structures', [doc['_id'] for doc in self.docs])
+        self.assertEqual(found, {doc['_id']: doc for doc in self.docs[:2]})
+        self.assertEqual(cache.get_many('definitions', [self.docs[0]['_id']]), {})
+
+    def test_documents_are_copies(self):
+        cache = DocumentCache(max_size=10 * self.doc_size)
+        cache.set_many('structures', self.docs[:1])
+
+        doc_id = self.docs[0]['_id']
+        cache.get_many('structures', [doc_id])[doc_id]['blocks'].append({'block_id': 'other'})
+        self.assertEqual(cache.get_many('structures', [doc_id])[doc_id], self.docs[0])
+
+    def test_least_recently_used_are_evicted(self):
+        cache = DocumentCache(max_size=2 * self.doc_size)
+        cache.set_many('structures', self.docs[:2])
+        # Use the first document, so that the second one is evicted
+        cache.get_many('structures', [self.docs[0]['_id']])
+        cache.set_many('structures', self.docs[2:])
+
+        found = cache.get_many('structures', [doc['_id'] for doc in self.docs])
+        self.assertEqual(set(found), {self.docs[0]['_id'], self.docs[2]['_id']})
+
+    def test_shared_cache(self):
+        shared_cache = DictCache()
+        DocumentCache(shared_cache=shared_cache).set_many('structures', self.docs)
+
+        # Another process, with an empty local tier, finds them in the shared one
+        cache = DocumentCache(max_size=10 * self.doc_size, shared_cache=shared_cache)
+        found = cache.get_many('structures', [doc['_id'] for doc in self.docs])
+        self.assertEqual(found, {doc['_id']: doc for doc in self.docs})
+
+        shared_cache.data.clear()
+        self.assertEqual(len(cache.get_many('structures', [doc['_id'] for doc in self.docs])), 3)
@@ -1726,6 +1726,27 @@ class TestInheritance(SplitModuleTest):
         # overridden
         self.assertEqual(node.graceperiod, datetime.timedelta(hours=4))
 
+    def test_inherited_settings_map(self):
+        """
+        The inherited settings of all the blocks are computed from the structure
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        structure = modulestore()._lookup_course(course_key).structure  # pylint: disable=protected-access
+        inherited_settings_map = modulestore().get_inherited_settings_map(course_key, structure)
+
+        self.assertEqual(set(inherited_settings_map), set(structure['blocks']))
+        self.assertEqual(inherited_settings_map[structure['root']], {})
+        # inherited
+        self.assertEqual(
+            Timedelta().from_json(inherited_settings_map[BlockKey('problem', 'problem3_2')]['graceperiod']),
+            datetime.timedelta(hours=2)
+        )
+        # overridden on the block itself, which doesn't change what it inherits
+        self.assertEqual(
+            Timedelta().from_json(inherited_settings_map[BlockKey('problem', 'problem1')]['graceperiod']),
+            datetime.timedelta(hours=2)
+        )
+
     def test_inheritance_not_saved(self):
         """
         Was saving inherited settings with updated blocks causing inheritance to be sticky
@@ -6,6 +6,27 @@ persist the assignments.
 from abc import ABCMeta, abstractproperty
 
 
+def get_groups_for_users(course_id, users, user_partition):
+    """
+    Returns the groups from the specified user partition to which `users` are
+    assigned, as a dict keyed by user id. Users are not assigned a group: the
+    ones who don't have one are missing from the dict.
+
+    The groups are looked up at once if the scheme of the partition supports
+    it (with a `get_groups_for_users` method), one user at a time otherwise.
+    """
+    scheme = user_partition.scheme
+    if hasattr(scheme, 'get_groups_for_users'):
+        return scheme.get_groups_for_users(course_id, [user.id for user in users], user_partition)
+
+    groups = {}
+    for user in users:
+        group = scheme.get_group_for_user(course_id, user, user_partition, assign=False)
+        if group is not None:
+            groups[user.id] = group
+    return groups
+
+
 class PartitionService(object):
     """
     This is an XBlock service that assigns tracks which groups users are in for various
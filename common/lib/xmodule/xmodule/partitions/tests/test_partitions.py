@@ -11,7 +11,7 @@ from stevedore.extension import Extension, ExtensionManager
 from xmodule.partitions.partitions import (
     Group, UserPartition, UserPartitionError, NoSuchUserPartitionGroupError, USER_PARTITION_SCHEME_NAMESPACE
 )
-from xmodule.partitions.partitions_service import PartitionService
+from xmodule.partitions.partitions_service import PartitionService, get_groups_for_users
 
 
 class TestGroup(TestCase):
@@ -407,3 +407,19 @@ class TestPartitionService(PartitionTestCase):
         self.user_partition.scheme.current_group = groups[1]    # pylint: disable=no-member
         group2 = self.partition_service.get_group(self.user_partition)
         self.assertEqual(group2, groups[1])    # pylint: disable=no-member
+
+    def test_get_groups_for_users(self):
+        """
+        Test that the groups of several users are looked up, one user at a
+        time for schemes which can't look them up at once.
+        """
+        users = [Mock(id=1), Mock(id=2)]
+        groups = get_groups_for_users(self.course.id, users, self.user_partition)
+        self.assertEqual(groups, {1: self.TEST_GROUPS[0], 2: self.TEST_GROUPS[0]})
+
+        self.user_partition.scheme.get_groups_for_users = Mock(return_value={2: self.TEST_GROUPS[1]})  # pylint: disable=no-member
+        groups = get_groups_for_users(self.course.id, users, self.user_partition)
+        self.assertEqual(groups, {2: self.TEST_GROUPS[1]})
+        self.user_partition.scheme.get_groups_for_users.assert_called_once_with(  # pylint: disable=no-member
+            self.course.id, [1, 2], self.user_partition
+        )
@@ -11,7 +11,11 @@ file and check it in at the same time as your model changes. To do that,
 3. Add the migration file created in edx-platform/lms/djangoapps/bulk_email/migrations/
 
 """
+from functools import partial
 import logging
+import re
+from string import Formatter
+
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models, transaction
@@ -177,6 +181,16 @@ class CourseEmailTemplate(models.Model):
             log.exception("Attempting to fetch a non-existent course email template")
             raise
 
+    @staticmethod
+    def _substitute_keywords(message_body, context):
+        """
+        Substitute the %%-encoded keywords of the message body with the user
+        data of `context`, if it identifies the user and the course.
+        """
+        if 'user_id' in context and 'course_id' in context:
+            return substitute_keywords_with_data(message_body, context)
+        return message_body
+
     @staticmethod
     def _render(format_string, message_body, context):
         """
@@ -196,8 +210,7 @@ class CourseEmailTemplate(models.Model):
         """
 
         # Substitute all %%-encoded keywords in the message body
-        if 'user_id' in context and 'course_id' in context:
-            message_body = substitute_keywords_with_data(message_body, context)
+        message_body = CourseEmailTemplate._substitute_keywords(message_body, context)
 
         result = format_string.format(**context)
 
@@ -228,6 +241,141 @@ class CourseEmailTemplate(models.Model):
         """
         return CourseEmailTemplate._render(self.html_template, htmltext, context)
 
+    def compile_plaintext(self, plaintext, static_context):
+        """
+        Return a CompiledEmailTemplate rendering plain text messages like
+        `render_plaintext`, with the values of `static_context` filled in.
+        """
+        return CompiledEmailTemplate(self.plain_template, plaintext, static_context)
+
+    def compile_htmltext(self, htmltext, static_context):
+        """
+        Return a CompiledEmailTemplate rendering HTML text messages like
+        `render_htmltext`, with the values of `static_context` filled in.
+        """
+        return CompiledEmailTemplate(self.html_template, htmltext, static_context)
+
+
+def _format_field(field_format, context):
+    """
+    Render a single field of an email template.
+    """
+    return field_format.format(**context)
+
+
+class CompiledEmailTemplate(object):
+    """
+    An email template and message body, split once into static text and the
+    slots to fill for each recipient, to send the same email to many
+    recipients.
+
+    The fields of the template found in `static_context` are formatted, and
+    the lines without slots are wrapped, when the template is compiled, so
+    that rendering the message of a recipient only formats the fields which
+    depend on the recipient (and the keywords of the message body), and wraps
+    the lines containing them. The result is the one of
+    `CourseEmailTemplate._render` with a context holding `static_context`.
+    """
+    FIELD_NAME_ROOT = re.compile(r'[^.[]*')
+
+    def __init__(self, format_string, message_body, static_context):
+        segments = self._split_template(format_string, static_context)
+        segments = self._insert_message_body(segments, message_body)
+        self.lines = self._split_lines(segments)
+
+    @classmethod
+    def _split_template(cls, format_string, static_context):
+        """
+        Return the template as a list of static strings and slots, the
+        functions rendering the other fields with a context.
+        """
+        segments = []
+        for literal_text, field_name, format_spec, conversion in Formatter().parse(format_string):
+            segments.append(literal_text)
+            if field_name is None:
+                continue
+            field_format = u'{{{}{}{}}}'.format(
+                field_name,
+                u'!' + conversion if conversion else u'',
+                u':' + format_spec if format_spec else u'',
+            )
+            is_static = cls.FIELD_NAME_ROOT.match(field_name).group() in static_context and '{' not in format_spec
+            if is_static:
+                segments.append(_format_field(field_format, static_context))
+            else:
+                segments.append(partial(_format_field, field_format))
+        return cls._join_strings(segments)
+
+    @staticmethod
+    def _insert_message_body(segments, message_body):
+        """
+        Insert the message body in place of the body tag of the template. It's
+        a slot if its keywords need to be substituted.
+        """
+        # Once formatted, the body tag of the template is the formatted tag.
+        message_body_tag = COURSE_EMAIL_MESSAGE_BODY_TAG.format()
+        if '%%' in message_body:
+            message_body = partial(CourseEmailTemplate._substitute_keywords, message_body)
+
+        for index, segment in enumerate(segments):
+            if isinstance(segment, basestring) and message_body_tag in segment:
+                before, after = segment.split(message_body_tag, 1)
+                segments[index:index + 1] = [before, message_body, after]
+                break
+        return CompiledEmailTemplate._join_strings(segments)
+
+    @staticmethod
+    def _split_lines(segments):
+        """
+        Return the lines of the message: the lines without slots are wrapped
+        strings (consecutive ones being joined), the other ones are lists of
+        strings and slots.
+        """
+        lines = [[]]
+        for segment in segments:
+            if isinstance(segment, basestring):
+                segment_lines = segment.split('\n')
+                lines[-1].append(segment_lines[0])
+                lines.extend([segment_line] for segment_line in segment_lines[1:])
+            else:
+                lines[-1].append(segment)
+
+        compiled_lines = []
+        for line in lines:
+            if all(isinstance(segment, basestring) for segment in line):
+                line = wrap_message(u''.join(line))
+                if compiled_lines and isinstance(compiled_lines[-1], basestring):
+                    compiled_lines[-1] += u'\n' + line
+                    continue
+            else:
+                line = CompiledEmailTemplate._join_strings(line)
+            compiled_lines.append(line)
+        return compiled_lines
+
+    @staticmethod
+    def _join_strings(segments):
+        """
+        Join the consecutive strings of a list of strings and slots.
+        """
+        joined = []
+        for segment in segments:
+            if isinstance(segment, basestring) and joined and isinstance(joined[-1], basestring):
+                joined[-1] += segment
+            else:
+                joined.append(segment)
+        return joined
+
+    def render(self, context):
+        """
+        Render the message with the values of the recipient in `context`.
+        """
+        return u'\n'.join(
+            line if isinstance(line, basestring) else wrap_message(u''.join(
+                segment if isinstance(segment, basestring) else segment(context) for segment in line
+            ))
+            for line in self.lines
+        )
+
 
 class CourseAuthorization(models.Model):
     """
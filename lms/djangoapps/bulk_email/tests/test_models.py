@@ -133,6 +133,20 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def test_compiled_templates(self):
+        template = CourseEmailTemplate.get_template()
+        static_context = self._get_sample_html_context()
+        del static_context['email']
+        plaintext_template = template.compile_plaintext("Dear %%USER_FULLNAME%%,\nMy new plain text.", static_context)
+        html_template = template.compile_htmltext("<p>My new html text.</p>", static_context)
+        for email in ('your-email@test.com', 'other-email@test.com'):
+            context = dict(static_context, email=email, name='Your Name')
+            self.assertEquals(
+                plaintext_template.render(context),
+                template.render_plaintext("Dear %%USER_FULLNAME%%,\nMy new plain text.", context)
+            )
+            self.assertEquals(html_template.render(context), template.render_htmltext("<p>My new html text.</p>", context))
+
 
 class CourseAuthorizationTest(TestCase):
     """Test the CourseAuthorization model."""
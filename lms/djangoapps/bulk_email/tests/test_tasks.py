@@ -27,6 +27,7 @@ from celery.states import SUCCESS, FAILURE
 
 from django.conf import settings
 from django.core.management import call_command
+from django.test.utils import override_settings
 
 from bulk_email.models import CourseEmail, Optout, SEND_TO_ALL
 
@@ -213,6 +214,18 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
         self.assertEquals(parent_status.get('succeeded'), num_emails)
         self.assertEquals(parent_status.get('failed'), 0)
 
+    @override_settings(BULK_EMAIL_CONNECTIONS_PER_SUBTASK=4)
+    def test_successful_on_several_connections(self):
+        # Select number of emails to fit into a single subtask.
+        num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            get_conn.return_value.send_messages.side_effect = cycle([None])
+            self._test_run_with_task(send_bulk_course_email, 'emailed', num_emails, num_emails)
+        self.assertEquals(get_conn.call_count, 4)
+        self.assertEquals(get_conn.return_value.send_messages.call_count, num_emails)
+
     def test_unactivated_user(self):
         # Select number of emails to fit into a single subtask.
         num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
@@ -258,6 +271,10 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
         # Test that celery handles permanent SMTPDataErrors by failing and not retrying.
         self._test_email_address_failures(SMTPDataError(554, "Email address is blacklisted"))
 
+    @override_settings(BULK_EMAIL_CONNECTIONS_PER_SUBTASK=4)
+    def test_smtp_blacklisted_user_on_several_connections(self):
+        self._test_email_address_failures(SMTPDataError(554, "Email address is blacklisted"))
+
     def test_ses_blacklisted_user(self):
         # Test that celery handles permanent SMTPDataErrors by failing and not retrying.
         self._test_email_address_failures(SESAddressBlacklistedError(554, "Email address is blacklisted"))
@@ -320,6 +337,25 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
     def test_retry_after_smtp_disconnect(self):
         self._test_retry_after_limited_retry_error(SMTPServerDisconnected(425, "Disconnecting"))
 
+    @override_settings(BULK_EMAIL_CONNECTIONS_PER_SUBTASK=4)
+    def test_retry_after_smtp_disconnect_on_several_connections(self):
+        num_emails = 5
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            # Have every other mail attempt fail due to disconnection: the failed
+            # recipients of each batch of 4 are retried, the other ones are not.
+            get_conn.return_value.send_messages.side_effect = cycle([SMTPServerDisconnected(425, "Disconnecting"), None])
+            self._test_run_with_task(
+                send_bulk_course_email,
+                'emailed',
+                num_emails,
+                num_emails,
+                retried_withmax=3
+            )
+        # Each recipient was only sent to until it succeeded: 4 + 3 + 2 + 1 attempts
+        self.assertEquals(get_conn.return_value.send_messages.call_count, 10)
+
     def test_max_retry_after_smtp_disconnect(self):
         self._test_max_retry_limit_causes_failure(SMTPServerDisconnected(425, "Disconnecting"))
 
@@ -4,13 +4,16 @@ by the individual custom courses feature.
 """
 import json
 import threading
+import uuid
 
 from contextlib import contextmanager
 
+from django.core.cache import cache
 from django.db import transaction, IntegrityError
 
 from courseware.field_overrides import FieldOverrideProvider  # pylint: disable=import-error
 from ccx import ACTIVE_CCX_KEY  # pylint: disable=import-error
+from request_cache.middleware import RequestCache
 
 from .models import CcxMembership, CcxFieldOverride
 
@@ -94,24 +97,83 @@ def _get_overrides_for_ccx(ccx, block):
     overrides set on this block for this CCX.
     """
     overrides = {}
-    query = CcxFieldOverride.objects.filter(
-        ccx=ccx,
-        location=block.location
-    )
-    for override in query:
-        field = block.fields[override.field]
-        value = field.from_json(json.loads(override.value))
-        overrides[override.field] = value
+    block_overrides = _get_all_overrides_for_ccx(ccx).get(unicode(block.location), {})
+    for name, value in block_overrides.iteritems():
+        field = block.fields[name]
+        overrides[name] = field.from_json(json.loads(value))
     return overrides
 
 
-@transaction.commit_on_success
+def _get_all_overrides_for_ccx(ccx):
+    """
+    Returns a dictionary mapping the locations of the blocks of the `ccx` to a
+    dictionary of their overridden field names and JSON values.
+
+    All the overrides of the CCX are loaded at once, and cached for the
+    request and in memcached, under the current override version of the CCX.
+    The request cache isn't cleared outside of requests (e.g. in celery
+    tasks), so its entry is only used while the version is unchanged.
+    """
+    version = _get_overrides_version(ccx)
+    request_overrides = RequestCache.get_request_cache().data.setdefault('ccx.overrides', {})
+    cached = request_overrides.get(ccx.id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    cache_key = u'ccx.overrides.{}.{}'.format(ccx.id, version)
+    overrides = cache.get(cache_key)
+    if overrides is None:
+        overrides = {}
+        for override in CcxFieldOverride.objects.filter(ccx=ccx):
+            overrides.setdefault(unicode(override.location), {})[override.field] = override.value
+        cache.set(cache_key, overrides)
+
+    request_overrides[ccx.id] = (version, overrides)
+    return overrides
+
+
+def _get_overrides_version(ccx):
+    """
+    Returns the current override version of the `ccx`, which changes every
+    time one of its overrides is changed.
+    """
+    version_key = u'ccx.overrides_version.{}'.format(ccx.id)
+    version = cache.get(version_key)
+    if version is None:
+        version = _bump_overrides_version(ccx)
+    return version
+
+
+def _bump_overrides_version(ccx):
+    """
+    Changes the override version of the `ccx`, so that the overrides cached
+    for the previous version aren't used any more, and returns the new version.
+    """
+    version = uuid.uuid4().hex
+    cache.set(u'ccx.overrides_version.{}'.format(ccx.id), version)
+    RequestCache.get_request_cache().data.get('ccx.overrides', {}).pop(ccx.id, None)
+    return version
+
+
 def override_field_for_ccx(ccx, block, name, value):
     """
     Overrides a field for the `ccx`.  `block` and `name` specify the block
     and the name of the field on that block to override.  `value` is the
     value to set for the given field.
     """
+    _save_override_for_ccx(ccx, block, name, value)
+    # Only bump the version once the override is committed, so that the
+    # previous overrides can't be cached under the new version.
+    _bump_overrides_version(ccx)
+    if hasattr(block, '_ccx_overrides'):
+        block._ccx_overrides.pop(ccx.id, None)  # pylint: disable=protected-access
+
+
+@transaction.commit_on_success
+def _save_override_for_ccx(ccx, block, name, value):
+    """
+    Saves the override of the field `name` of `block` for the `ccx`.
+    """
     field = block.fields[name]
     value = json.dumps(field.to_json(value))
     try:
@@ -128,8 +190,6 @@ def override_field_for_ccx(ccx, block, name, value):
             field=name)
         override.value = value
     override.save()
-    if hasattr(block, '_ccx_overrides'):
-        del block._ccx_overrides[ccx.id]  # pylint: disable=protected-access
 
 
 def clear_override_for_ccx(ccx, block, name):
@@ -145,8 +205,9 @@ def clear_override_for_ccx(ccx, block, name):
             location=block.location,
             field=name).delete()
 
+        _bump_overrides_version(ccx)
         if hasattr(block, '_ccx_overrides'):
-            del block._ccx_overrides[ccx.id]  # pylint: disable=protected-access
+            block._ccx_overrides.pop(ccx.id, None)  # pylint: disable=protected-access
 
     except CcxFieldOverride.DoesNotExist:
         pass
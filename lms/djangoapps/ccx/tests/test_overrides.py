@@ -6,13 +6,15 @@ import mock
 import pytz
 
 from courseware.field_overrides import OverrideFieldData  # pylint: disable=import-error
+from django.core.cache import cache
 from django.test.utils import override_settings
+from request_cache.middleware import RequestCache
 from student.tests.factories import AdminFactory  # pylint: disable=import-error
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 from ..models import CustomCourseForEdX
-from ..overrides import override_field_for_ccx
+from ..overrides import clear_override_for_ccx, override_field_for_ccx
 
 from .test_views import flatten, iter_blocks
 
@@ -127,3 +129,58 @@ class TestFieldOverrides(ModuleStoreTestCase):
         override_field_for_ccx(self.ccx, chapter, 'due', ccx_due)
         vertical = chapter.get_children()[0].get_children()[0]
         self.assertEqual(vertical.due, ccx_due)
+
+    def test_overrides_are_loaded_once(self):
+        """
+        Test that all the overrides of the CCX are loaded with one query, and
+        then cached.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapters = self.course.get_children()
+        for chapter in chapters:
+            override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
+
+        def new_request():
+            """
+            Forget what the blocks and the request cached.
+            """
+            RequestCache().clear_request_cache()
+            for block in iter_blocks(self.course):
+                block.__dict__.pop('_ccx_overrides', None)
+
+        new_request()
+        cache.clear()
+        with self.assertNumQueries(1):
+            for block in iter_blocks(self.course):
+                dummy = block.start
+        self.assertEqual([chapter.start for chapter in chapters], [ccx_start] * len(chapters))
+
+        # The next request gets the overrides from memcached
+        new_request()
+        with self.assertNumQueries(0):
+            self.assertEqual([chapter.start for chapter in chapters], [ccx_start] * len(chapters))
+
+        # Until they change
+        clear_override_for_ccx(self.ccx, chapters[0], 'start')
+        new_request()
+        self.assertEqual(chapters[0].start, self.mooc_start)
+        self.assertEqual(chapters[1].start, ccx_start)
+
+    def test_overrides_changed_outside_of_the_request(self):
+        """
+        Test that the overrides cached for the request are dropped when they
+        are changed by another process, as the request cache is never cleared
+        outside of requests.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapter = self.course.get_children()[0]
+        override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
+        self.assertEqual(chapter.start, ccx_start)
+
+        # Another process clears the override: our request cache is left as is
+        request_cache = dict(RequestCache.get_request_cache().data['ccx.overrides'])
+        clear_override_for_ccx(self.ccx, chapter, 'start')
+        RequestCache.get_request_cache().data['ccx.overrides'] = request_cache
+        chapter.__dict__.pop('_ccx_overrides', None)
+
+        self.assertEqual(chapter.start, self.mooc_start)
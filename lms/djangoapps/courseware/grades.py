@@ -1,26 +1,28 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 from collections import defaultdict
+from itertools import islice
 import json
 import random
 import logging
 
 from contextlib import contextmanager
 from django.conf import settings
-from django.db import transaction
+from django.db import transaction, IntegrityError
+from django.utils import timezone
 from django.test.client import RequestFactory
 
 import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
-from courseware.model_data import FieldDataCache
+from courseware.model_data import FieldDataCache, ScoresClient
 from student.models import anonymous_id_for_user
 from util.module_utils import yield_dynamic_descriptor_descendents
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
-from .models import StudentModule
+from .models import StudentModule, StudentSubsectionGrade
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
@@ -29,6 +31,10 @@ from opaque_keys.edx.keys import CourseKey
 
 log = logging.getLogger("edx.courseware")
 
+# The number of students whose StudentModule scores are fetched at once when
+# grading many students.
+GRADES_PREFETCH_CHUNK_SIZE = 100
+
 
 def answer_distributions(course_key):
     """
@@ -122,16 +128,16 @@ def answer_distributions(course_key):
 
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False):
+def grade(student, request, course, keep_raw_scores=False, scores_client=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     """
     with manual_transaction():
-        return _grade(student, request, course, keep_raw_scores)
+        return _grade(student, request, course, keep_raw_scores, scores_client)
 
 
-def _grade(student, request, course, keep_raw_scores):
+def _grade(student, request, course, keep_raw_scores, scores_client=None):
     """
     Unwrapped version of "grade"
 
@@ -149,6 +155,8 @@ def _grade(student, request, course, keep_raw_scores):
       make up the final grade. (For display)
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
+    - scores_client : an optional `ScoresClient` holding the prefetched
+      StudentModule scores of this student, used instead of querying them
 
     More information on the format is in the docstring for CourseGrader.
     """
@@ -161,6 +169,7 @@ def _grade(student, request, course, keep_raw_scores):
     submissions_scores = sub_api.get_scores(
         course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
     )
+    grade_store = SubsectionGradeStore(student, course.id)
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -171,68 +180,77 @@ def _grade(student, request, course, keep_raw_scores):
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
 
-            # some problems have state that is updated independently of interaction
-            # with the LMS, so they need to always be scored. (E.g. foldit.,
-            # combinedopenended)
-            should_grade_section = any(
-                descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
-            )
+            # Use the persisted scores of this subsection, if they are still
+            # up to date.
+            scores = grade_store.get(section_descriptor, submissions_scores)
 
-            # If there are no problems that always have to be regraded, check to
-            # see if any of our locations are in the scores from the submissions
-            # API. If scores exist, we have to calculate grades for this section.
-            if not should_grade_section:
+            if scores is None:
+                # some problems have state that is updated independently of interaction
+                # with the LMS, so they need to always be scored. (E.g. foldit.,
+                # combinedopenended)
                 should_grade_section = any(
-                    descriptor.location.to_deprecated_string() in submissions_scores
-                    for descriptor in section['xmoduledescriptors']
+                    descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
                 )
 
-            if not should_grade_section:
-                with manual_transaction():
-                    should_grade_section = StudentModule.objects.filter(
-                        student=student,
-                        module_state_key__in=[
-                            descriptor.location for descriptor in section['xmoduledescriptors']
-                        ]
-                    ).exists()
-
-            # If we haven't seen a single problem in the section, we don't have
-            # to grade it at all! We can assume 0%
-            if should_grade_section:
-                scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    with manual_transaction():
-                        field_data_cache = FieldDataCache([descriptor], course.id, student)
-                    return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
-
-                    (correct, total) = get_score(
-                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores
+                # If there are no problems that always have to be regraded, check to
+                # see if any of our locations are in the scores from the submissions
+                # API. If scores exist, we have to calculate grades for this section.
+                if not should_grade_section:
+                    should_grade_section = any(
+                        descriptor.location.to_deprecated_string() in submissions_scores
+                        for descriptor in section['xmoduledescriptors']
+                    )
+
+                if not should_grade_section:
+                    section_locations = [descriptor.location for descriptor in section['xmoduledescriptors']]
+                    if scores_client is not None and scores_client.has_user(student.id):
+                        should_grade_section = scores_client.has_state(student.id, section_locations)
+                    else:
+                        with manual_transaction():
+                            should_grade_section = StudentModule.objects.filter(
+                                student=student,
+                                module_state_key__in=section_locations
+                            ).exists()
+
+                # If we haven't seen a single problem in the section, we don't have
+                # to grade it at all! We can assume 0%
+                if should_grade_section:
+                    def create_module(descriptor):
+                        '''creates an XModule instance given a descriptor'''
+                        # TODO: We need the request to pass into here. If we could forego that, our arguments
+                        # would be simpler
+                        with manual_transaction():
+                            field_data_cache = FieldDataCache([descriptor], course.id, student)
+                        return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+
+                    scores = _compute_subsection_scores(
+                        course.id,
+                        student,
+                        section_descriptor,
+                        create_module,
+                        submissions_scores,
+                        grade_store,
+                        scores_client=scores_client
                     )
-                    if correct is None and total is None:
-                        continue
 
+            if scores is not None:
+                section_scores = []
+                for (correct, total, graded, display_name) in scores:
                     if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
                         if total > 1:
                             correct = random.randrange(max(total - 2, 1), total + 1)
                         else:
                             correct = total
 
-                    graded = module_descriptor.graded
                     if not total > 0:
                         #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
                         graded = False
 
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                    section_scores.append(Score(correct, total, graded, display_name))
 
-                _, graded_total = graders.aggregate_scores(scores, section_name)
+                _, graded_total = graders.aggregate_scores(section_scores, section_name)
                 if keep_raw_scores:
-                    raw_scores += scores
+                    raw_scores += section_scores
             else:
                 graded_total = Score(0.0, 1.0, True, section_name)
 
@@ -322,9 +340,12 @@ def _progress_summary(student, request, course):
 
     """
     with manual_transaction():
-        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course.id, student, course, depth=None
-        )
+        if settings.FEATURES.get('ENABLE_COURSE_WIDE_FIELD_DATA_CACHE', False):
+            field_data_cache = FieldDataCache.cache_for_course(course.id, student)
+        else:
+            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+                course.id, student, course, depth=None
+            )
         # TODO: We need the request to pass into here. If we could
         # forego that, our arguments would be simpler
         course_module = get_module_for_descriptor(student, request, course, field_data_cache, course.id)
@@ -335,6 +356,7 @@ def _progress_summary(student, request, course):
         course_module = getattr(course_module, '_x_module', course_module)
 
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
+    grade_store = SubsectionGradeStore(student, course.id)
 
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
@@ -352,19 +374,20 @@ def _progress_summary(student, request, course):
                     continue
 
                 graded = section_module.graded
-                scores = []
-
-                module_creator = section_module.xmodule_runtime.get_module
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
-                    course_id = course.id
-                    (correct, total) = get_score(
-                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
+                scores = grade_store.get(section_module, submissions_scores)
+                if scores is None:
+                    scores = _compute_subsection_scores(
+                        course.id,
+                        student,
+                        section_module,
+                        section_module.xmodule_runtime.get_module,
+                        submissions_scores,
+                        grade_store
                     )
-                    if correct is None and total is None:
-                        continue
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                scores = [
+                    Score(correct, total, graded, display_name)
+                    for (correct, total, _, display_name) in scores
+                ]
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -391,7 +414,177 @@ def _progress_summary(student, request, course):
     return chapters
 
 
-def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
+def _subsection_content_version(section):
+    """
+    Return a string identifying the current content of the subsection
+    (including its descendants), or None if the modulestore doesn't track it.
+    """
+    descriptor = getattr(section, 'descriptor', section)
+    try:
+        edited_on = descriptor.subtree_edited_on
+    except (AttributeError, NotImplementedError):
+        return None
+    if edited_on is None:
+        return None
+    return unicode(edited_on.isoformat())
+
+
+class SubsectionGradeStore(object):
+    """
+    Reads and writes the persisted per-subsection scores of a student (see
+    `courseware.models.StudentSubsectionGrade`).
+
+    All of the student's stored rows for the course are loaded with a single
+    query when the store is created. A stored row is only returned if it is
+    not stale, was computed against the current content version of the
+    subsection, and the submissions API scores it was computed from haven't
+    changed since.
+    """
+    def __init__(self, student, course_key):
+        self.student = student
+        self.course_key = course_key
+        self.enabled = (
+            settings.FEATURES.get('ENABLE_SUBSECTION_GRADES_STORE', False) and
+            not settings.GENERATE_PROFILE_SCORES and
+            student.is_authenticated()
+        )
+        self._rows = {}
+        if self.enabled:
+            with manual_transaction():
+                self._rows = {
+                    row.usage_key.map_into_course(course_key): row
+                    for row in StudentSubsectionGrade.objects.filter(user=student, course_id=course_key)
+                }
+
+    def get(self, section, submissions_scores):
+        """
+        Return the stored list of (correct, total, graded, display_name)
+        tuples for `section`, or None if there is no up-to-date entry.
+        """
+        if not self.enabled:
+            return None
+
+        row = self._rows.get(section.location)
+        if row is None or row.stale:
+            return None
+
+        content_version = _subsection_content_version(section)
+        if content_version is None or row.content_version != content_version:
+            return None
+
+        stored_submissions = json.loads(row.submissions_scores)
+        for location_url, score in stored_submissions.iteritems():
+            current = submissions_scores.get(location_url)
+            if (list(current) if current is not None else None) != score:
+                return None
+
+        return [tuple(score) for score in json.loads(row.scores)]
+
+    def set(self, section, scores, submissions_used):
+        """
+        Persist `scores` (a list of (correct, total, graded, display_name)
+        tuples) for `section`. `submissions_used` maps the location of every
+        scorable block of the subsection to the submissions API score that
+        was used for it, or None.
+
+        The write only happens if the row still has the version read when the
+        store was created, before the scores were computed, and a row is only
+        inserted if there was none; if a score change invalidated the row (or
+        created a stale one) in between, it is left stale.
+        """
+        if not self.enabled:
+            return
+
+        content_version = _subsection_content_version(section)
+        if content_version is None:
+            return
+
+        fields = {
+            'content_version': content_version,
+            'scores': json.dumps(scores),
+            'submissions_scores': json.dumps(submissions_used),
+            'stale': False,
+        }
+        row = self._rows.pop(section.location, None)
+        if row is None:
+            with manual_transaction():
+                try:
+                    row = StudentSubsectionGrade.objects.create(
+                        user=self.student,
+                        course_id=self.course_key,
+                        usage_key=section.location,
+                        **fields
+                    )
+                except IntegrityError:
+                    # The row was created meanwhile, by an invalidation or
+                    # another grading of the subsection
+                    transaction.rollback()
+                    return
+            self._rows[section.location] = row
+            return
+
+        fields.update(version=row.version + 1, modified=timezone.now())
+        with manual_transaction():
+            updated = StudentSubsectionGrade.objects.filter(pk=row.pk, version=row.version).update(**fields)
+        if updated:
+            for name, value in fields.iteritems():
+                setattr(row, name, value)
+            self._rows[section.location] = row
+
+
+def _compute_subsection_scores(course_id, student, section, module_creator, submissions_scores, grade_store,
+                               scores_client=None):
+    """
+    Score every problem in the subsection and return a list of
+    (correct, total, graded, display_name) tuples, which is also saved to
+    `grade_store` unless the subsection has problems that always have to be
+    regraded, or content that depends on the groups or cohort of the student
+    (split tests, library content, group restricted blocks). Changing those
+    doesn't change any StudentModule, so the stored scores wouldn't be
+    invalidated.
+    """
+    scores = []
+    submissions_used = {}
+    always_recalculate = _is_group_restricted(getattr(section, 'merged_group_access', None))
+
+    for module_descriptor in yield_dynamic_descriptor_descendents(section, module_creator):
+        location_url = module_descriptor.location.to_deprecated_string()
+        if module_descriptor.has_score or location_url in submissions_scores:
+            submissions_used[location_url] = submissions_scores.get(location_url)
+        always_recalculate = (
+            always_recalculate or
+            module_descriptor.always_recalculate_grades or
+            module_descriptor.has_dynamic_children() or
+            _is_group_restricted(getattr(module_descriptor, 'group_access', None))
+        )
+
+        (correct, total) = get_score(
+            course_id,
+            student,
+            module_descriptor,
+            module_creator,
+            scores_cache=submissions_scores,
+            scores_client=scores_client
+        )
+        if correct is None and total is None:
+            continue
+
+        scores.append((correct, total, module_descriptor.graded, module_descriptor.display_name_with_default))
+
+    if not always_recalculate:
+        grade_store.set(section, scores, submissions_used)
+
+    return scores
+
+
+def _is_group_restricted(group_access):
+    """
+    Return whether `group_access` restricts a block to some groups of the students.
+    """
+    return any(group_ids for group_ids in (group_access or {}).itervalues())
+
+
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None, scores_client=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -405,6 +598,8 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
            Can return None if user doesn't have access, or if something else went wrong.
     scores_cache: A dict of location names to (earned, possible) point tuples.
            If an entry is found in this cache, it takes precedence.
+    scores_client: An optional `ScoresClient` with the prefetched StudentModule
+           scores of the user. If given, it is used instead of querying StudentModule.
     """
     scores_cache = scores_cache or {}
 
@@ -431,18 +626,22 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
         # These are not problems, and do not have a score
         return (None, None)
 
-    try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
-        )
-    except StudentModule.DoesNotExist:
-        student_module = None
+    if scores_client is not None and scores_client.has_user(user.id):
+        stored_score = scores_client.get(user.id, problem_descriptor.location)
+    else:
+        try:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+            stored_score = (student_module.grade, student_module.max_grade)
+        except StudentModule.DoesNotExist:
+            stored_score = None
 
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
+    if stored_score is not None and stored_score[1] is not None:
+        correct = stored_score[0] if stored_score[0] is not None else 0
+        total = stored_score[1]
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
         # we need to instantiate the problem.
@@ -463,7 +662,7 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(problem_descriptor.location))
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -484,7 +683,7 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_or_id, students):
+def iterate_grades_for(course_or_id, students, chunk_size=GRADES_PREFETCH_CHUNK_SIZE):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
@@ -501,6 +700,9 @@ def iterate_grades_for(course_or_id, students):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    Students are graded in chunks of `chunk_size`, and the StudentModule
+    scores of each chunk are fetched with a single query up front.
     """
     if isinstance(course_or_id, (basestring, CourseKey)):
         course = courses.get_course_by_id(course_or_id)
@@ -512,25 +714,34 @@ def iterate_grades_for(course_or_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
-            try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course.id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    students = iter(students)
+    while True:
+        students_chunk = list(islice(students, chunk_size))
+        if not students_chunk:
+            break
+
+        with manual_transaction():
+            scores_client = ScoresClient(course.id, [student.id for student in students_chunk])
+
+        for student in students_chunk:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
+                try:
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    gradeset = grade(student, request, course, scores_client=scores_client)
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course.id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
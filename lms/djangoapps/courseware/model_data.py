@@ -7,9 +7,11 @@ from collections import defaultdict
 from itertools import chain
 from .models import (
     StudentModule,
+    StudentModuleHistory,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
-    XModuleStudentInfoField
+    XModuleStudentInfoField,
+    invalidate_subsection_grade,
 )
 import logging
 from opaque_keys.edx.keys import CourseKey
@@ -17,6 +19,8 @@ from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.asides import AsideUsageKeyV1
 
 from django.db import DatabaseError
+from django.db.models import Q
+from django.utils import timezone
 
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
@@ -47,7 +51,7 @@ class FieldDataCache(object):
     A cache of django model objects needed to supply the data
     for a module and its decendants
     """
-    def __init__(self, descriptors, course_id, user, select_for_update=False, asides=None):
+    def __init__(self, descriptors, course_id, user, select_for_update=False, asides=None, write_behind=False):
         '''
         Find any courseware.models objects that are needed by any descriptor
         in descriptors. Attempts to minimize the number of queries to the database.
@@ -60,9 +64,20 @@ class FieldDataCache(object):
         user: The user for which to cache data
         select_for_update: True if rows should be locked until end of transaction
         asides: The list of aside types to load, or None to prefetch no asides.
+        write_behind: True if the field objects changed through a DjangoKeyValueStore
+            should only be written to the database by `flush_writes`
         '''
         self.cache = {}
         self.select_for_update = select_for_update
+        self.write_behind = write_behind
+        # Maps the field objects changed since the last `flush_writes` to the
+        # names of the fields changed on them
+        self.dirty_field_objects = {}
+        # The StudentModules whose grade changed since the last `flush_writes`
+        self.dirty_grades = set()
+        # True once every field object of `user` in `course_id` has been
+        # loaded by `add_course_to_cache`
+        self.course_wide = False
 
         if asides is None:
             self.asides = []
@@ -79,6 +94,9 @@ class FieldDataCache(object):
         """
         Add all `descriptors` to this FieldDataCache.
         """
+        if self.course_wide:
+            return
+
         if self.user.is_authenticated():
             for scope, fields in self._fields_to_cache(descriptors).items():
                 for field_object in self._retrieve_fields(scope, fields, descriptors):
@@ -119,6 +137,10 @@ class FieldDataCache(object):
 
             return descriptors
 
+        if self.course_wide:
+            # Nothing to add, so don't bother walking the descriptors
+            return
+
         with modulestore().bulk_operations(descriptor.location.course_key):
             descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
 
@@ -127,7 +149,7 @@ class FieldDataCache(object):
     @classmethod
     def cache_for_descriptor_descendents(cls, course_id, user, descriptor, depth=None,
                                          descriptor_filter=lambda descriptor: True,
-                                         select_for_update=False, asides=None):
+                                         select_for_update=False, asides=None, write_behind=False):
         """
         course_id: the course in the context of which we want StudentModules.
         user: the django user for whom to load modules.
@@ -137,11 +159,63 @@ class FieldDataCache(object):
         descriptor_filter is a function that accepts a descriptor and return wether the StudentModule
             should be cached
         select_for_update: Flag indicating whether the rows should be locked until end of transaction
+        write_behind: Flag indicating whether writes should be deferred until `flush_writes` is called
         """
-        cache = FieldDataCache([], course_id, user, select_for_update, asides=asides)
+        cache = FieldDataCache([], course_id, user, select_for_update, asides=asides, write_behind=write_behind)
         cache.add_descriptor_descendents(descriptor, depth, descriptor_filter)
         return cache
 
+    def add_course_to_cache(self):
+        """
+        Add all the field objects of the user in the course to this
+        FieldDataCache, with a single query per scope, and without needing
+        to traverse the course descriptors first.
+        """
+        if not self.user.is_authenticated() or self.course_wide:
+            return
+
+        field_objects_by_scope = (
+            (Scope.user_state, self._query(StudentModule, course_id=self.course_id, student=self.user.pk)),
+            (Scope.user_state_summary, self._query(XModuleUserStateSummaryField).filter(self._course_usage_ids_q())),
+            (Scope.preferences, self._query(XModuleStudentPrefsField, student=self.user.pk)),
+            (Scope.user_info, self._query(XModuleStudentInfoField, student=self.user.pk)),
+        )
+        for scope, field_objects in field_objects_by_scope:
+            for field_object in field_objects:
+                self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+
+        self.course_wide = True
+
+    @classmethod
+    def cache_for_course(cls, course_id, user, select_for_update=False, asides=None):
+        """
+        course_id: the course in the context of which we want StudentModules.
+        user: the django user for whom to load modules.
+        select_for_update: Flag indicating whether the rows should be locked until end of transaction
+
+        Return a FieldDataCache holding all the field objects of `user` in
+        `course_id` (see `add_course_to_cache`).
+        """
+        cache = FieldDataCache([], course_id, user, select_for_update, asides=asides)
+        cache.add_course_to_cache()
+        return cache
+
+    def _course_usage_ids_q(self):
+        """
+        Return a Q object matching the usage_ids of all the blocks of the
+        course (and of their asides), as they are stored in the database.
+        """
+        marker = u'fielddatacachemarker'
+        usage_id = self.course_id.make_usage_key(marker, marker)
+        usage_ids = [usage_id] + [AsideUsageKeyV1(usage_id, aside_type) for aside_type in self.asides]
+
+        usage_id_field = XModuleUserStateSummaryField._meta.get_field('usage_id')
+        usage_ids_q = Q()
+        for usage_id in usage_ids:
+            stored_usage_id = usage_id_field.get_prep_value(usage_id)
+            usage_ids_q |= Q(usage_id__startswith=stored_usage_id[:stored_usage_id.index(marker)])
+        return usage_ids_q
+
     def _query(self, model_class, **kwargs):
         """
         Queries model_class with **kwargs, optionally adding select_for_update if
@@ -323,6 +397,67 @@ class FieldDataCache(object):
         self.cache[cache_key] = field_object
         return field_object
 
+    def mark_dirty(self, field_object, field_names):
+        """
+        Record that the fields `field_names` of `field_object` were changed,
+        to be written out by `flush_writes`.
+        """
+        self.dirty_field_objects.setdefault(field_object, []).extend(field_names)
+
+    def mark_grade_dirty(self, student_module):
+        """
+        Record that the grade and max_grade of `student_module` were changed,
+        to be written out by `flush_writes` with the rest of its changes.
+        """
+        self.dirty_field_objects.setdefault(student_module, [])
+        self.dirty_grades.add(student_module)
+
+    def flush_writes(self):
+        """
+        Write out all the field objects changed since the last flush, however
+        many times each of them was changed. The state of all the dirty
+        StudentModules is updated with one query each (without re-saving the
+        rest of the row), and their history entries are inserted with a single
+        query. Other field objects are saved individually.
+
+        Raises KeyValueMultiSaveError, listing the names of the fields that
+        were saved, if a write fails.
+        """
+        dirty_field_objects, self.dirty_field_objects = self.dirty_field_objects, {}
+        dirty_grades, self.dirty_grades = self.dirty_grades, set()
+        saved_fields = []
+        history_entries = []
+        for field_object, field_names in dirty_field_objects.iteritems():
+            try:
+                if isinstance(field_object, StudentModule):
+                    field_object.modified = timezone.now()
+                    columns = {'state': field_object.state, 'modified': field_object.modified}
+                    if field_object in dirty_grades:
+                        columns.update(grade=field_object.grade, max_grade=field_object.max_grade)
+                    StudentModule.objects.filter(pk=field_object.pk).update(**columns)
+                    if field_object in dirty_grades:
+                        # update() doesn't send post_save, which the stored
+                        # subsection grades rely on to notice score changes
+                        invalidate_subsection_grade(StudentModule, field_object, created=False)
+                    if field_object.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES:
+                        history_entries.append(StudentModuleHistory(
+                            student_module=field_object,
+                            version=None,
+                            created=field_object.modified,
+                            state=field_object.state,
+                            grade=field_object.grade,
+                            max_grade=field_object.max_grade
+                        ))
+                else:
+                    field_object.save()
+            except DatabaseError:
+                log.exception('Error saving fields %r', field_names)
+                raise KeyValueMultiSaveError(saved_fields)
+            saved_fields.extend(field_names)
+
+        if history_entries:
+            StudentModuleHistory.objects.bulk_create(history_entries)
+
 
 class DjangoKeyValueStore(KeyValueStore):
     """
@@ -404,6 +539,12 @@ class DjangoKeyValueStore(KeyValueStore):
                 # we don't have to worry about conflicts
                 field_object.value = json.dumps(kv_dict[field])
 
+        if self._field_data_cache.write_behind:
+            # The field objects will be saved by FieldDataCache.flush_writes
+            for field_object, fields in field_objects.iteritems():
+                self._field_data_cache.mark_dirty(field_object, [field.field_name for field in fields])
+            return
+
         for field_object in field_objects:
             try:
                 # Save the field object that we made above
@@ -427,8 +568,14 @@ class DjangoKeyValueStore(KeyValueStore):
             state = json.loads(field_object.state)
             del state[key.field_name]
             field_object.state = json.dumps(state)
-            field_object.save()
+            if self._field_data_cache.write_behind:
+                self._field_data_cache.mark_dirty(field_object, [key.field_name])
+            else:
+                field_object.save()
         else:
+            # Don't let a pending write recreate the deleted row
+            self._field_data_cache.dirty_field_objects.pop(field_object, None)
+            self._field_data_cache.dirty_grades.discard(field_object)
             field_object.delete()
 
     def has(self, key):
@@ -443,3 +590,50 @@ class DjangoKeyValueStore(KeyValueStore):
             return key.field_name in json.loads(field_object.state)
         else:
             return True
+
+
+class ScoresClient(object):
+    """
+    Prefetches the scores stored in StudentModule (`grade` and `max_grade`)
+    for many students of a course at once, so that grading them doesn't need
+    a query per student and problem.
+    """
+    def __init__(self, course_key, user_ids, chunk_size=500):
+        """
+        Fetch the scores of all the StudentModules of the users in `user_ids`
+        in the course, with one query per `chunk_size` users.
+        """
+        self.course_key = course_key
+        self.user_ids = set(user_ids)
+        # Maps (user_id, usage_key) -> (grade, max_grade)
+        self._scores = {}
+
+        for user_ids_chunk in chunks(self.user_ids, chunk_size):
+            student_modules = StudentModule.objects.filter(
+                course_id=course_key,
+                student_id__in=user_ids_chunk,
+            ).only('student', 'module_state_key', 'grade', 'max_grade')
+            for student_module in student_modules:
+                usage_key = student_module.module_state_key.map_into_course(course_key)
+                self._scores[(student_module.student_id, usage_key)] = (
+                    student_module.grade, student_module.max_grade
+                )
+
+    def has_user(self, user_id):
+        """
+        Return whether the scores of `user_id` were fetched by this client.
+        """
+        return user_id in self.user_ids
+
+    def get(self, user_id, usage_key):
+        """
+        Return the (grade, max_grade) tuple stored for the user and block,
+        or None if the user has no StudentModule for the block.
+        """
+        return self._scores.get((user_id, usage_key))
+
+    def has_state(self, user_id, usage_keys):
+        """
+        Return whether the user has a StudentModule for any of `usage_keys`.
+        """
+        return any((user_id, usage_key) in self._scores for usage_key in usage_keys)
@@ -12,16 +12,21 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import logging
+
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from model_utils.models import TimeStampedModel
 
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField  # pylint: disable=import-error
 
+log = logging.getLogger("edx.courseware")
+
 
 class StudentModule(models.Model):
     """
@@ -233,6 +238,134 @@ class OfflineComputedGradeLog(models.Model):
         return "[OCGLog] %s: %s" % (self.course_id.to_deprecated_string(), self.created)  # pylint: disable=no-member
 
 
+class StudentSubsectionGrade(TimeStampedModel):
+    """
+    Persisted per-subsection scores for a student, used by `courseware.grades`
+    to avoid re-walking and re-scoring subsections that have not changed.
+
+    A row is only trusted while its `content_version` matches the subsection's
+    current content version and it has not been marked `stale` by a score
+    change on one of the subsection's problems.
+    """
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The usage key of the subsection (sequential) these scores belong to
+    usage_key = LocationKeyField(max_length=255, db_index=True)
+
+    # The content version of the subsection the scores were computed against
+    content_version = models.CharField(max_length=255, blank=True)
+
+    # Scores of the problems in the subsection, stored as JSON list of
+    # [earned, possible, graded, display_name]
+    scores = models.TextField(default='[]')
+
+    # Scores from the submissions API that were used to compute `scores`,
+    # stored as a JSON dict of location -> [earned, possible]
+    submissions_scores = models.TextField(default='{}')
+
+    stale = models.BooleanField(default=False)
+
+    # Incremented on every write and invalidation, so that scores computed
+    # from an outdated read of the row are not saved over an invalidation
+    version = models.IntegerField(default=0)
+
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('user', 'course_id', 'usage_key'),)
+
+    @classmethod
+    def invalidate(cls, user_id, course_id, usage_keys=None):
+        """
+        Mark the stored subsection grades of the given user in the given course
+        as stale, so they get recomputed the next time they are read. If
+        `usage_keys` is None, all of the user's subsections are invalidated.
+
+        The subsections of `usage_keys` which have no row yet get a stale one,
+        so that scores being computed from the state before the invalidation
+        can't be stored afterwards (see `SubsectionGradeStore.set`).
+        """
+        rows = cls.objects.filter(user_id=user_id, course_id=course_id)
+        if usage_keys is not None:
+            rows = rows.filter(usage_key__in=usage_keys)
+        updated = rows.update(stale=True, version=F('version') + 1)
+        if usage_keys is not None and updated < len(usage_keys):
+            for usage_key in usage_keys:
+                cls.objects.get_or_create(
+                    user_id=user_id,
+                    course_id=course_id,
+                    usage_key=usage_key,
+                    defaults={'stale': True},
+                )
+
+    def __unicode__(self):
+        return u"[StudentSubsectionGrade] {}: {} {} (stale={})".format(
+            self.user_id, self.course_id, self.usage_key, self.stale
+        )
+
+
+def _subsection_for_block(course_id, usage_key):
+    """
+    Return the usage key of the subsection containing the block at
+    `usage_key`, or None if it cannot be determined, e.g. because the block
+    has several parents.
+
+    The subsection is looked up in the block index of the course, which is
+    built when the course is published, else found by walking up the
+    parents of the block.
+    """
+    from openedx.core.djangoapps.content.course_structures.block_index import (  # pylint: disable=import-error
+        get_block_index_entries, get_parent_location
+    )
+
+    usage_key = usage_key.map_into_course(course_id)
+    entry = (get_block_index_entries(course_id, [usage_key]) or {}).get(usage_key)
+    if entry is not None:
+        if entry.get('section') is None:
+            return None
+        return course_id.make_usage_key(*entry['section'])
+
+    # The subsection is the block two levels below the course on the way up
+    path = [usage_key]
+    while path[-1] is not None:
+        path.append(get_parent_location(path[-1]))
+    path.pop()
+    if len(path) < 3 or path[-1].block_type != 'course':
+        return None
+    return path[-3]
+
+
+@receiver(post_save, sender=StudentModule)
+@receiver(post_delete, sender=StudentModule)
+def invalidate_subsection_grade(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Marks the stored grade of the subsection containing the StudentModule's
+    block as stale whenever a score could have changed. Saves that only touch
+    module state of an already existing, ungraded module can't change the
+    score and are ignored.
+    """
+    if not settings.FEATURES.get('ENABLE_SUBSECTION_GRADES_STORE', False):
+        return
+
+    is_save = 'created' in kwargs
+    if is_save and not kwargs['created'] and instance.grade is None and instance.max_grade is None:
+        return
+
+    try:
+        subsection_key = _subsection_for_block(instance.course_id, instance.module_state_key)
+    except Exception:  # pylint: disable=broad-except
+        log.exception(
+            u"Could not find subsection of %s, invalidating all subsection grades of user %s in %s",
+            instance.module_state_key, instance.student_id, instance.course_id
+        )
+        subsection_key = None
+
+    StudentSubsectionGrade.invalidate(
+        instance.student_id,
+        instance.course_id,
+        usage_keys=[subsection_key] if subsection_key is not None else None
+    )
+
+
 class StudentFieldOverride(TimeStampedModel):
     """
     Holds the value of a specific field overriden for a student.  This is used
@@ -6,6 +6,7 @@ import hashlib
 import json
 import logging
 import mimetypes
+import sys
 
 import static_replace
 import xblock.reference.plugins
@@ -425,8 +426,12 @@ def get_module_system_for_user(user, field_data_cache,
         # Update the grades
         student_module.grade = event.get('value')
         student_module.max_grade = event.get('max_value')
-        # Save all changes to the underlying KeyValueStore
-        student_module.save()
+        if field_data_cache.write_behind:
+            # Written out with the state changes of the handler
+            field_data_cache.mark_grade_dirty(student_module)
+        else:
+            # Save all changes to the underlying KeyValueStore
+            student_module.save()
 
         # Bin score into range and increment stats
         score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
@@ -815,11 +820,13 @@ def xblock_resource(request, block_type, uri):  # pylint: disable=unused-argumen
     return HttpResponse(content, mimetype=mimetype)
 
 
-def _get_module_by_usage_id(request, course_id, usage_id):
+def _get_module_by_usage_id(request, course_id, usage_id, write_behind=False):
     """
-    Gets a module instance based on its `usage_id` in a course, for a given request/user
+    Gets a module instance based on its `usage_id` in a course, for a given request/user.
+    If `write_behind` is True, changes to the student state are only written to the
+    database by `field_data_cache.flush_writes()`.
 
-    Returns (instance, tracking_context)
+    Returns (instance, tracking_context, field_data_cache)
     """
     user = request.user
 
@@ -856,7 +863,8 @@ def _get_module_by_usage_id(request, course_id, usage_id):
     field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
         course_id,
         user,
-        descriptor
+        descriptor,
+        write_behind=write_behind
     )
     setup_masquerade(request, course_id, has_access(user, 'staff', descriptor, course_id))
     instance = get_module(user, request, usage_key, field_data_cache, grade_bucket_type='ajax')
@@ -866,7 +874,7 @@ def _get_module_by_usage_id(request, course_id, usage_id):
         log.debug("No module %s for user %s -- access denied?", usage_key, user)
         raise Http404
 
-    return (instance, tracking_context)
+    return (instance, tracking_context, field_data_cache)
 
 
 def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix):
@@ -887,13 +895,28 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix):
     if error_msg:
         return JsonResponse(object={'success': error_msg}, status=413)
 
-    instance, tracking_context = _get_module_by_usage_id(request, course_id, usage_id)
+    # Coalesce all the writes of the student state made while handling the
+    # request, and write them out once the handler is done
+    instance, tracking_context, field_data_cache = _get_module_by_usage_id(
+        request, course_id, usage_id, write_behind=settings.FEATURES.get('ENABLE_STUDENT_STATE_WRITE_BEHIND', False)
+    )
 
     tracking_context_name = 'module_callback_handler'
     req = django_to_webob_request(request)
     try:
         with tracker.get_tracker().context(tracking_context_name, tracking_context):
-            resp = instance.handle(handler, req, suffix)
+            try:
+                resp = instance.handle(handler, req, suffix)
+            except Exception:
+                # Keep the changes made before the failure, as they would be
+                # without write-behind, but don't hide the handler's error
+                exc_info = sys.exc_info()
+                try:
+                    field_data_cache.flush_writes()
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Failed to write the student state changed by the failed handler %r", handler)
+                raise exc_info[0], exc_info[1], exc_info[2]
+            field_data_cache.flush_writes()
 
     except NoSuchHandlerError:
         log.exception("XBlock %s attempted to access missing handler %r", instance, handler)
@@ -945,7 +968,7 @@ def xblock_view(request, course_id, usage_id, view_name):
     if not request.user.is_authenticated():
         raise PermissionDenied
 
-    instance, _ = _get_module_by_usage_id(request, course_id, usage_id)
+    instance, _, _ = _get_module_by_usage_id(request, course_id, usage_id)
 
     try:
         fragment = instance.render(view_name, context=request.GET)
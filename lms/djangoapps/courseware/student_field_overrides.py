@@ -3,10 +3,18 @@ API related to providing field overrides for individual students.  This is used
 by the individual due dates feature.
 """
 import json
+import uuid
+
+from django.core.cache import cache
+
+from request_cache.middleware import RequestCache
 
 from .field_overrides import FieldOverrideProvider
 from .models import StudentFieldOverride
 
+# The key of the overrides of the current user in the request cache
+REQUEST_CACHE_KEY = 'courseware.student_field_overrides'
+
 
 class IndividualStudentOverrideProvider(FieldOverrideProvider):
     """
@@ -38,19 +46,80 @@ def _get_overrides_for_user(user, block):
     Gets all of the individual student overrides for given user and block.
     Returns a dictionary of field override values keyed by field name.
     """
-    query = StudentFieldOverride.objects.filter(
-        course_id=block.runtime.course_id,
-        location=block.location,
-        student_id=user.id,
-    )
     overrides = {}
-    for override in query:
-        field = block.fields[override.field]
-        value = field.from_json(json.loads(override.value))
-        overrides[override.field] = value
+    block_overrides = _get_all_overrides_for_user(user, block.runtime.course_id).get(unicode(block.location), {})
+    for name, value in block_overrides.iteritems():
+        field = block.fields[name]
+        overrides[name] = field.from_json(json.loads(value))
     return overrides
 
 
+def _get_all_overrides_for_user(user, course_id):
+    """
+    Gets all of the individual student overrides for the given user in the
+    course, with one query.  Returns a dictionary mapping block locations to
+    dictionaries of JSON override values keyed by field name.
+
+    The overrides of the last user are cached for the request, and no query is
+    made at all for courses without any overrides. The request cache isn't
+    cleared outside of requests (e.g. in celery tasks), so its entry is only
+    used while the override version of the course is unchanged.
+    """
+    version = _get_overrides_version(course_id)
+    request_cache = RequestCache.get_request_cache().data
+    cached = request_cache.get(REQUEST_CACHE_KEY)
+    if cached is not None and cached[0] == (user.id, course_id, version):
+        return cached[1]
+
+    overrides = {}
+    if version:
+        query = StudentFieldOverride.objects.filter(
+            course_id=course_id,
+            student_id=user.id,
+        )
+        for override in query:
+            overrides.setdefault(unicode(override.location), {})[override.field] = override.value
+
+    request_cache[REQUEST_CACHE_KEY] = ((user.id, course_id, version), overrides)
+    return overrides
+
+
+def _overrides_version_cache_key(course_id):
+    """
+    Returns the cache key of the override version of the course.
+    """
+    return u'courseware.student_field_overrides.version.{}'.format(course_id)
+
+
+def _get_overrides_version(course_id):
+    """
+    Returns the current override version of the course, which changes every
+    time one of its overrides is changed, or False if no student has overrides
+    in the course.
+    """
+    cache_key = _overrides_version_cache_key(course_id)
+    version = cache.get(cache_key)
+    if version is None:
+        version = StudentFieldOverride.objects.filter(course_id=course_id).exists() and uuid.uuid4().hex
+        # Don't replace the version set by an override saved meanwhile.
+        cache.add(cache_key, version)
+    return version
+
+
+def _overrides_changed(user, course_id):
+    """
+    Changes the override version of the course, and forgets the cached
+    overrides of `user` in the course.
+    """
+    # The course may still have other overrides after one is cleared, so the
+    # version never goes back to False.
+    cache.set(_overrides_version_cache_key(course_id), uuid.uuid4().hex)
+    request_cache = RequestCache.get_request_cache().data
+    cached = request_cache.get(REQUEST_CACHE_KEY)
+    if cached is not None and cached[0][:2] == (user.id, course_id):
+        del request_cache[REQUEST_CACHE_KEY]
+
+
 def override_field_for_user(user, block, name, value):
     """
     Overrides a field for the `user`.  `block` and `name` specify the block
@@ -66,6 +135,10 @@ def override_field_for_user(user, block, name, value):
     override.value = json.dumps(field.to_json(value))
     override.save()
 
+    _overrides_changed(user, block.runtime.course_id)
+    if hasattr(block, '_student_overrides'):
+        block._student_overrides.pop(user.id, None)  # pylint: disable=protected-access
+
 
 def clear_override_for_user(user, block, name):
     """
@@ -82,3 +155,7 @@ def clear_override_for_user(user, block, name):
             field=name).delete()
     except StudentFieldOverride.DoesNotExist:
         pass
+    else:
+        _overrides_changed(user, block.runtime.course_id)
+        if hasattr(block, '_student_overrides'):
+            block._student_overrides.pop(user.id, None)  # pylint: disable=protected-access
@@ -6,8 +6,8 @@ from mock import Mock, patch
 from functools import partial
 
 from courseware.model_data import DjangoKeyValueStore
-from courseware.model_data import InvalidScopeError, FieldDataCache
-from courseware.models import StudentModule
+from courseware.model_data import InvalidScopeError, FieldDataCache, ScoresClient
+from courseware.models import StudentModule, StudentModuleHistory
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
 from student.tests.factories import UserFactory
@@ -15,6 +15,7 @@ from courseware.tests.factories import StudentModuleFactory as cmfStudentModuleF
 from courseware.tests.factories import UserStateSummaryFactory
 from courseware.tests.factories import StudentPrefsFactory, StudentInfoFactory
 
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from xblock.fields import Scope, BlockScope, ScopeIds
 from xblock.exceptions import KeyValueMultiSaveError
 from xblock.core import XBlock
@@ -206,6 +207,62 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         self.assertEquals(len(exception_context.exception.saved_field_names), 0)
 
 
+class TestWriteBehindStudentModuleStorage(TestCase):
+    """Tests for user_state storage when the writes are deferred"""
+    def setUp(self):
+        super(TestWriteBehindStudentModuleStorage, self).setUp()
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value', 'b_field': 'b_value'}))
+        self.user = student_module.student
+        self.field_data_cache = FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field')])], course_id, self.user, write_behind=True
+        )
+        self.kvs = DjangoKeyValueStore(self.field_data_cache)
+
+    def user_state_key(self, field_name):
+        """Return the key of `field_name` in the user_state of the StudentModule"""
+        return DjangoKeyValueStore.Key(Scope.user_state, self.user.id, location('usage_id'), field_name)
+
+    def test_writes_are_coalesced(self):
+        history_count = StudentModuleHistory.objects.count()
+        with self.assertNumQueries(0):
+            self.kvs.set(self.user_state_key('a_field'), 'new_value')
+            self.kvs.set_many({self.user_state_key('b_field'): 'newer_value'})
+            self.kvs.delete(self.user_state_key('a_field'))
+            self.assertEquals('newer_value', self.kvs.get(self.user_state_key('b_field')))
+
+        # A single update of the state, and a single history entry for all of the changes
+        with self.assertNumQueries(2):
+            self.field_data_cache.flush_writes()
+        self.assertEquals({'b_field': 'newer_value'}, json.loads(StudentModule.objects.get().state))
+        self.assertEquals(history_count + 1, StudentModuleHistory.objects.count())
+
+        with self.assertNumQueries(0):
+            self.field_data_cache.flush_writes()
+
+    def test_grade_is_written_with_the_state(self):
+        history_count = StudentModuleHistory.objects.count()
+        self.kvs.set(self.user_state_key('a_field'), 'new_value')
+        student_module = self.field_data_cache.find_or_create(self.user_state_key('a_field'))
+        student_module.grade = 1
+        student_module.max_grade = 2
+        self.field_data_cache.mark_grade_dirty(student_module)
+
+        # The grade goes out in the same update, and the same history entry, as the state
+        with self.assertNumQueries(2):
+            self.field_data_cache.flush_writes()
+        student_module = StudentModule.objects.get()
+        self.assertEquals((1, 2), (student_module.grade, student_module.max_grade))
+        self.assertEquals('new_value', json.loads(student_module.state)['a_field'])
+        self.assertEquals(history_count + 1, StudentModuleHistory.objects.count())
+
+    def test_flush_failure(self):
+        self.kvs.set(self.user_state_key('a_field'), 'new_value')
+        with patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError):
+            with self.assertRaises(KeyValueMultiSaveError) as exception_context:
+                self.field_data_cache.flush_writes()
+        self.assertEquals(len(exception_context.exception.saved_field_names), 0)
+
+
 class TestMissingStudentModule(TestCase):
     def setUp(self):
         super(TestMissingStudentModule, self).setUp()
@@ -396,3 +453,82 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+class TestCourseWideFieldDataCache(TestCase):
+    """Tests for FieldDataCache.cache_for_course"""
+    def setUp(self):
+        super(TestCourseWideFieldDataCache, self).setUp()
+        self.user = UserFactory.create()
+        StudentModuleFactory.create(student=self.user, state=json.dumps({'a_field': 'a_value'}))
+        UserStateSummaryFactory.create()
+        StudentPrefsFactory.create(student=self.user)
+        StudentInfoFactory.create(student=self.user)
+
+        other_course_id = SlashSeparatedCourseKey(u'edX', u'other_course', u'test')
+        StudentModuleFactory.create(
+            student=self.user,
+            course_id=other_course_id,
+            module_state_key=other_course_id.make_usage_key(u'problem', u'usage_id'),
+        )
+        UserStateSummaryFactory.create(usage_id=other_course_id.make_usage_key(u'problem', u'usage_id'))
+
+    def test_cache_for_course(self):
+        # One query per scope, whatever the size of the course
+        with self.assertNumQueries(4):
+            field_data_cache = FieldDataCache.cache_for_course(course_id, self.user)
+        kvs = DjangoKeyValueStore(field_data_cache)
+
+        with self.assertNumQueries(0):
+            self.assertEquals(
+                'a_value',
+                kvs.get(DjangoKeyValueStore.Key(Scope.user_state, self.user.id, location('usage_id'), 'a_field'))
+            )
+            self.assertEquals('old_value', kvs.get(user_state_summary_key('existing_field')))
+            self.assertEquals(
+                'old_value',
+                kvs.get(DjangoKeyValueStore.Key(Scope.preferences, self.user.id, 'mock_problem', 'existing_field'))
+            )
+            self.assertEquals(
+                'old_value',
+                kvs.get(DjangoKeyValueStore.Key(Scope.user_info, self.user.id, None, 'existing_field'))
+            )
+        # Only the state of the course is cached
+        self.assertEquals(len(field_data_cache.cache), 4)
+
+    def test_no_descriptors_added(self):
+        field_data_cache = FieldDataCache.cache_for_course(course_id, self.user)
+        with self.assertNumQueries(0):
+            field_data_cache.add_descriptors_to_cache([mock_descriptor([mock_field(Scope.user_state, 'a_field')])])
+            field_data_cache.add_course_to_cache()
+
+
+class TestScoresClient(TestCase):
+    """Tests for ScoresClient"""
+    def setUp(self):
+        super(TestScoresClient, self).setUp()
+        self.users = [UserFactory.create() for __ in range(3)]
+        StudentModuleFactory.create(student=self.users[0], grade=1, max_grade=2)
+        StudentModuleFactory.create(student=self.users[1], grade=None, max_grade=None)
+        StudentModuleFactory.create(
+            student=self.users[1], module_state_key=location('other_id'), grade=2, max_grade=2
+        )
+
+    def test_fetch_scores(self):
+        with self.assertNumQueries(1):
+            scores_client = ScoresClient(course_id, [user.id for user in self.users])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(scores_client.get(self.users[0].id, location('usage_id')), (1, 2))
+            self.assertEqual(scores_client.get(self.users[1].id, location('usage_id')), (None, None))
+            self.assertEqual(scores_client.get(self.users[1].id, location('other_id')), (2, 2))
+            self.assertIsNone(scores_client.get(self.users[2].id, location('usage_id')))
+
+            self.assertTrue(scores_client.has_state(self.users[1].id, [location('other_id')]))
+            self.assertFalse(scores_client.has_state(self.users[2].id, [location('usage_id')]))
+
+    def test_chunked_queries(self):
+        with self.assertNumQueries(2):
+            scores_client = ScoresClient(course_id, [user.id for user in self.users], chunk_size=2)
+        self.assertTrue(all(scores_client.has_user(user.id) for user in self.users))
+        self.assertFalse(scores_client.has_user(-1))
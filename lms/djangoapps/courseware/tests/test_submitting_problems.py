@@ -17,7 +17,7 @@ from capa.tests.response_xml_factory import (
     CodeResponseXMLFactory,
 )
 from courseware import grades
-from courseware.models import StudentModule
+from courseware.models import StudentModule, StudentSubsectionGrade
 from courseware.tests.helpers import LoginEnrollmentTestCase
 from lms.djangoapps.lms_xblock.runtime import quote_slashes
 from student.tests.factories import UserFactory
@@ -473,6 +473,23 @@ class TestCourseGrader(TestSubmittingProblems):
         self.check_grade_percent(0.67)
         self.assertEqual(self.get_grade_summary()['grade'], 'B')
 
+    def test_iterate_grades_for_prefetched_scores(self):
+        """
+        Check that grading with prefetched StudentModule scores gives the same grade.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.submit_question_answer('p2', {'2_1': 'Incorrect'})
+
+        with patch('courseware.grades.StudentModule.objects.get') as mock_get:
+            results = list(grades.iterate_grades_for(self.course, [self.student_user]))
+            self.assertFalse(mock_get.called)
+
+        [(student, gradeset, err_msg)] = results
+        self.assertEqual(student, self.student_user)
+        self.assertEqual(err_msg, "")
+        self.assertEqual(gradeset['percent'], 0.33)
+
     def test_submissions_api_overrides_scores(self):
         """
         Check that answering incorrectly is graded properly.
@@ -593,6 +610,110 @@ class TestCourseGrader(TestSubmittingProblems):
         self.assertEqual(self.score_for_hw('homework3'), [1.0, 1.0])
 
 
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_SUBSECTION_GRADES_STORE': True})
+class TestCourseGraderWithGradesStore(TestCourseGrader):
+    """
+    Run the course grader tests with persisted subsection grades enabled.
+    """
+    def test_grades_are_persisted(self):
+        """
+        Test that graded subsections are stored, and reused until a score changes.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        rows = StudentSubsectionGrade.objects.filter(user=self.student_user, course_id=self.course.id)
+        self.assertEqual(rows.count(), 1)
+        self.assertFalse(rows[0].stale)
+
+        # A stored subsection is read back without being scored again
+        with patch('courseware.grades.get_score') as mock_get_score:
+            self.check_grade_percent(0.33)
+            self.assertFalse(mock_get_score.called)
+
+        # A new submission in the subsection invalidates the stored row
+        self.submit_question_answer('p2', {'2_1': 'Correct'})
+        self.assertTrue(rows[0].stale)
+        self.check_grade_percent(0.67)
+        self.assertFalse(StudentSubsectionGrade.objects.get(pk=rows[0].pk).stale)
+
+    def test_invalidated_while_grading(self):
+        """
+        Test that a subsection invalidated while it is being graded is left
+        stale, instead of being stored with the scores read before the change.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+
+        real_get_score = grades.get_score
+
+        def get_score_and_invalidate(*args, **kwargs):
+            """Invalidate the stored grades as if a score changed concurrently."""
+            StudentSubsectionGrade.invalidate(self.student_user.id, self.course.id)
+            return real_get_score(*args, **kwargs)
+
+        with patch('courseware.grades.get_score', side_effect=get_score_and_invalidate):
+            self.check_grade_percent(0.33)
+
+        rows = StudentSubsectionGrade.objects.filter(user=self.student_user, course_id=self.course.id)
+        self.assertEqual(rows.count(), 1)
+        self.assertTrue(rows[0].stale)
+
+        # The next read grades the subsection again, and stores it
+        self.check_grade_percent(0.33)
+        self.assertFalse(rows[0].stale)
+
+    def test_invalidated_while_grading_unstored_subsection(self):
+        """
+        Test that a subsection which had no stored grade, and is invalidated
+        while it is being graded, isn't stored with the scores read before
+        the change.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        # The submission left a stale row for the subsection
+        usage_key = StudentSubsectionGrade.objects.get(user=self.student_user, course_id=self.course.id).usage_key
+        StudentSubsectionGrade.objects.all().delete()
+
+        real_get_score = grades.get_score
+
+        def get_score_and_invalidate(*args, **kwargs):
+            """Invalidate the subsection as if a score changed concurrently."""
+            StudentSubsectionGrade.invalidate(self.student_user.id, self.course.id, usage_keys=[usage_key])
+            return real_get_score(*args, **kwargs)
+
+        with patch('courseware.grades.get_score', side_effect=get_score_and_invalidate):
+            self.check_grade_percent(0.33)
+
+        rows = StudentSubsectionGrade.objects.filter(user=self.student_user, course_id=self.course.id)
+        self.assertEqual(rows.count(), 1)
+        self.assertTrue(rows[0].stale)
+
+    def test_reading_grades_stores_nothing_new(self):
+        """
+        Test that subsections which aren't graded don't get rows.
+        """
+        self.basic_setup()
+        self.check_grade_percent(0)
+        self.assertFalse(StudentSubsectionGrade.objects.filter(user=self.student_user).exists())
+
+    def test_submissions_api_score_invalidates(self):
+        """
+        Test that a new score from the submissions API is picked up even if
+        the subsection grade has been stored.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p3', {'2_1': 'Incorrect'})
+        self.check_grade_percent(0)
+
+        with patch('submissions.api.get_scores') as mock_get_scores:
+            mock_get_scores.return_value = {
+                self.problem_location('p3').to_deprecated_string(): (1, 1)
+            }
+            self.check_grade_percent(0.33)
+
+
 class ProblemWithUploadedFilesTest(TestSubmittingProblems):
     """Tests of problems with uploaded files."""
 
@@ -40,6 +40,7 @@ from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MIXED_TOY_MODULESTORE
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+from openedx.core.djangoapps.content.course_structures.block_index import get_block_index_entries
 
 
 class TestJumpTo(ModuleStoreTestCase):
@@ -155,6 +156,34 @@ class TestJumpTo(ModuleStoreTestCase):
         response = self.client.get(jumpto_url)
         self.assertRedirects(response, expected, status_code=302, target_status_code=302)
 
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_PATH_TO_LOCATION_INDEX': True})
+    def test_jumpto_with_path_index(self):
+        course = CourseFactory.create()
+        chapter = ItemFactory.create(category='chapter', parent_location=course.location)
+        section = ItemFactory.create(category='sequential', parent_location=chapter.location)
+        vertical1 = ItemFactory.create(category='vertical', parent_location=section.location)
+        vertical2 = ItemFactory.create(category='vertical', parent_location=section.location)
+        module = ItemFactory.create(category='html', parent_location=vertical2.location)
+
+        expected = 'courses/{course_id}/courseware/{chapter_id}/{section_id}/2'.format(
+            course_id=unicode(course.id),
+            chapter_id=chapter.url_name,
+            section_id=section.url_name,
+        )
+        # The index was built when the course was published
+        self.assertIn(module.location, get_block_index_entries(course.id, [module.location]))
+        jumpto_url = '{0}/{1}/jump_to/{2}'.format('/courses', unicode(course.id), unicode(module.location))
+        with patch.object(modulestore(), 'get_parent_location') as get_parent_location:
+            response = self.client.get(jumpto_url)
+        self.assertFalse(get_parent_location.called)
+        self.assertRedirects(response, expected, status_code=302, target_status_code=302)
+
+        # Blocks published since are in the index built by their publication
+        module = ItemFactory.create(category='html', parent_location=vertical1.location)
+        entry = get_block_index_entries(course.id, [module.location])[module.location]
+        self.assertEqual(entry['path'], (chapter.url_name, section.url_name, '1'))
+        self.assertEqual(entry['parent'], ('vertical', vertical1.location.block_id))
+
     def test_jumpto_id_invalid_location(self):
         location = Location('edX', 'toy', 'NoSuchPlace', None, None, None)
         jumpto_url = '{0}/{1}/jump_to_id/{2}'.format('/courses', self.course_key.to_deprecated_string(), location.to_deprecated_string())
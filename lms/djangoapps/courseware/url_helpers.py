@@ -4,6 +4,33 @@ Module to define url helpers functions
 from xmodule.modulestore.search import path_to_location, navigation_index
 from xmodule.modulestore.django import modulestore
 from django.core.urlresolvers import reverse
+from openedx.core.djangoapps.content.course_structures.block_index import get_block_index_entries
+
+
+def get_course_version(course):
+    """
+    Returns a string identifying the version of the content of the course,
+    or None if the modulestore of the course doesn't version it.
+    """
+    version_guid = getattr(course.location.course_key, 'version_guid', None)
+    if version_guid is not None:
+        return unicode(version_guid)
+
+    # The Mixed modulestore strips the version from the keys it returns, so
+    # read the version of split courses from the structure they were loaded from
+    course_entry = getattr(course.runtime, 'course_entry', None)
+    if course_entry is not None:
+        return unicode(course_entry.structure['_id'])
+
+    # Old mongo courses don't have versions, but the subtree edit time of the
+    # course changes whenever any of its content is edited or published
+    get_subtree_edited_on = getattr(course.runtime, 'get_subtree_edited_on', None)
+    if get_subtree_edited_on is not None:
+        subtree_edited_on = get_subtree_edited_on(course)
+        if subtree_edited_on is not None:
+            return subtree_edited_on.isoformat()
+
+    return None
 
 
 def get_redirect_url(course_key, usage_key):
@@ -20,7 +47,15 @@ def get_redirect_url(course_key, usage_key):
         Redirect url string
     """
 
-    (course_key, chapter, section, position) = path_to_location(modulestore(), usage_key)
+    path_index = None
+    block_index_entries = get_block_index_entries(course_key, [usage_key])
+    if block_index_entries:
+        path_index = {
+            (block_key.block_type, block_key.block_id): entry['path']
+            for block_key, entry in block_index_entries.iteritems()
+            if 'path' in entry
+        }
+    (course_key, chapter, section, position) = path_to_location(modulestore(), usage_key, path_index)
 
     # choose the appropriate view (and provide the necessary args) based on the
     # args provided by the redirect.
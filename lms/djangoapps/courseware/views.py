@@ -400,8 +400,11 @@ def _index_bulk_op(request, course_key, chapter, section, position):
     masquerade = setup_masquerade(request, course_key, staff_access)
 
     try:
-        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course_key, user, course, depth=2)
+        if settings.FEATURES.get('ENABLE_COURSE_WIDE_FIELD_DATA_CACHE', False):
+            field_data_cache = FieldDataCache.cache_for_course(course_key, user)
+        else:
+            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+                course_key, user, course, depth=2)
 
         course_module = get_module_for_descriptor(user, request, course, field_data_cache, course_key)
         if course_module is None:
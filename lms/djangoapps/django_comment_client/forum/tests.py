@@ -238,6 +238,38 @@ class SingleThreadTestCase(ModuleStoreTestCase):
             timeout=ANY
         )
 
+    @override_settings(COMMENTS_SERVICE_POOL_SIZE=2)
+    def test_ajax_with_pooled_connections(self, mock_request):
+        text = "dummy content"
+        thread_id = "test_thread_id"
+        request_impl = make_mock_request_impl(course=self.course, text=text, thread_id=thread_id)
+
+        request = RequestFactory().get(
+            "dummy_url",
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+        )
+        request.user = self.student
+        with patch('requests.Session.request', side_effect=request_impl) as mock_session_request:
+            response = views.single_thread(
+                request,
+                self.course.id.to_deprecated_string(),
+                "dummy_discussion_id",
+                "test_thread_id"
+            )
+
+        self.assertEquals(response.status_code, 200)
+        response_data = json.loads(response.content)
+        self.assertEquals(
+            response_data["content"],
+            strip_none(make_mock_thread_data(course=self.course, text=text, thread_id=thread_id, num_children=1))
+        )
+        # The user and the thread were retrieved with the session of the process
+        self.assertFalse(mock_request.called)
+        self.assertEqual(
+            sorted(call_args[0][1].rsplit('/', 1)[-1] for call_args in mock_session_request.call_args_list),
+            sorted([str(self.student.id), thread_id])
+        )
+
     def test_skip_limit(self, mock_request):
         text = "dummy content"
         thread_id = "test_thread_id"
@@ -20,6 +20,7 @@ import django_comment_client.utils as utils
 from courseware.tests.factories import InstructorFactory
 from openedx.core.djangoapps.course_groups.cohorts import set_course_cohort_settings
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
+from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
@@ -758,6 +759,29 @@ class CategoryMapTestCase(CategoryMapTestMixin, ModuleStoreTestCase):
             ["Topic_A", "Topic_B", "Topic_C", "discussion1", "discussion2", "discussion3"]
         )
 
+    @mock.patch.dict('django.conf.settings.FEATURES', {'ENABLE_DISCUSSION_MODULES_CACHE': True})
+    def test_cached_discussion_modules(self):
+        """
+        Verify that the discussion modules of the course are only collected
+        once per course version, and give the same category map and ids.
+        """
+        self.create_discussion("Chapter 1", "Discussion 1")
+        self.create_discussion("Chapter 1", "Discussion 2", start=datetime.datetime(2040, 1, 1, tzinfo=UTC))
+        self.create_discussion("Chapter 2", "Discussion", visible_to_staff_only=True)
+        course = modulestore().get_course(self.course.id)
+
+        with mock.patch.dict('django.conf.settings.FEATURES', {'ENABLE_DISCUSSION_MODULES_CACHE': False}):
+            expected_map = utils.get_discussion_category_map(course, self.user)
+            expected_ids = utils.get_discussion_categories_ids(course, self.user, include_all=True)
+        self.assertEqual(expected_map["children"], ["Chapter 1"])
+
+        # The discussion modules are only collected once per course version
+        with mock.patch.object(modulestore(), 'get_items', wraps=modulestore().get_items) as mock_get_items:
+            for __ in range(2):
+                self.assertEqual(utils.get_discussion_category_map(course, self.user), expected_map)
+                self.assertEqual(utils.get_discussion_categories_ids(course, self.user, include_all=True), expected_ids)
+        self.assertEqual(mock_get_items.call_count, 1)
+
 
 class ContentGroupCategoryMapTestCase(CategoryMapTestMixin, ContentGroupTestCase):
     """
@@ -924,6 +948,18 @@ class ContentGroupCategoryMapTestCase(CategoryMapTestMixin, ContentGroupTestCase
             requesting_user=self.non_cohorted_user
         )
 
+    def test_cached_discussion_modules(self):
+        """
+        Verify that the users access the same discussion topics when the
+        discussion modules of the course are cached.
+        """
+        course = modulestore().get_course(self.course.id)
+        users = [self.staff_user, self.alpha_user, self.beta_user, self.non_cohorted_user]
+        expected_maps = [utils.get_discussion_category_map(course, user) for user in users]
+        with mock.patch.dict('django.conf.settings.FEATURES', {'ENABLE_DISCUSSION_MODULES_CACHE': True}):
+            for user, expected_map in zip(users, expected_maps):
+                self.assertEqual(utils.get_discussion_category_map(course, user), expected_map)
+
 
 class JsonResponseTestCase(TestCase, UnicodeTestMixin):
     def _test_unicode_data(self, text):
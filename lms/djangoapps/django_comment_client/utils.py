@@ -1,10 +1,12 @@
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from datetime import datetime
 import json
 import logging
 
 import pytz
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
 from django.http import HttpResponse
@@ -19,6 +21,7 @@ from django_comment_client.permissions import check_permissions_by_view, cached_
 from edxmako import lookup_template
 
 from courseware.access import has_access
+from courseware.url_helpers import get_course_version
 from openedx.core.djangoapps.course_groups.cohorts import (
     get_course_cohort_settings, get_cohort_by_id, get_cohort_id, is_commentable_cohorted, is_course_cohorted
 )
@@ -27,6 +30,21 @@ from openedx.core.djangoapps.course_groups.models import CourseUserGroup
 
 log = logging.getLogger(__name__)
 
+# The discussion modules of a course version never change, so only keep them
+# as long as the course version is likely to be used
+DISCUSSION_MODULES_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class DiscussionModuleInfo(namedtuple('DiscussionModuleInfo', [
+        'discussion_id', 'discussion_category', 'discussion_target', 'sort_key', 'start', 'location',
+        'needs_access_check'])):
+    """
+    The attributes of a discussion module used to build the discussion maps.
+    `needs_access_check` is False when everyone can load the module once it
+    has started.
+    """
+    __slots__ = ()
+
 
 def extract(dic, keys):
     return {k: dic.get(k) for k in keys}
@@ -81,6 +99,70 @@ def get_accessible_discussion_modules(course, user, include_all=False):  # pylin
     ]
 
 
+def _get_discussion_module_info(module):
+    """
+    Return the DiscussionModuleInfo of a discussion module.
+    """
+    group_restricted = any(group_ids not in (None, []) for group_ids in module.merged_group_access.values())
+    return DiscussionModuleInfo(
+        discussion_id=module.discussion_id,
+        discussion_category=module.discussion_category,
+        discussion_target=module.discussion_target,
+        sort_key=module.sort_key,
+        start=module.start,
+        location=module.location,
+        needs_access_check=module.visible_to_staff_only or group_restricted,
+    )
+
+
+def _get_all_discussion_modules_info(course):
+    """
+    Return the DiscussionModuleInfo of all the valid discussion modules of the
+    course. They are computed once per course version, and cached.
+    """
+    version = get_course_version(course)
+    if version is None:
+        cache_key = None
+    else:
+        cache_key = u'django_comment_client.discussion_modules.{}.{}'.format(course.id, version)
+        modules_info = cache.get(cache_key)
+        if modules_info is not None:
+            return modules_info
+
+    modules_info = [
+        _get_discussion_module_info(module)
+        for module in get_accessible_discussion_modules(course, None, include_all=True)
+    ]
+    if cache_key is not None:
+        cache.set(cache_key, modules_info, DISCUSSION_MODULES_CACHE_TIMEOUT)
+    return modules_info
+
+
+def _get_accessible_discussions(course, user, include_all=False):
+    """
+    Return the discussion modules of the course accessible to the user (all of
+    them if `include_all`), like `get_accessible_discussion_modules`.
+
+    With the ENABLE_DISCUSSION_MODULES_CACHE feature, they are returned as
+    DiscussionModuleInfo computed once per course version, and only the
+    modules which have access restrictions other than their start date are
+    loaded to check the access of the user.
+    """
+    if not settings.FEATURES.get('ENABLE_DISCUSSION_MODULES_CACHE'):
+        return get_accessible_discussion_modules(course, user, include_all=include_all)
+
+    now = datetime.now(UTC())
+    accessible = []
+    for module_info in _get_all_discussion_modules_info(course):
+        if include_all or (
+                not module_info.needs_access_check and (module_info.start is None or module_info.start < now)
+        ):
+            accessible.append(module_info)
+        elif has_access(user, 'load', modulestore().get_item(module_info.location), course.id):
+            accessible.append(module_info)
+    return accessible
+
+
 def get_discussion_id_map(course, user):
     """
     Transform the list of this course's discussion modules (visible to a given user) into a dictionary of metadata keyed
@@ -92,7 +174,7 @@ def get_discussion_id_map(course, user):
         last_category = module.discussion_category.split("/")[-1].strip()
         return (discussion_id, {"location": module.location, "title": last_category + " / " + title})
 
-    return dict(map(get_entry, get_accessible_discussion_modules(course, user)))
+    return dict(map(get_entry, _get_accessible_discussions(course, user)))
 
 
 def _filter_unstarted_categories(category_map):
@@ -192,7 +274,7 @@ def get_discussion_category_map(course, user, cohorted_if_in_list=False, exclude
     """
     unexpanded_category_map = defaultdict(list)
 
-    modules = get_accessible_discussion_modules(course, user)
+    modules = _get_accessible_discussions(course, user)
 
     course_cohort_settings = get_course_cohort_settings(course.id)
 
@@ -288,7 +370,7 @@ def get_discussion_categories_ids(course, user, include_all=False):
 
     """
     accessible_discussion_ids = [
-        module.discussion_id for module in get_accessible_discussion_modules(course, user, include_all=include_all)
+        module.discussion_id for module in _get_accessible_discussions(course, user, include_all=include_all)
     ]
     return course.top_level_discussion_topic_ids + accessible_discussion_ids
 
@@ -16,6 +16,7 @@ from xmodule.fields import Date
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from opaque_keys.edx.keys import CourseKey
+from request_cache.middleware import RequestCache
 
 from ..views import tools
 
@@ -248,6 +249,43 @@ class TestSetDueDateExtension(ModuleStoreTestCase):
             tools.set_due_date_extension(self.course, self.week1, self.user, extended)
             self._clear_field_data_cache()
 
+    def test_overrides_are_loaded_at_once(self):
+        extended = datetime.datetime(2013, 12, 25, 0, 0, tzinfo=utc)
+        tools.set_due_date_extension(self.course, self.week1, self.user, extended)
+        tools.set_due_date_extension(self.course, self.week2, self.user, extended)
+
+        # Start over, as a new request would
+        RequestCache().clear_request_cache()
+        self._clear_field_data_cache()
+        for block in (self.week1, self.week2, self.week3, self.homework, self.assignment):
+            block.__dict__.pop('_student_overrides', None)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.week1.due, extended)
+            self.assertEqual(self.week2.due, extended)
+            self.assertEqual(self.assignment.due, extended)
+            self.assertIsNone(self.week3.due)
+
+    def test_overrides_changed_outside_of_the_request(self):
+        extended = datetime.datetime(2013, 12, 25, 0, 0, tzinfo=utc)
+        self.assertEqual(self.week1.due, self.due)
+
+        # Another process sets an extension: our request cache is left as is
+        request_cache = dict(RequestCache.get_request_cache().data)
+        tools.set_due_date_extension(self.course, self.week1, self.user, extended)
+        RequestCache.get_request_cache().data = request_cache
+        self._clear_field_data_cache()
+        self.week1.__dict__.pop('_student_overrides', None)
+
+        self.assertEqual(self.week1.due, extended)
+
+    def test_no_queries_without_overrides(self):
+        # Cache the fact that the course has no overrides
+        self.assertEqual(self.week1.due, self.due)
+        RequestCache().clear_request_cache()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.week2.due, self.due)
+            self.assertEqual(self.assignment.due, self.due)
+
     def test_set_due_date_extension_invalid_date(self):
         extended = datetime.datetime(2009, 1, 1, 0, 0, tzinfo=utc)
         with self.assertRaises(tools.DashboardError):
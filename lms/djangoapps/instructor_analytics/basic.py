@@ -32,6 +32,8 @@ SALE_ORDER_FEATURES = ('id', 'company_name', 'company_contact_name', 'company_co
                        'bill_to_country', 'order_type',)
 
 AVAILABLE_FEATURES = STUDENT_FEATURES + PROFILE_FEATURES
+# Number of students fetched per query by `iterate_enrolled_students_features`
+ENROLLED_STUDENTS_CHUNK_SIZE = 1000
 COURSE_REGISTRATION_FEATURES = ('code', 'course_id', 'created_by', 'created_at')
 COUPON_FEATURES = ('code', 'course_id', 'percentage_discount', 'description', 'expiration_date', 'is_active')
 
@@ -159,6 +161,16 @@ def enrolled_students_features(course_key, features):
         {'username': 'username3', 'first_name': 'firstname3'}
     ]
     """
+    return list(iterate_enrolled_students_features(course_key, features))
+
+
+def iterate_enrolled_students_features(course_key, features, chunk_size=ENROLLED_STUDENTS_CHUNK_SIZE):
+    """
+    Generator version of `enrolled_students_features`, which fetches the
+    students `chunk_size` at a time (paging on their unique usernames), so the
+    features of all the students of a large course are never held in memory
+    at once.
+    """
     include_cohort_column = 'cohort' in features
 
     students = User.objects.filter(
@@ -206,7 +218,15 @@ def enrolled_students_features(course_key, features):
             )
         return student_dict
 
-    return [extract_student(student, features) for student in students]
+    last_username = None
+    while True:
+        chunk = students if last_username is None else students.filter(username__gt=last_username)
+        chunk = list(chunk[:chunk_size])
+        for student in chunk:
+            yield extract_student(student, features)
+        if len(chunk) < chunk_size:
+            break
+        last_username = chunk[-1].username
 
 
 def coupon_codes_features(features, coupons_list):
@@ -12,6 +12,8 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
 from cStringIO import StringIO
 from gzip import GzipFile
 from uuid import uuid4
@@ -19,6 +21,8 @@ import csv
 import json
 import hashlib
 import os.path
+import shutil
+import tempfile
 import urllib
 
 from boto.s3.connection import S3Connection
@@ -190,13 +194,34 @@ class InstructorTask(models.Model):
         return json.dumps({'message': 'Task revoked before running'})
 
 
+class ReportCSVWriter(object):
+    """
+    Writes rows (each row is an iterable of unicode strings or other values)
+    to `output_file` as a utf-8 encoded CSV file, one row at a time.
+    """
+    def __init__(self, output_file):
+        self._csvwriter = csv.writer(output_file)
+        self.num_rows = 0
+
+    def writerow(self, row):
+        """Encode `row` as utf-8 and write it out."""
+        self._csvwriter.writerow([unicode(item).encode('utf-8') for item in row])
+        self.num_rows += 1
+
+    def writerows(self, rows):
+        """Write out each row of the iterable `rows`."""
+        for row in rows:
+            self.writerow(row)
+
+
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. Reports can be written a row at a time through `rows_writer()`,
+    so the whole dataset never needs to be held in memory.
     """
+    __metaclass__ = ABCMeta
+
     @classmethod
     def from_config(cls):
         """
@@ -209,14 +234,32 @@ class ReportStore(object):
         elif storage_type.lower() == "localfs":
             return LocalFSReportStore.from_config()
 
-    def _get_utf8_encoded_rows(self, rows):
+    def _get_utf8_decoded_rows(self, csv_file):
         """
-        Given a list of `rows` containing unicode strings, return a
-        new list of rows with those strings encoded as utf-8 for CSV
-        compatibility.
+        Read the rows of the utf-8 encoded CSV file `csv_file`, and return
+        them as a list of rows of unicode strings.
         """
-        for row in rows:
-            yield [unicode(item).encode('utf-8') for item in row]
+        return [[item.decode('utf-8') for item in row] for row in csv.reader(csv_file)]
+
+    @abstractmethod
+    def rows_writer(self, course_id, filename):  # pragma no cover
+        """
+        Context manager yielding a `ReportCSVWriter` for the file `filename`
+        of `course_id`. Rows are written to a temporary file as they come in,
+        and the report is only published once the block exits without an
+        exception -- i.e. any files that are visible in the ReportStore will be
+        complete ones.
+        """
+        raise NotImplementedError
+
+    def store_rows(self, course_id, filename, rows):
+        """
+        Given a `course_id`, `filename`, and `rows` (any iterable of rows, each
+        row being an iterable of strings), write this data out without
+        materializing it in memory.
+        """
+        with self.rows_writer(course_id, filename) as writer:
+            writer.writerows(rows)
 
 
 class S3ReportStore(ReportStore):
@@ -305,22 +348,83 @@ class S3ReportStore(ReportStore):
             }
         )
 
-    def store_rows(self, course_id, filename, rows):
+    @contextmanager
+    def rows_writer(self, course_id, filename):
         """
-        Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        Context manager yielding a `ReportCSVWriter` whose rows are gzip'd into
+        a temporary file, which is uploaded to S3 once the block exits without
+        an exception.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
         """
+        with tempfile.TemporaryFile() as temp_file:
+            gzip_file = GzipFile(fileobj=temp_file, mode="wb")
+            yield ReportCSVWriter(gzip_file)
+            gzip_file.close()
+
+            key = self.key_for(course_id, filename)
+            key.content_encoding = "gzip"
+            key.content_type = "text/csv"
+            # boto reads the file in chunks (computing its size and md5 up
+            # front), so the compressed report is never loaded in memory.
+            key.set_contents_from_file(
+                temp_file,
+                headers={
+                    "Content-Encoding": "gzip",
+                    "Content-Type": "text/csv",
+                },
+                rewind=True
+            )
+
+    def part_key_for(self, course_id, task_id, part_name):
+        """
+        Return the S3 key used to store part `part_name` of the report
+        generated by the task `task_id`. Parts are kept outside of the course
+        directory, so they are never listed by `links_for()`.
+        """
+        hashed_course_id = hashlib.sha1(course_id.to_deprecated_string())
+
+        key = Key(self.bucket)
+        key.key = "{}/parts/{}/{}/{}".format(
+            self.root_path,
+            hashed_course_id.hexdigest(),
+            task_id,
+            part_name
+        )
+
+        return key
+
+    def store_part_rows(self, course_id, task_id, part_name, rows):
+        """
+        Store `rows` as part `part_name` of the report generated by the task
+        `task_id`, to be merged into the final report later on.
+        """
         output_buffer = StringIO()
         gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        ReportCSVWriter(gzip_file).writerows(rows)
         gzip_file.close()
 
-        self.store(course_id, filename, output_buffer)
+        self.part_key_for(course_id, task_id, part_name).set_contents_from_string(output_buffer.getvalue())
+
+    def read_part_rows(self, course_id, task_id, part_name):
+        """
+        Return the rows stored as part `part_name` of the report generated by
+        the task `task_id`, or None if there is no such part.
+        """
+        key = self.bucket.get_key(self.part_key_for(course_id, task_id, part_name).key)
+        if key is None:
+            return None
+
+        gzip_file = GzipFile(fileobj=StringIO(key.get_contents_as_string()), mode="rb")
+        return self._get_utf8_decoded_rows(gzip_file)
+
+    def delete_parts(self, course_id, task_id):
+        """
+        Delete all the parts stored for the report generated by the task `task_id`.
+        """
+        parts_dir = self.part_key_for(course_id, task_id, '')
+        self.bucket.delete_keys([key.key for key in self.bucket.list(prefix=parts_dir.key)])
 
     def links_for(self, course_id):
         """
@@ -386,16 +490,70 @@ class LocalFSReportStore(ReportStore):
         with open(full_path, "wb") as f:
             f.write(buff.getvalue())
 
-    def store_rows(self, course_id, filename, rows):
+    @contextmanager
+    def rows_writer(self, course_id, filename):
         """
-        Given a course_id, filename, and rows (each row is an iterable of strings),
-        write this data out.
+        Context manager yielding a `ReportCSVWriter` whose rows are written to
+        a temporary file under `root_path`, which is moved into place once the
+        block exits without an exception. The temporary file lives outside of
+        the course directory, so it is never listed by `links_for()`.
         """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        full_path = self.path_to(course_id, filename)
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+
+        temp_file = tempfile.NamedTemporaryFile(dir=self.root_path, prefix='.report_', delete=False)
+        try:
+            with temp_file:
+                yield ReportCSVWriter(temp_file)
+            os.rename(temp_file.name, full_path)
+        finally:
+            if os.path.exists(temp_file.name):
+                os.remove(temp_file.name)
+
+    def part_path_to(self, course_id, task_id, part_name):
+        """
+        Return the full path to part `part_name` of the report generated by
+        the task `task_id`. Parts are kept outside of the course directory, so
+        they are never listed by `links_for()`.
+        """
+        return os.path.join(
+            self.root_path, 'parts', urllib.quote(course_id.to_deprecated_string(), safe=''), task_id, part_name
+        )
+
+    def store_part_rows(self, course_id, task_id, part_name, rows):
+        """
+        Store `rows` as part `part_name` of the report generated by the task
+        `task_id`, to be merged into the final report later on.
+        """
+        full_path = self.part_path_to(course_id, task_id, part_name)
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
 
-        self.store(course_id, filename, output_buffer)
+        with open(full_path, "wb") as part_file:
+            ReportCSVWriter(part_file).writerows(rows)
+
+    def read_part_rows(self, course_id, task_id, part_name):
+        """
+        Return the rows stored as part `part_name` of the report generated by
+        the task `task_id`, or None if there is no such part.
+        """
+        full_path = self.part_path_to(course_id, task_id, part_name)
+        if not os.path.exists(full_path):
+            return None
+
+        with open(full_path, "rb") as part_file:
+            return self._get_utf8_decoded_rows(part_file)
+
+    def delete_parts(self, course_id, task_id):
+        """
+        Delete all the parts stored for the report generated by the task `task_id`.
+        """
+        parts_dir = os.path.dirname(self.part_path_to(course_id, task_id, ''))
+        if os.path.exists(parts_dir):
+            shutil.rmtree(parts_dir)
 
     def links_for(self, course_id):
         """
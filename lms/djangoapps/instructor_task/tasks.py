@@ -35,6 +35,8 @@ from instructor_task.tasks_helper import (
     reset_attempts_module_state,
     delete_problem_module_state,
     upload_grades_csv,
+    queue_grade_report_subtasks,
+    perform_grade_report_subtask,
     upload_students_csv,
     cohort_students_and_upload
 )
@@ -143,6 +145,9 @@ def send_bulk_course_email(entry_id, _xmodule_instance_args):
 def calculate_grades_csv(entry_id, xmodule_instance_args):
     """
     Grade a course and push the results to an S3 bucket for download.
+
+    If FEATURES['ENABLE_GRADE_REPORT_SUBTASKS'] is set, the grading is split
+    up into `calculate_grades_csv_subtask` subtasks instead.
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('graded')
@@ -151,10 +156,30 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
         xmodule_instance_args.get('task_id'), entry_id, action_name
     )
 
-    task_fn = partial(upload_grades_csv, xmodule_instance_args)
+    if settings.FEATURES.get('ENABLE_GRADE_REPORT_SUBTASKS', False):
+        def _create_grade_report_subtask(part_index, student_ids, initial_subtask_status):
+            """Creates a subtask to grade the given students."""
+            return calculate_grades_csv_subtask.subtask(
+                (entry_id, part_index, student_ids, initial_subtask_status.to_dict()),
+                task_id=initial_subtask_status.task_id,
+                routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+            )
+        task_fn = partial(queue_grade_report_subtasks, _create_grade_report_subtask)
+    else:
+        task_fn = partial(upload_grades_csv, xmodule_instance_args)
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_subtask(entry_id, part_index, student_ids, subtask_status_dict):
+    """
+    Grade the given students and store their rows as part `part_index` of
+    the grade report. The last subtask to complete merges all parts into
+    the final report.
+    """
+    return perform_grade_report_subtask(entry_id, part_index, student_ids, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_students_features_csv(entry_id, xmodule_instance_args):
     """
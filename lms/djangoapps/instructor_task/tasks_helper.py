@@ -4,13 +4,16 @@ running state of a course.
 
 """
 import json
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import chain, count, islice
 from time import time
 import unicodecsv
 import logging
 
 from celery import Task, current_task
 from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
@@ -20,18 +23,24 @@ from pytz import UTC
 from track.views import task_track
 from util.file import course_filename_prefix_generator, UniversalNewlineIterator
 from xmodule.modulestore.django import modulestore
+from xmodule.partitions.partitions_service import get_groups_for_users
 from xmodule.split_test_module import get_split_user_partitions
 
 from courseware.courses import get_course_by_id, get_problems_in_section
-from courseware.grades import iterate_grades_for
+from courseware.grades import iterate_grades_for, GRADES_PREFETCH_CHUNK_SIZE
 from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
-from instructor_analytics.basic import enrolled_students_features
+from instructor_analytics.basic import iterate_enrolled_students_features
 from instructor_analytics.csvs import format_dictlist
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
-from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
-from openedx.core.djangoapps.course_groups.cohorts import get_cohort
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    queue_subtasks_for_query,
+    check_subtask_is_valid,
+    update_subtask_status,
+)
+from openedx.core.djangoapps.course_groups.cohorts import get_cohorts_for_users
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
 from opaque_keys.edx.keys import UsageKey
 from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort, is_course_cohorted
@@ -135,6 +144,14 @@ class BaseInstructorTask(Task):
             entry.save_now()
 
 
+class GradeReportPartMissingError(Exception):
+    """
+    Error signaling that a part of a grade report generated by subtasks is
+    missing, so that the report can't be merged.
+    """
+    pass
+
+
 class UpdateProblemModuleStateError(Exception):
     """
     Error signaling a fatal condition while updating problem modules.
@@ -529,7 +546,8 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
 
     Arguments:
         rows: CSV data in the following format (first column may be a
-            header):
+            header), as any iterable of rows -- rows are streamed to the
+            ReportStore, so it can be a generator:
             [
                 [row1_colum1, row1_colum2, ...],
                 ...
@@ -537,16 +555,114 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
         csv_name: Name of the resulting CSV
         course_id: ID of the course
     """
+    with report_store_rows_writer(csv_name, course_id, timestamp) as writer:
+        writer.writerows(rows)
+
+
+@contextmanager
+def report_store_rows_writer(csv_name, course_id, timestamp):
+    """
+    Context manager yielding a writer to which rows of the CSV `csv_name`
+    can be written one at a time (see `ReportStore.rows_writer`). The CSV
+    is only uploaded once the block exits without an exception.
+    """
     report_store = ReportStore.from_config()
-    report_store.store_rows(
-        course_id,
-        u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
-            course_prefix=course_filename_prefix_generator(course_id),
-            csv_name=csv_name,
-            timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
-        ),
-        rows
+    filename = u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
+        course_prefix=course_filename_prefix_generator(course_id),
+        csv_name=csv_name,
+        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
     )
+    with report_store.rows_writer(course_id, filename) as writer:
+        yield writer
+
+
+def _iterate_grades_and_groups_for(course, students, course_is_cohorted, experiment_partitions):
+    """
+    Grade each of `students` in `course` like `iterate_grades_for`, and yield
+    a `(student, gradeset, err_msg, cohort, experiment_groups)` tuple for
+    each of them, in order.
+
+    `cohort` is the cohort of the student (None if the course isn't cohorted
+    or the student has none), and `experiment_groups` the list of the groups
+    of the student in `experiment_partitions` (None for the partitions the
+    student isn't assigned to). Students aren't assigned cohorts or groups.
+    They are looked up for a chunk of students at once, before grading them.
+    """
+    students = iter(students)
+    while True:
+        students_chunk = list(islice(students, GRADES_PREFETCH_CHUNK_SIZE))
+        if not students_chunk:
+            break
+
+        if course_is_cohorted:
+            cohorts = get_cohorts_for_users([student.id for student in students_chunk], course.id)
+        else:
+            cohorts = {}
+        partitions_groups = [
+            get_groups_for_users(course.id, students_chunk, partition) for partition in experiment_partitions
+        ]
+
+        for student, gradeset, err_msg in iterate_grades_for(course, students_chunk):
+            experiment_groups = [partition_groups.get(student.id) for partition_groups in partitions_groups]
+            yield student, gradeset, err_msg, cohorts.get(student.id), experiment_groups
+
+
+def _grade_report_rows(course, students):
+    """
+    Grade each of `students` in `course`, and yield a `(header, row, err_row)`
+    tuple for each of them, in order.
+
+    `header` is the header row of the grade report, or None until a student
+    has been graded successfully (the grade section labels are taken from the
+    first successful gradeset). Exactly one of `row` (the student's row in
+    the grade report) and `err_row` (the student's row in the error report)
+    is not None.
+    """
+    course_is_cohorted = is_course_cohorted(course.id)
+    cohorts_header = ['Cohort Name'] if course_is_cohorted else []
+
+    experiment_partitions = get_split_user_partitions(course.user_partitions)
+    group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
+
+    section_labels = None
+    header = None
+    for student, gradeset, err_msg, cohort, experiment_groups in _iterate_grades_and_groups_for(
+            course, students, course_is_cohorted, experiment_partitions
+    ):
+        if not gradeset:
+            # An empty gradeset means we failed to grade a student.
+            yield header, None, [student.id, student.username, err_msg]
+            continue
+
+        # We were able to successfully grade this student for this course.
+        if not section_labels:
+            section_labels = [section['label'] for section in gradeset[u'section_breakdown']]
+            header = ["id", "email", "username", "grade"] + section_labels + cohorts_header + group_configs_header
+
+        percents = {
+            section['label']: section.get('percent', 0.0)
+            for section in gradeset[u'section_breakdown']
+            if 'label' in section
+        }
+
+        cohorts_group_name = []
+        if course_is_cohorted:
+            cohorts_group_name.append(cohort.name if cohort else '')
+
+        group_configs_group_names = [group.name if group else '' for group in experiment_groups]
+
+        # Not everybody has the same gradable items. If the item is not
+        # found in the user's gradeset, just assume it's a 0. The aggregated
+        # grades for their sections and overall course will be calculated
+        # without regard for the item they didn't have access to, so it's
+        # possible for a student to have a 0.0 show up in their row but
+        # still have 100% for the course.
+        row_percents = [percents.get(label, 0.0) for label in section_labels]
+        row = (
+            [student.id, student.email, student.username, gradeset['percent']] +
+            row_percents + cohorts_group_name + group_configs_group_names
+        )
+        yield header, row, None
 
 
 def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
@@ -554,13 +670,10 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
     be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
-
-    As we start to add more CSV downloads, it will probably be worthwhile to
-    make a more general CSVDoc class instead of building out the rows like we
-    do here.
+    `ReportStore.from_config()`) and calling `link_for()` on it. Rows are
+    streamed to the ReportStore as students are graded, but files are only
+    published once complete, so we'll never write part of a CSV file to S3 --
+    i.e. any files that are visible in ReportStore will be complete ones.
     """
     start_time = time()
     start_date = datetime.now(UTC)
@@ -578,15 +691,9 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
     course = get_course_by_id(course_id)
-    course_is_cohorted = is_course_cohorted(course.id)
-    cohorts_header = ['Cohort Name'] if course_is_cohorted else []
-
-    experiment_partitions = get_split_user_partitions(course.user_partitions)
-    group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
 
-    # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
+    # Loop over all our students, writing out their grades as we go. Errors
+    # are rare, so the error rows are still collected in memory.
     err_rows = [["id", "username", "error_msg"]]
     current_step = {'step': 'Calculating Grades'}
 
@@ -599,89 +706,225 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         current_step,
         total_enrolled_students
     )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
-        # Periodically update task status (this is a cache write)
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
-        task_progress.attempted += 1
+    with report_store_rows_writer('grade_report', course_id, start_date) as writer:
+        for header, row, err_row in _grade_report_rows(course, enrolled_students):
+            # Periodically update task status (this is a cache write)
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+            task_progress.attempted += 1
 
-        # Now add a log entry after certain intervals to get a hint that task is in progress
-        student_counter += 1
-        if student_counter % 1000 == 0:
-            TASK_LOG.info(
-                u'%s, Task type: %s, Current step: %s, Grade calculation in-progress for students: %s/%s',
-                task_info_string,
-                action_name,
-                current_step,
-                student_counter,
-                total_enrolled_students
-            )
-
-        if gradeset:
-            # We were able to successfully grade this student for this course.
-            task_progress.succeeded += 1
-            if not header:
-                header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
-                    ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
+            # Now add a log entry after certain intervals to get a hint that task is in progress
+            student_counter += 1
+            if student_counter % 1000 == 0:
+                TASK_LOG.info(
+                    u'%s, Task type: %s, Current step: %s, Grade calculation in-progress for students: %s/%s',
+                    task_info_string,
+                    action_name,
+                    current_step,
+                    student_counter,
+                    total_enrolled_students
                 )
 
-            percents = {
-                section['label']: section.get('percent', 0.0)
-                for section in gradeset[u'section_breakdown']
-                if 'label' in section
-            }
-
-            cohorts_group_name = []
-            if course_is_cohorted:
-                group = get_cohort(student, course_id, assign=False)
-                cohorts_group_name.append(group.name if group else '')
-
-            group_configs_group_names = []
-            for partition in experiment_partitions:
-                group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
-                group_configs_group_names.append(group.name if group else '')
-
-            # Not everybody has the same gradable items. If the item is not
-            # found in the user's gradeset, just assume it's a 0. The aggregated
-            # grades for their sections and overall course will be calculated
-            # without regard for the item they didn't have access to, so it's
-            # possible for a student to have a 0.0 show up in their row but
-            # still have 100% for the course.
-            row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
-                [student.id, student.email, student.username, gradeset['percent']] +
-                row_percents + cohorts_group_name + group_configs_group_names
-            )
-        else:
-            # An empty gradeset means we failed to grade a student.
-            task_progress.failed += 1
-            err_rows.append([student.id, student.username, err_msg])
+            if row is not None:
+                task_progress.succeeded += 1
+                if not writer.num_rows:
+                    writer.writerow(header)
+                writer.writerow(row)
+            else:
+                task_progress.failed += 1
+                err_rows.append(err_row)
+
+        TASK_LOG.info(
+            u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
+            task_info_string,
+            action_name,
+            current_step,
+            student_counter,
+            total_enrolled_students
+        )
+
+        # By this point, all the rows of the grade report have been written
+        # out; leaving this block uploads it.
+        current_step = {'step': 'Uploading CSVs'}
+        task_progress.update_task_state(extra_meta=current_step)
+        TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    TASK_LOG.info(
-        u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
-        task_info_string,
+    # If there are any error rows (don't count the header), write them out as well
+    if len(err_rows) > 1:
+        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+
+    # One last update before we close out...
+    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
+    return task_progress.update_task_state(extra_meta=current_step)
+
+
+def queue_grade_report_subtasks(create_subtask_fcn, entry_id, course_id, task_input, action_name):
+    """
+    For a given `course_id`, split the generation of the grades CSV file into
+    subtasks that each grade `settings.GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK`
+    enrolled students and store their rows as a part of the report. The
+    subtask completing last merges the parts into the final report (see
+    `perform_grade_report_subtask`).
+
+    `create_subtask_fcn` is a function of three arguments that constructs the
+    subtask: the index of the report part, the list of student ids to grade,
+    and a SubtaskStatus object reflecting the initial status of the subtask.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # Check to see if the subtasks have already been defined, which happens
+    # when the task is requeued after a loss of connection to the broker.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued its grade report subtasks!", entry.task_id)
+        return json.loads(entry.task_output)
+
+    enrolled_students = CourseEnrollment.users_enrolled_in(course_id).order_by('id')
+    total_num_students = enrolled_students.count()
+    if total_num_students == 0:
+        # There is nothing to split up, so just generate the (empty) report.
+        return upload_grades_csv(None, entry_id, course_id, task_input, action_name)
+
+    part_indices = count()
+
+    def _create_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade the given list of students."""
+        return create_subtask_fcn(
+            next(part_indices),
+            [student['pk'] for student in student_list],
+            initial_subtask_status,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
         action_name,
-        current_step,
-        student_counter,
-        total_enrolled_students
+        _create_subtask,
+        [enrolled_students],
+        [],
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK,
+        total_num_students,
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    current_step = {'step': 'Uploading CSVs'}
-    task_progress.update_task_state(extra_meta=current_step)
-    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+def _grade_report_part_names(part_index):
+    """
+    Return the names under which the grade and error rows of the given part of
+    a grade report are stored.
+    """
+    return (
+        u'grade_report_{:06d}.csv'.format(part_index),
+        u'grade_report_err_{:06d}.csv'.format(part_index),
+    )
+
+
+def perform_grade_report_subtask(entry_id, part_index, student_ids, subtask_status_dict):
+    """
+    Grade the students with the given `student_ids` and store their rows as
+    part `part_index` of the grade report of the InstructorTask `entry_id`.
+
+    The first row stored in each part is the report header (empty if no
+    student of the part could be graded). If this is the last subtask of the
+    task to complete, all parts are merged into the final report.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    course_id = entry.course_id
+    TASK_LOG.info(
+        u'Task: %s, InstructorTask ID: %s, Course: %s, Grading part %s (%s students) in subtask %s',
+        entry.task_id, entry_id, course_id, part_index, len(student_ids), current_task_id
+    )
+
+    try:
+        course = get_course_by_id(course_id)
+        students = User.objects.filter(id__in=student_ids).order_by('id')
+        header = None
+        rows = []
+        err_rows = [["id", "username", "error_msg"]]
+        for header, row, err_row in _grade_report_rows(course, students):
+            if row is not None:
+                rows.append(row)
+                subtask_status.increment(succeeded=1)
+            else:
+                err_rows.append(err_row)
+                subtask_status.increment(failed=1)
+
+        part_name, err_part_name = _grade_report_part_names(part_index)
+        report_store = ReportStore.from_config()
+        report_store.store_part_rows(course_id, entry.task_id, part_name, [header or []] + rows)
+        report_store.store_part_rows(course_id, entry.task_id, err_part_name, err_rows)
+    except Exception as exc:
+        TASK_LOG.exception(u"Grade report subtask %s of InstructorTask %s failed unexpectedly!", current_task_id, entry_id)
+        subtask_status.increment(failed=len(student_ids) - subtask_status.attempted, state=FAILURE)
+        all_subtasks_done = update_subtask_status(entry_id, current_task_id, subtask_status)
+        if all_subtasks_done:
+            # The part of this subtask is missing, so the report can't be merged.
+            _fail_grade_report(entry_id, exc)
+        raise
+
+    subtask_status.increment(state=SUCCESS)
+    all_subtasks_done = update_subtask_status(entry_id, current_task_id, subtask_status)
+    if all_subtasks_done:
+        _merge_grade_report_parts(entry_id)
+
+    return subtask_status.to_dict()
+
+
+def _merge_grade_report_parts(entry_id):
+    """
+    Concatenate the stored parts of the grade report of the InstructorTask
+    `entry_id` into the final grade report (and error report, if any
+    student failed to be graded), and remove the parts.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    course_id = entry.course_id
+    num_parts = json.loads(entry.subtasks)['total']
+    report_store = ReportStore.from_config()
+
+    # Only one part is held in memory at a time while the report is written out.
+    # The report is only uploaded if all the parts are found.
+    start_date = entry.created or datetime.now(UTC)
+    err_rows = [["id", "username", "error_msg"]]
+    try:
+        with report_store_rows_writer('grade_report', course_id, start_date) as writer:
+            for part_index in range(num_parts):
+                part_name, err_part_name = _grade_report_part_names(part_index)
+                part_rows = report_store.read_part_rows(course_id, entry.task_id, part_name)
+                err_part_rows = report_store.read_part_rows(course_id, entry.task_id, err_part_name)
+                if part_rows is None or err_part_rows is None:
+                    raise GradeReportPartMissingError(
+                        u"Part {} of the grade report of InstructorTask {} is missing".format(part_index, entry_id)
+                    )
+
+                part_header = part_rows[0]
+                if part_header and not writer.num_rows:
+                    writer.writerow(part_header)
+                writer.writerows(part_rows[1:])
+                err_rows.extend(err_part_rows[1:])
+    except GradeReportPartMissingError as exc:
+        TASK_LOG.error(exc.message)
+        _fail_grade_report(entry_id, exc)
+        raise
 
-    # If there are any error rows (don't count the header), write them out as well
     if len(err_rows) > 1:
         upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
 
-    # One last update before we close out...
-    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
-    return task_progress.update_task_state(extra_meta=current_step)
+    report_store.delete_parts(course_id, entry.task_id)
+    TASK_LOG.info(u"Merged %s grade report parts of InstructorTask %s", num_parts, entry_id)
+
+
+def _fail_grade_report(entry_id, exception):
+    """
+    Mark the InstructorTask `entry_id` generating a grade report in subtasks
+    as failed because of `exception`, and remove the stored parts of the
+    report.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    ReportStore.from_config().delete_parts(entry.course_id, entry.task_id)
+    entry.task_output = InstructorTask.create_output_for_failure(exception, None)
+    entry.task_state = FAILURE
+    entry.save_now()
 
 
 def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
@@ -696,21 +939,20 @@ def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input
     current_step = {'step': 'Calculating Profile Info'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    # compute the student features table and format it
+    # compute the student features table and write it out, one student at a time
     query_features = task_input.get('features')
-    student_data = enrolled_students_features(course_id, query_features)
-    header, rows = format_dictlist(student_data, query_features)
-
-    task_progress.attempted = task_progress.succeeded = len(rows)
-    task_progress.skipped = task_progress.total - task_progress.attempted
-
-    rows.insert(0, header)
+    with report_store_rows_writer('student_profile_info', course_id, start_date) as writer:
+        writer.writerow(query_features)
+        for student_dict in iterate_enrolled_students_features(course_id, query_features):
+            _header, rows = format_dictlist([student_dict], query_features)
+            writer.writerows(rows)
+            task_progress.attempted += 1
+            task_progress.succeeded += 1
 
-    current_step = {'step': 'Uploading CSV'}
-    task_progress.update_task_state(extra_meta=current_step)
+        task_progress.skipped = task_progress.total - task_progress.attempted
 
-    # Perform the upload
-    upload_csv_to_report_store(rows, 'student_profile_info', course_id, start_date)
+        current_step = {'step': 'Uploading CSV'}
+        task_progress.update_task_state(extra_meta=current_step)
 
     return task_progress.update_task_state(extra_meta=current_step)
 
@@ -786,15 +1028,14 @@ def cohort_students_and_upload(_xmodule_instance_args, _entry_id, course_id, tas
 
     # Filter the output of `add_users_to_cohorts` in order to upload the result.
     output_header = ['Cohort Name', 'Exists', 'Students Added', 'Students Not Found']
-    output_rows = [
+    output_rows = (
         [
             ','.join(status_dict.get(column_name, '')) if column_name == 'Students Not Found'
             else status_dict[column_name]
             for column_name in output_header
         ]
         for _cohort_name, status_dict in cohorts_status.iteritems()
-    ]
-    output_rows.insert(0, output_header)
-    upload_csv_to_report_store(output_rows, 'cohort_results', course_id, start_date)
+    )
+    upload_csv_to_report_store(chain([output_header], output_rows), 'cohort_results', course_id, start_date)
 
     return task_progress.update_task_state(extra_meta=current_step)
@@ -25,6 +25,13 @@ class MockKey(object):
         """ Expected method on a Key object. """
         self.bucket.store_key(self)
 
+    def set_contents_from_file(self, fp, headers, rewind=False):  # pylint: disable=unused-argument
+        """ Expected method on a Key object. """
+        if rewind:
+            fp.seek(0)
+        fp.read()
+        self.bucket.store_key(self)
+
     def generate_url(self, expires_in):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
         return "http://fake-edx-s3.edx.org/"
@@ -84,6 +91,33 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_rows_writer(self):
+        """
+        Test that rows written through ReportStore.rows_writer() are published
+        as a single file once the writer is closed.
+        """
+        report_store = self.create_report_store()
+        with report_store.rows_writer(self.course_id, 'report.csv') as writer:
+            writer.writerow([u'username', u'grade'])
+            writer.writerows([u'student{}'.format(index), index / 10.0] for index in range(10))
+            self.assertEqual(report_store.links_for(self.course_id), [])
+
+        self.assertEqual(writer.num_rows, 11)
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
+
+    def test_rows_writer_error(self):
+        """
+        Test that nothing is published by ReportStore.rows_writer() if an
+        error happens while the rows are written.
+        """
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            with report_store.rows_writer(self.course_id, 'report.csv') as writer:
+                writer.writerow([u'username', u'grade'])
+                raise ValueError
+
+        self.assertEqual(report_store.links_for(self.course_id), [])
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     """
@@ -7,9 +7,13 @@ Tests that CSV grade report generation works with unicode emails.
 
 """
 import ddt
+import json
+import os
+from celery.states import SUCCESS, FAILURE
 from mock import Mock, patch
 import tempfile
 import unicodecsv
+from uuid import uuid4
 
 from xmodule.modulestore.tests.factories import CourseFactory
 from student.tests.factories import UserFactory
@@ -20,8 +24,16 @@ from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitio
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 import openedx.core.djangoapps.user_api.course_tag.api as course_tag_api
 from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
-from instructor_task.models import ReportStore
-from instructor_task.tasks_helper import cohort_students_and_upload, upload_grades_csv, upload_students_csv
+from instructor_task.models import InstructorTask, ReportStore
+from instructor_task.tasks_helper import (
+    GradeReportPartMissingError,
+    cohort_students_and_upload,
+    perform_grade_report_subtask,
+    queue_grade_report_subtasks,
+    upload_grades_csv,
+    upload_students_csv,
+)
+from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase, TestReportMixin
 
 
@@ -258,6 +270,111 @@ class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
         self.assertDictContainsSubset({'attempted': 1, 'succeeded': 1, 'failed': 0}, result)
 
 
+class TestGradeReportSubtasks(TestReportMixin, InstructorTaskCourseTestCase):
+    """
+    Tests that grade reports generated by subtasks are merged correctly.
+    """
+    def setUp(self):
+        super(TestGradeReportSubtasks, self).setUp()
+        self.course = CourseFactory.create()
+        self.students = [
+            self.create_student(u'student{}'.format(i), u'student{}@example.com'.format(i))
+            for i in range(5)
+        ]
+        self.entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type='grade_course',
+        )
+
+    def _run_subtasks(self):
+        """
+        Queue the grade report subtasks, running each of them synchronously.
+        """
+        def create_subtask(part_index, student_ids, initial_subtask_status):
+            """Returns a subtask that runs immediately when applied."""
+            subtask = Mock()
+            subtask.apply_async.side_effect = lambda: perform_grade_report_subtask(
+                self.entry.id, part_index, student_ids, initial_subtask_status.to_dict()
+            )
+            return subtask
+
+        with self.settings(GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK=2):
+            queue_grade_report_subtasks(create_subtask, self.entry.id, self.course.id, {}, 'graded')
+
+    def test_parts_are_merged(self):
+        self._run_subtasks()
+
+        entry = InstructorTask.objects.get(pk=self.entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.subtasks)['total'], 3)
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 5, 'failed': 0}, json.loads(entry.task_output))
+
+        report_store = ReportStore.from_config()
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        self.assertIn('grade_report', links[0][0])
+        with open(report_store.path_to(self.course.id, links[0][0])) as csv_file:
+            usernames = [row['username'] for row in unicodecsv.DictReader(csv_file)]
+        self.assertEqual(usernames, [student.username for student in self.students])
+
+        # The parts are removed once merged
+        self.assertFalse(os.path.exists(os.path.dirname(report_store.part_path_to(self.course.id, entry.task_id, ''))))
+
+    @patch('instructor_task.tasks_helper.iterate_grades_for')
+    def test_grading_failure(self, mock_iterate_grades_for):
+        mock_iterate_grades_for.side_effect = lambda course, students: [
+            (student, {}, 'Cannot grade student') for student in students
+        ]
+        self._run_subtasks()
+
+        entry = InstructorTask.objects.get(pk=self.entry.id)
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 0, 'failed': 5}, json.loads(entry.task_output))
+        report_store = ReportStore.from_config()
+        self.assertTrue(any('grade_report_err' in item[0] for item in report_store.links_for(self.course.id)))
+
+    def _assert_report_failed(self):
+        """
+        Check that the task failed without publishing a report, and removed its parts.
+        """
+        entry = InstructorTask.objects.get(pk=self.entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        report_store = ReportStore.from_config()
+        self.assertEqual(report_store.links_for(self.course.id), [])
+        self.assertFalse(os.path.exists(os.path.dirname(report_store.part_path_to(self.course.id, entry.task_id, ''))))
+
+    @patch('instructor_task.tasks_helper.iterate_grades_for')
+    def test_last_subtask_failure(self, mock_iterate_grades_for):
+        def iterate_grades_for(course, students):  # pylint: disable=unused-argument
+            """Fails to grade the part of the last student."""
+            if self.students[-1] in students:
+                raise Exception("Grading failed")
+            return [(student, {}, 'Cannot grade student') for student in students]
+
+        mock_iterate_grades_for.side_effect = iterate_grades_for
+        with self.assertRaises(Exception):
+            self._run_subtasks()
+        self._assert_report_failed()
+
+    def test_missing_part(self):
+        store_part_rows = ReportStore.from_config().store_part_rows
+
+        def store_part_rows_but_first(course_id, task_id, part_name, rows):
+            """Loses the first part of the report."""
+            if part_name != u'grade_report_000000.csv':
+                store_part_rows(course_id, task_id, part_name, rows)
+
+        with patch.object(ReportStore, 'from_config') as mock_from_config:
+            mock_from_config.return_value.store_part_rows.side_effect = store_part_rows_but_first
+            report_store = ReportStore.from_config.__func__(ReportStore)
+        with patch.object(type(report_store), 'store_part_rows', autospec=True) as mock_store_part_rows:
+            mock_store_part_rows.side_effect = lambda __, *args: store_part_rows_but_first(*args)
+            with self.assertRaises(GradeReportPartMissingError):
+                self._run_subtasks()
+        self._assert_report_failed()
+
+
 @ddt.ddt
 class TestStudentReport(TestReportMixin, InstructorTaskCourseTestCase):
     """
@@ -269,6 +269,38 @@ FEATURES = {
     # only edX superusers can perform the downloads)
     'ALLOW_COURSE_STAFF_GRADE_DOWNLOADS': False,
 
+    # Persist per-subsection scores of students and only recompute the
+    # subsections whose content or scores changed when grading.
+    'ENABLE_SUBSECTION_GRADES_STORE': False,
+
+    # Split the generation of grade reports into subtasks that grade
+    # students in parallel, each writing a part of the report.
+    'ENABLE_GRADE_REPORT_SUBTASKS': False,
+
+    # Load all the student state of a user in a course with one query per
+    # scope on the courseware and progress pages, rather than walking the
+    # course blocks to collect the usage ids to load first.
+    'ENABLE_COURSE_WIDE_FIELD_DATA_CACHE': False,
+
+    # Coalesce the writes of student state made by an XBlock handler, and
+    # write them out in bulk once the handler is done.
+    'ENABLE_STUDENT_STATE_WRITE_BEHIND': False,
+
+    # Look up the courseware paths and the parents of blocks in an index of
+    # the published course, built when it's published, instead of searching
+    # up the parents of the blocks.
+    'ENABLE_PATH_TO_LOCATION_INDEX': False,
+
+    # Share the parsed XML and script context of capa problems between the
+    # students of a process, instead of parsing the problem and running its
+    # scripts every time the problem is loaded.
+    'ENABLE_CAPA_PROBLEM_CACHE': False,
+
+    # Build the discussion category and id maps from the discussion modules of
+    # the course, collected once per course version, instead of loading all the
+    # discussion modules of the course on every request.
+    'ENABLE_DISCUSSION_MODULES_CACHE': False,
+
     'ENABLED_PAYMENT_REPORTS': [
         "refund_report",
         "itemized_purchase_report",
@@ -675,6 +707,8 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        # Bytes of split structures and definitions cached by each process
+                        'document_cache_size': 64 * 1024 * 1024,
                     }
                 },
                 {
@@ -700,6 +734,28 @@ MODULESTORE = {
     }
 }
 
+############################ Course assets #####################################
+
+# Directory of the local disk cache of the course assets too large for
+# memcached, served by the StaticContentServer middleware.  None disables it.
+STATIC_CONTENT_DISK_CACHE_ROOT = None
+# How many bytes of assets the disk cache can hold.
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# How many seconds browsers and CDNs can cache unlocked course assets for, by
+# content type ("image/png") or main type ("image"); "default" applies to the
+# other types.  Locked assets are only cached by browsers, and always revalidated.
+STATIC_CONTENT_CACHE_MAX_AGE = {
+    'default': 3600,
+}
+
+######################### Configuration models #################################
+
+# How many seconds each process keeps the current ConfigurationModel entries
+# for, in front of the django cache; they are also memoized for the request.
+# Entries saved by other processes can be seen that much later.  0 disables it.
+CONFIGURATION_MODEL_LOCAL_CACHE_TIMEOUT = 0
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -713,6 +769,10 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # How many warm sandbox workers each process keeps to run jailed code.
+    # 0 means start a new sandbox for every piece of code.
+    'pool_size': 0,
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -961,6 +1021,13 @@ PAID_COURSE_REGISTRATION_CURRENCY = ['usd', '$']
 # Members of this group are allowed to generate payment reports
 PAYMENT_REPORT_GENERATOR_GROUP = 'shoppingcart_report_access'
 
+################################# Comments service #############################
+
+# How many connections to the comments service each process keeps alive, which
+# is also how many requests the forum views can make to it at the same time.
+# 0 opens a new connection for every request, and makes them one at a time.
+COMMENTS_SERVICE_POOL_SIZE = 0
+
 ################################# open ended grading config  #####################
 
 #By setting up the default settings with an incorrect user name and password,
@@ -1548,6 +1615,10 @@ BULK_EMAIL_LOG_SENT_EMAILS = False
 # parallel, and what the SES rate is.
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
 
+# Number of SMTP connections a bulk email subtask sends emails on at once.
+# Emails are sent one at a time on a single connection when it's 1.
+BULK_EMAIL_CONNECTIONS_PER_SUBTASK = 1
+
 ############################# Email Opt In ####################################
 
 # Minimum age for organization-wide email opt in
@@ -1893,6 +1964,10 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Number of students graded by each subtask when
+# FEATURES['ENABLE_GRADE_REPORT_SUBTASKS'] is enabled.
+GRADES_DOWNLOAD_STUDENTS_PER_SUBTASK = 1000
+
 
 #### PASSWORD POLICY SETTINGS #####
 PASSWORD_MIN_LENGTH = 8
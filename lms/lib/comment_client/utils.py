@@ -1,14 +1,26 @@
 from contextlib import contextmanager
 import dogstats_wrapper as dog_stats_api
 import logging
+from multiprocessing.pool import ThreadPool
+import os
 import requests
+from requests.adapters import HTTPAdapter
+import sys
+import threading
 from django.conf import settings
 from time import time
 from uuid import uuid4
+from django.utils import translation
 from django.utils.translation import get_language
 
 log = logging.getLogger(__name__)
 
+_pool_lock = threading.Lock()
+# The session and the thread pool of the process, with the pid of the process
+_session = None
+_thread_pool = None
+_pool_pid = None
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -50,6 +62,71 @@ def request_timer(request_id, method, url, tags=None):
     )
 
 
+def _get_pool_size():
+    """
+    Returns how many connections to the comments service each process keeps
+    open (COMMENTS_SERVICE_POOL_SIZE), 0 if they aren't pooled.
+    """
+    return getattr(settings, 'COMMENTS_SERVICE_POOL_SIZE', 0)
+
+
+def _get_pools():
+    """
+    Returns the requests session, which keeps connections to the comments
+    service alive, and the pool of threads making parallel requests of the
+    process.
+    """
+    global _session, _thread_pool, _pool_pid  # pylint: disable=global-statement
+    with _pool_lock:
+        # Neither the connections nor the threads survive a fork
+        if _pool_pid != os.getpid():
+            pool_size = _get_pool_size()
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _thread_pool = ThreadPool(pool_size)
+            _pool_pid = os.getpid()
+        return _session, _thread_pool
+
+
+def perform_in_parallel(*functions):
+    """
+    Calls the functions, which make independent requests to the comments
+    service, at the same time, and returns the list of their results.
+
+    The functions run in the threads of a pool, with the language of the
+    current thread active, so they should only make requests with this module
+    (and not call `perform_in_parallel` themselves).
+    If any of them raises an exception, the first one is raised once they are
+    all done. Without a COMMENTS_SERVICE_POOL_SIZE, they are called one after
+    the other.
+    """
+    if not _get_pool_size() or len(functions) < 2:
+        return [function() for function in functions]
+
+    language = get_language()
+
+    def call(function):
+        """
+        Calls the function in a thread of the pool, returning its result or exception.
+        """
+        translation.activate(language)
+        try:
+            return function(), None
+        except Exception:  # pylint: disable=broad-except
+            return None, sys.exc_info()
+        finally:
+            translation.deactivate()
+
+    __, thread_pool = _get_pools()
+    results = thread_pool.map(call, functions)
+    for __, exc_info in results:
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+    return [result for result, __ in results]
+
+
 def perform_request(method, url, data_or_params=None, raw=False,
                     metric_action=None, metric_tags=None, paged_results=False):
 
@@ -75,8 +152,13 @@ def perform_request(method, url, data_or_params=None, raw=False,
     else:
         data = None
         params = merge_dict(data_or_params, request_id_dict)
+    if _get_pool_size():
+        session, __ = _get_pools()
+        request = session.request
+    else:
+        request = requests.request
     with request_timer(request_id, method, url, metric_tags):
-        response = requests.request(
+        response = request(
             method,
             url,
             data=data,
@@ -29,6 +29,9 @@ def run():
 
     add_mimetypes()
 
+    if settings.CODE_JAIL.get('pool_size'):
+        configure_sandbox_pool()
+
     if settings.FEATURES.get('USE_CUSTOM_THEME', False):
         enable_theme()
 
@@ -58,6 +61,14 @@ def add_mimetypes():
     mimetypes.add_type('application/font-woff', '.woff')
 
 
+def configure_sandbox_pool():
+    """
+    Run the code of capa problems in a pool of warm sandbox workers.
+    """
+    from capa.safe_exec import configure_worker_pool
+    configure_worker_pool(settings.CODE_JAIL['pool_size'])
+
+
 def enable_theme():
     """
     Enable the settings for a custom theme, whose files should be stored
@@ -0,0 +1,124 @@
+"""
+The index of the published blocks of courses (see
+`xmodule.modulestore.search.build_block_index`), built
+when the courses are published and cached per block, so that the paths and the
+parents of the blocks can be looked up without walking the course.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+
+# The index is rebuilt whenever its course is published, so it only expires
+# to make room for the indexes of the courses in use
+BLOCK_INDEX_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+# How long a scheduled build of an index is waited for before scheduling another
+BUILD_LOCK_TIMEOUT = 5 * 60
+
+
+def _generation_cache_key(course_key):
+    """
+    Returns the key caching the generation of the current index of the course.
+    """
+    return u'course_structures.block_index.{}'.format(course_key)
+
+
+def _build_lock_cache_key(course_key):
+    """
+    Returns the key marking that a build of the index of the course is scheduled.
+    """
+    return u'course_structures.block_index.{}.building'.format(course_key)
+
+
+def _entry_cache_key(course_key, generation, block_key):
+    """
+    Returns the key caching the entry of the block with the (block_type,
+    block_id) `block_key` in the `generation` index of the course.
+    """
+    return u'course_structures.block_index.{}.{}.{}.{}'.format(course_key, generation, *block_key)
+
+
+def cache_block_index(course_key, index, generation):
+    """
+    Caches the entries of `index`, the block index of the course, and makes it
+    the current index of the course.
+    """
+    cache.set_many(
+        {
+            _entry_cache_key(course_key, generation, block_key): entry
+            for block_key, entry in index.iteritems()
+        },
+        BLOCK_INDEX_CACHE_TIMEOUT
+    )
+    cache.set(_generation_cache_key(course_key), generation, BLOCK_INDEX_CACHE_TIMEOUT)
+    cache.delete(_build_lock_cache_key(course_key))
+
+
+def invalidate_block_index(course_key):
+    """
+    Stops using the current index of the course, which no longer matches its
+    published blocks.
+
+    A build of the index scheduled before is forgotten, since it may not see
+    the changes.
+    """
+    cache.delete_many([_generation_cache_key(course_key), _build_lock_cache_key(course_key)])
+
+
+def schedule_block_index_build(course_key):
+    """
+    Schedules a build of the index of the course, unless one is already scheduled.
+    """
+    # Import tasks here to avoid a circular import.
+    from .tasks import update_block_index
+
+    if cache.add(_build_lock_cache_key(course_key), True, BUILD_LOCK_TIMEOUT):
+        update_block_index.apply_async([unicode(course_key)], countdown=0)
+
+
+def get_block_index_entries(course_key, usage_keys):
+    """
+    Returns the entries of the index of the published course for the blocks at
+    `usage_keys`, keyed by their usage keys, or None if the index isn't used.
+
+    The index is only used by the published branch, when the
+    ENABLE_PATH_TO_LOCATION_INDEX feature is on. The blocks missing from the
+    index (the entries of which were evicted, or which are orphans) are missing
+    from the result. A build of the index is scheduled if it or some of its
+    entries are missing, so that the callers can fall back to the modulestore
+    in the meantime.
+    """
+    if not settings.FEATURES.get('ENABLE_PATH_TO_LOCATION_INDEX'):
+        return None
+    if modulestore().get_branch_setting() != ModuleStoreEnum.Branch.published_only:
+        return None
+
+    generation = cache.get(_generation_cache_key(course_key))
+    if generation is None:
+        schedule_block_index_build(course_key)
+        return None
+
+    cache_keys = {
+        _entry_cache_key(course_key, generation, (usage_key.block_type, usage_key.block_id)): usage_key
+        for usage_key in usage_keys
+    }
+    cached = cache.get_many(cache_keys.keys())
+    if len(cached) < len(cache_keys):
+        schedule_block_index_build(course_key)
+    return {cache_keys[cache_key]: entry for cache_key, entry in cached.iteritems()}
+
+
+def get_parent_location(usage_key):
+    """
+    Returns the location of the parent of the block at `usage_key`, or None if
+    it has none, like `get_parent_location` of the modulestore, which is only
+    used when the block index can't tell.
+    """
+    entry = (get_block_index_entries(usage_key.course_key, [usage_key]) or {}).get(usage_key)
+    if entry is None or 'parent' not in entry:
+        return modulestore().get_parent_location(usage_key)
+    if entry['parent'] is None:
+        return None
+    return usage_key.course_key.make_usage_key(*entry['parent'])
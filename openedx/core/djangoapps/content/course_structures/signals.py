@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.dispatch.dispatcher import receiver
 
 from xmodule.modulestore.django import SignalHandler
 
+from .block_index import invalidate_block_index, schedule_block_index_build
+
 
 @receiver(SignalHandler.course_published)
 def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
@@ -11,3 +14,8 @@ def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=
     # Note: The countdown=0 kwarg is set to to ensure the method below does not attempt to access the course
     # before the signal emitter has finished all operations. This is also necessary to ensure all tests pass.
     update_course_structure.apply_async([unicode(course_key)], countdown=0)
+
+    # The paths and parents of the published blocks may have changed
+    invalidate_block_index(course_key)
+    if settings.FEATURES.get('ENABLE_PATH_TO_LOCATION_INDEX'):
+        schedule_block_index_build(course_key)
@@ -1,9 +1,17 @@
 import json
 import logging
+import uuid
 
 from celery.task import task
 from opaque_keys.edx.keys import CourseKey
+from xblock.core import XBlock
+from xblock.exceptions import PluginMissingError
+from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.search import build_block_index
+from xmodule.modulestore.split_mongo import BlockKey
+
+from .block_index import cache_block_index
 
 
 log = logging.getLogger('edx.celery.task')
@@ -13,6 +21,77 @@ def _generate_course_structure(course_key):
     """
     Generates a course structure dictionary for the specified course.
     """
+    store = modulestore()
+    if store.check_supports(course_key, 'get_course_structure'):
+        split_structure = store.get_course_structure(course_key)
+        inherited_settings_map = store.get_inherited_settings_map(course_key, split_structure)
+        # The inherited settings aren't known while the structure is being modified.
+        if inherited_settings_map is not None:
+            return _generate_course_structure_from_split(course_key, split_structure, inherited_settings_map)
+    return _generate_course_structure_from_blocks(course_key)
+
+
+def _generate_course_structure_from_split(course_key, split_structure, inherited_settings_map):
+    """
+    Generates a course structure dictionary straight from the structure document
+    of a split course, without instantiating any XBlock.
+    """
+    blocks = split_structure['blocks']
+    blocks_stack = [split_structure['root']]
+    blocks_dict = {}
+    while blocks_stack:
+        block_key = blocks_stack.pop()
+        block_data = blocks[block_key]
+        children = [
+            BlockKey(*child) for child in block_data.fields.get('children', [])
+            if BlockKey(*child) in blocks
+        ]
+        key = unicode(course_key.make_usage_key(block_key.type, block_key.id))
+        block_class = _load_block_class(block_key.type)
+        inherited_settings = inherited_settings_map.get(block_key, {})
+        blocks_dict[key] = {
+            "usage_key": key,
+            "block_type": block_key.type,
+            "display_name": _get_field_value(block_data, inherited_settings, block_class, 'display_name', None),
+            "children": [unicode(course_key.make_usage_key(child.type, child.id)) for child in children],
+            "graded": _get_field_value(block_data, inherited_settings, block_class, 'graded', False),
+            "format": _get_field_value(block_data, inherited_settings, block_class, 'format', None),
+        }
+
+        blocks_stack.extend(children)
+    return {
+        "root": unicode(course_key.make_usage_key(split_structure['root'].type, split_structure['root'].id)),
+        "blocks": blocks_dict
+    }
+
+
+def _load_block_class(block_type):
+    """
+    Returns the XBlock class of the block type, or None if it isn't installed.
+    """
+    try:
+        return XBlock.load_class(block_type)
+    except PluginMissingError:
+        return None
+
+
+def _get_field_value(block_data, inherited_settings, block_class, name, default):
+    """
+    Returns the value of a settings field of a block of a split structure, looked up in the same order as the split
+    modulestore does: the value set on the block, the value inherited from its ancestors, the default copied from its
+    template, and finally the default of the field on the block class (or `default` if the class doesn't have it).
+    """
+    for values in (block_data.fields, inherited_settings, block_data.defaults):
+        if name in values:
+            return values[name]
+    field = block_class.fields.get(name) if block_class is not None else None
+    return field.default if field is not None else default
+
+
+def _generate_course_structure_from_blocks(course_key):
+    """
+    Generates a course structure dictionary by walking the XBlocks of the course.
+    """
     course = modulestore().get_course(course_key, depth=None)
     blocks_stack = [course]
     blocks_dict = {}
@@ -67,13 +146,36 @@ def update_course_structure(course_key):
         log.exception('An error occurred while generating course structure: %s', ex.message)
         raise
 
-    structure_json = json.dumps(structure)
+    structure_json = json.dumps(structure, sort_keys=True)
 
     cs, created = CourseStructure.objects.get_or_create(
         course_id=course_key,
         defaults={'structure_json': structure_json}
     )
 
-    if not created:
+    # Publishing often leaves the structure unchanged (e.g. when only the content of a block changed), in which case
+    # there is no need to compress and store it again.
+    if not created and cs.structure_json != structure_json:
         cs.structure_json = structure_json
         cs.save()
+
+
+@task(name=u'openedx.core.djangoapps.content.course_structures.tasks.update_block_index')
+def update_block_index(course_key):
+    """
+    Rebuilds and caches the index of the published blocks of the specified course.
+    """
+    # Callers pass the course key as a Unicode string, like for update_course_structure.
+    if not isinstance(course_key, basestring):
+        raise ValueError('course_key must be a string. {} is not acceptable.'.format(type(course_key)))
+
+    course_key = CourseKey.from_string(course_key)
+    store = modulestore()
+    try:
+        with store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            index = build_block_index(store, course_key)
+    except Exception as ex:
+        log.exception('An error occurred while building the block index: %s', ex.message)
+        raise
+
+    cache_block_index(course_key, index, uuid.uuid4().hex)
@@ -1,11 +1,20 @@
 import json
 
+from mock import patch
+
+from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import SignalHandler
+from xmodule.modulestore.split_mongo.caching_descriptor_system import CachingDescriptorSystem
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+from openedx.core.djangoapps.content.course_structures.block_index import (
+    get_block_index_entries, get_parent_location
+)
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
 from openedx.core.djangoapps.content.course_structures.signals import listen_for_course_publish
-from openedx.core.djangoapps.content.course_structures.tasks import _generate_course_structure, update_course_structure
+from openedx.core.djangoapps.content.course_structures.tasks import (
+    _generate_course_structure, _generate_course_structure_from_blocks, update_block_index, update_course_structure
+)
 
 
 class SignalDisconnectTestMixin(object):
@@ -54,6 +63,27 @@ class CourseStructureTaskTests(ModuleStoreTestCase):
         actual = _generate_course_structure(self.course.id)
         self.assertDictEqual(actual, expected)
 
+    def test_generate_split_course_structure(self):
+        """
+        The structure of split courses is generated from their structure document, without loading their blocks.
+        """
+        with self.store.default_store(ModuleStoreEnum.Type.split):
+            course = CourseFactory.create()
+            chapter = ItemFactory.create(parent=course, category='chapter', display_name='Test Section')
+            sequential = ItemFactory.create(parent=chapter, category='sequential', graded=True, format='Homework')
+            vertical = ItemFactory.create(parent=sequential, category='vertical')
+            problem = ItemFactory.create(parent=vertical, category='problem')
+            ItemFactory.create(parent=vertical, category='html')
+
+        expected = _generate_course_structure_from_blocks(course.id)
+        with patch.object(CachingDescriptorSystem, '_load_item', side_effect=AssertionError('Loaded a block')):
+            actual = _generate_course_structure(course.id)
+
+        self.maxDiff = None
+        self.assertDictEqual(actual, expected)
+        # The problem inherits graded from its sequential
+        self.assertTrue(actual['blocks'][unicode(problem.location)]['graded'])
+
     def test_structure_json(self):
         """
         Although stored as compressed data, CourseStructure.structure_json should always return the uncompressed string.
@@ -128,3 +158,54 @@ class CourseStructureTaskTests(ModuleStoreTestCase):
         cs = CourseStructure.objects.get(course_id=course_id)
         self.assertEqual(cs.course_id, course_id)
         self.assertEqual(cs.structure, structure)
+
+        # An unchanged structure isn't stored again
+        with patch.object(CourseStructure, 'save') as mock_save:
+            update_course_structure(unicode(course_id))
+        self.assertFalse(mock_save.called)
+
+
+class BlockIndexTests(ModuleStoreTestCase):
+    """
+    Tests of the index of the published blocks of courses.
+    """
+    def setUp(self):
+        super(BlockIndexTests, self).setUp()
+        patcher = patch.dict('django.conf.settings.FEATURES', {'ENABLE_PATH_TO_LOCATION_INDEX': True})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.course = CourseFactory.create()
+        self.chapter = ItemFactory.create(parent=self.course, category='chapter')
+        self.sequential = ItemFactory.create(parent=self.chapter, category='sequential')
+        self.problem = ItemFactory.create(parent=self.sequential, category='problem')
+
+    def test_built_on_publish(self):
+        entries = get_block_index_entries(self.course.id, [self.problem.location, self.chapter.location])
+        self.assertEqual(entries[self.problem.location]['path'], (self.chapter.url_name, self.sequential.url_name, '1'))
+        self.assertEqual(entries[self.problem.location]['parent'], ('sequential', self.sequential.location.block_id))
+        self.assertEqual(entries[self.chapter.location]['section'], None)
+
+        with patch.object(self.store, 'get_parent_location') as store_get_parent_location:
+            self.assertEqual(get_parent_location(self.problem.location), self.sequential.location)
+            self.assertIsNone(get_parent_location(self.course.location))
+        self.assertFalse(store_get_parent_location.called)
+
+    def test_invalidated_on_publish(self):
+        # The index isn't rebuilt, so it's missing until the next build
+        with patch('openedx.core.djangoapps.content.course_structures.signals.schedule_block_index_build'):
+            SignalHandler.course_published.send(sender=None, course_key=self.course.id)
+        with patch('openedx.core.djangoapps.content.course_structures.block_index.schedule_block_index_build') as build:
+            self.assertIsNone(get_block_index_entries(self.course.id, [self.problem.location]))
+        build.assert_called_once_with(self.course.id)
+        self.assertEqual(get_parent_location(self.problem.location), self.sequential.location)
+
+        update_block_index(unicode(self.course.id))
+        self.assertIn(self.problem.location, get_block_index_entries(self.course.id, [self.problem.location]))
+
+    def test_not_used_by_draft_branch(self):
+        with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, self.course.id):
+            self.assertIsNone(get_block_index_entries(self.course.id, [self.problem.location]))
+
+    def test_update_block_index(self):
+        # Method requires string input
+        self.assertRaises(ValueError, update_block_index, self.course.id)
@@ -240,6 +240,30 @@ def get_cohort(user, course_key, assign=True, use_cached=False):
     return request_cache.data.setdefault(cache_key, cohort)
 
 
+def get_cohorts_for_users(user_ids, course_key):
+    """
+    Returns the cohorts of several users for the specified course, with a
+    single query. Users are not assigned a cohort.
+
+    Arguments:
+        user_ids: the ids of the users
+        course_key: CourseKey
+
+    Returns:
+        A dict of CourseUserGroup objects keyed by user id, holding the users
+        who have a cohort, if the course is cohorted.
+    """
+    if not get_course_cohort_settings(course_key).is_cohorted:
+        return {}
+
+    memberships = CourseUserGroup.users.through.objects.filter(
+        courseusergroup__course_id=course_key,
+        courseusergroup__group_type=CourseUserGroup.COHORT,
+        user__in=user_ids,
+    ).select_related('courseusergroup')
+    return {membership.user_id: membership.courseusergroup for membership in memberships}
+
+
 def migrate_cohort_settings(course):
     """
     Migrate all the cohort settings associated with this course from modulestore to mysql.
@@ -253,6 +253,29 @@ class TestCohorts(ModuleStoreTestCase):
             "other_user should be assigned to the default cohort"
         )
 
+    def test_get_cohorts_for_users(self):
+        """
+        Make sure cohorts.get_cohorts_for_users() looks up the cohorts of
+        several users at once, without assigning them cohorts
+        """
+        course = modulestore().get_course(self.toy_course_key)
+        user = UserFactory(username="test", email="a@b.com")
+        other_user = UserFactory(username="test2", email="a2@b.com")
+        cohort = CohortFactory(course_id=course.id, name="TestCohort")
+        cohort.users.add(user)
+        user_ids = [user.id, other_user.id]
+
+        self.assertEqual(
+            cohorts.get_cohorts_for_users(user_ids, course.id), {},
+            "Course isn't cohorted, so users shouldn't have a cohort"
+        )
+
+        config_course_cohorts(course, is_cohorted=True)
+        with self.assertNumQueries(2):
+            users_cohorts = cohorts.get_cohorts_for_users(user_ids, course.id)
+        self.assertEqual(users_cohorts.keys(), [user.id])
+        self.assertEqual(users_cohorts[user.id].id, cohort.id)
+
     @ddt.data(
         (True, 2),
         (False, 6),
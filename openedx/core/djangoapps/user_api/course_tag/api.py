@@ -39,6 +39,29 @@ def get_course_tag(user, course_id, key):
         return None
 
 
+def get_course_tags_for_users(user_ids, course_id, key):
+    """
+    Gets the values of the course tags of several users for the specified key
+    in the specified course_id, with a single query.
+
+    Args:
+        user_ids: the ids of the users
+        course_id: course identifier (string)
+        key: arbitrary (<=255 char string)
+
+    Returns:
+        dict of the string values, keyed by user id. The users without a
+        value saved are missing.
+    """
+    return dict(
+        UserCourseTag.objects.filter(
+            user__in=user_ids,
+            course_id=course_id,
+            key=key
+        ).values_list('user_id', 'value')
+    )
+
+
 def set_course_tag(user, course_id, key, value):
     """
     Sets the value of the user's course tag for the specified key in the specified
@@ -33,3 +33,12 @@ class TestCourseTagAPI(TestCase):
         course_tag_api.set_course_tag(self.user, self.course_id, self.test_key, test_value)
         tag = course_tag_api.get_course_tag(self.user, self.course_id, self.test_key)
         self.assertEqual(tag, test_value)
+
+    def test_get_course_tags_for_users(self):
+        other_user = UserFactory.create()
+        course_tag_api.set_course_tag(self.user, self.course_id, self.test_key, 'value')
+        course_tag_api.set_course_tag(other_user, self.course_id, 'other_key', 'other_value')
+
+        with self.assertNumQueries(1):
+            tags = course_tag_api.get_course_tags_for_users([self.user.id, other_user.id], self.course_id, self.test_key)
+        self.assertEqual(tags, {self.user.id: 'value'})
@@ -27,19 +27,7 @@ class RandomUserPartitionScheme(object):
 
         group = None
         if group_id is not None:
-            # attempt to look up the presently assigned group
-            try:
-                group = user_partition.get_group(int(group_id))
-            except NoSuchUserPartitionGroupError:
-                # jsa: we can turn off warnings here if this is an expected case.
-                log.warn(
-                    "group not found in RandomUserPartitionScheme: %r",
-                    {
-                        "requested_partition_id": user_partition.id,
-                        "requested_group_id": group_id,
-                    },
-                    exc_info=True
-                )
+            group = cls._get_assigned_group(user_partition, group_id)
 
         if group is None and assign:
             if not user_partition.groups:
@@ -71,6 +59,45 @@ class RandomUserPartitionScheme(object):
 
         return group
 
+    @classmethod
+    def get_groups_for_users(cls, course_key, user_ids, user_partition):
+        """
+        Returns the groups from the specified user partition to which the users
+        of `user_ids` are assigned, as a dict keyed by user id, looking them up
+        at once. Users are not assigned a group: the ones who don't have one
+        are missing from the dict.
+        """
+        group_ids = course_tag_api.get_course_tags_for_users(
+            user_ids, course_key, cls.key_for_partition(user_partition)
+        )
+        groups = {}
+        for user_id, group_id in group_ids.iteritems():
+            group = cls._get_assigned_group(user_partition, group_id)
+            if group is not None:
+                groups[user_id] = group
+        return groups
+
+    @classmethod
+    def _get_assigned_group(cls, user_partition, group_id):
+        """
+        Returns the group of the specified user partition with the id saved as
+        a course tag, or None if it doesn't exist.
+        """
+        # attempt to look up the presently assigned group
+        try:
+            return user_partition.get_group(int(group_id))
+        except NoSuchUserPartitionGroupError:
+            # jsa: we can turn off warnings here if this is an expected case.
+            log.warn(
+                "group not found in RandomUserPartitionScheme: %r",
+                {
+                    "requested_partition_id": user_partition.id,
+                    "requested_group_id": group_id,
+                },
+                exc_info=True
+            )
+            return None
+
     @classmethod
     def key_for_partition(cls, user_partition):
         """
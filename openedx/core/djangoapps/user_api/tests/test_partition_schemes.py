@@ -18,13 +18,20 @@ class MemoryCourseTagAPI(object):
     def __init__(self):
         self._tags = defaultdict(dict)
 
-    def get_course_tag(self, __, course_id, key):
-        """Sets the value of ``key`` to ``value``"""
-        return self._tags[course_id].get(key)
-
-    def set_course_tag(self, __, course_id, key, value):
+    def get_course_tag(self, user, course_id, key):
         """Gets the value of ``key``"""
-        self._tags[course_id][key] = value
+        return self._tags[user.id, course_id].get(key)
+
+    def get_course_tags_for_users(self, user_ids, course_id, key):
+        """Gets the values of ``key`` for several users"""
+        return {
+            user_id: self._tags[user_id, course_id][key]
+            for user_id in user_ids if key in self._tags[user_id, course_id]
+        }
+
+    def set_course_tag(self, user, course_id, key, value):
+        """Sets the value of ``key`` to ``value``"""
+        self._tags[user.id, course_id][key] = value
 
 
 class TestRandomUserPartitionScheme(PartitionTestCase):
@@ -76,6 +83,16 @@ class TestRandomUserPartitionScheme(PartitionTestCase):
 
         self.assertIsNotNone(group)
 
+    def test_get_groups_for_users(self):
+        other_user = UserFactory.create()
+        group = RandomUserPartitionScheme.get_group_for_user(self.MOCK_COURSE_ID, self.user, self.user_partition)
+
+        groups = RandomUserPartitionScheme.get_groups_for_users(
+            self.MOCK_COURSE_ID, [self.user.id, other_user.id], self.user_partition
+        )
+        # other_user isn't assigned a group
+        self.assertEqual(groups, {self.user.id: group})
+
     def test_empty_partition(self):
         empty_partition = UserPartition(
             self.TEST_ID,